@@ -0,0 +1,180 @@
+"""
+Stateless JWT authentication.
+
+Tokens issued by ``RefreshToken`` / ``AccessToken`` below carry the user's
+``username``, ``role``, ``profile_id``, ``seller_id``, ``is_staff``,
+``is_superuser`` and a version ``ver``. ``JWTAuthentication`` then builds
+``request.user`` from the token without reading ``auth_user``, and
+``get_identity`` (account/identity.py) answers role and seller questions
+from the claims.
+
+Whenever one of those values, ``is_active`` or the password changes, the
+user's ``TokenVersion`` is bumped (account/signals.py). Versions bumped within
+one access token lifetime form a small set that is cached and checked on
+every request, and tokens with an older ``ver`` are rejected. Clients then
+refresh, and the refresh endpoint reads the claims again from the
+database. Tokens without ``ver``, issued before this scheme, still work by
+loading the user.
+"""
+import hashlib
+import json
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import authentication, serializers, tokens
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import token_revocation_cache
+from .models import TokenUser, TokenVersion
+
+VERSION_CLAIM = "ver"
+# Cột của User có trong token; các cột khác được để deferred, chỉ query khi thật sự dùng
+TOKEN_USER_FIELDS = ("id", "username", "is_staff", "is_superuser", "is_active")
+
+
+def user_claims(user):
+    """Claims describing ``user``, read from the user, its profile and seller."""
+    profile = getattr(user, "profile", None)
+    seller = getattr(user, "seller", None)
+    return {
+        "username": user.username,
+        "role": profile.role if profile else None,
+        "profile_id": profile.pk if profile else None,
+        "seller_id": seller.pk if seller else None,
+        "is_staff": user.is_staff,
+        "is_superuser": user.is_superuser,
+    }
+
+
+def claims_fingerprint(user):
+    if user is None:
+        return ""
+    data = {**user_claims(user), "is_active": user.is_active, "password": user.password}
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def current_token_version(user):
+    row, _ = TokenVersion.objects.get_or_create(user_id=user.pk, defaults={"fingerprint": claims_fingerprint(user)})
+    return row.version
+
+
+def sync_token_version(user_id):
+    """Bump the token version of ``user_id`` if what its tokens claim has changed."""
+    user = User.objects.select_related("profile", "seller").filter(pk=user_id).first()
+    fingerprint = claims_fingerprint(user)
+    row, created = TokenVersion.objects.get_or_create(user_id=user_id, defaults={"fingerprint": fingerprint})
+    if not created and row.fingerprint != fingerprint:
+        TokenVersion.objects.filter(pk=user_id).update(
+            version=F("version") + 1, fingerprint=fingerprint, updated_at=timezone.now()
+        )
+        transaction.on_commit(token_revocation_cache.invalidate)
+
+
+def revoked_versions():
+    """{user id: current version} for users whose older tokens may still be unexpired."""
+    def build():
+        since = timezone.now() - api_settings.ACCESS_TOKEN_LIFETIME
+        return dict(
+            TokenVersion.objects.filter(version__gt=0, updated_at__gte=since).values_list("user_id", "version")
+        )
+    return token_revocation_cache.get_or_build(build)
+
+
+def add_user_claims(token, user):
+    for claim, value in user_claims(user).items():
+        token[claim] = value
+    token[VERSION_CLAIM] = current_token_version(user)
+    return token
+
+
+def token_user(validated_token):
+    """``TokenUser`` built from the token claims; the other columns are deferred and load on first access."""
+    claims = {
+        "id": int(validated_token[api_settings.USER_ID_CLAIM]),
+        "username": validated_token["username"],
+        "is_staff": validated_token["is_staff"],
+        "is_superuser": validated_token["is_superuser"],
+        "is_active": True,
+    }
+    fields = [field.attname for field in TokenUser._meta.concrete_fields if field.attname in claims]
+    return TokenUser.from_db(DEFAULT_DB_ALIAS, fields, [claims[name] for name in fields])
+
+
+class AccessToken(tokens.AccessToken):
+    @classmethod
+    def for_user(cls, user):
+        return add_user_claims(super().for_user(user), user)
+
+
+class RefreshToken(tokens.RefreshToken):
+    access_token_class = AccessToken
+
+    @classmethod
+    def for_user(cls, user):
+        # access_token chép các claim này từ refresh token
+        return add_user_claims(super().for_user(user), user)
+
+
+class TokenObtainPairSerializer(serializers.TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+
+class TokenRefreshSerializer(serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # Access token mới lấy claim hiện tại trong DB thay vì chép từ refresh token (có thể đã cũ)
+        user_id = self.token_class(attrs["refresh"], verify=False)[api_settings.USER_ID_CLAIM]
+        user = User.objects.select_related("profile", "seller").filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        data["access"] = str(AccessToken.for_user(user))
+        return data
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    Builds ``request.user`` from the token claims, with no ``auth_user`` query.
+    Falls back to loading the user (with profile and seller) for tokens
+    without ``ver``.
+    """
+
+    def get_user(self, validated_token):
+        if VERSION_CLAIM not in validated_token:
+            return self.get_db_user(validated_token)
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValueError) as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+        current = revoked_versions().get(user_id)
+        if current is not None and validated_token[VERSION_CLAIM] < current:
+            raise AuthenticationFailed("Phiên đăng nhập đã thay đổi, vui lòng đăng nhập lại.", code="token_revoked")
+        return token_user(validated_token)
+
+    def get_db_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = self.user_model.objects.select_related("profile", "seller").get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
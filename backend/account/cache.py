@@ -0,0 +1,60 @@
+from django.core.cache import cache
+
+
+class VersionedCache:
+    """
+    Caches one computed payload per namespace in Django's cache framework.
+
+    Writers call ``invalidate()``, which bumps a version number stored next to
+    the payload, so every worker sharing the cache backend stops serving the
+    old value at once. Hit and miss counters live in the cache as well.
+    """
+
+    def __init__(self, namespace, timeout=300):
+        self.namespace = namespace
+        self.timeout = timeout
+
+    def _key(self, *parts):
+        return ":".join([self.namespace, *map(str, parts)])
+
+    def version(self):
+        return cache.get_or_set(self._key("version"), 1, timeout=None)
+
+    def invalidate(self):
+        try:
+            cache.incr(self._key("version"))
+        except ValueError:
+            cache.set(self._key("version"), 2, timeout=None)
+
+    def get_or_build(self, build, *key_parts):
+        key = self._key("payload", self.version(), *key_parts)
+        value = cache.get(key)
+        if value is None:
+            self._count("misses")
+            value = build()
+            cache.set(key, value, self.timeout)
+        else:
+            self._count("hits")
+        return value
+
+    def _count(self, name):
+        key = self._key(name)
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, timeout=None)
+
+    def counters(self):
+        values = cache.get_many([self._key("hits"), self._key("misses")])
+        return {
+            "hits": values.get(self._key("hits"), 0),
+            "misses": values.get(self._key("misses"), 0),
+        }
+
+
+admin_stats_cache = VersionedCache("admin-stats")
+# Danh mục ít khi đổi; timeout chỉ để số sản phẩm không cũ quá lâu
+category_cache = VersionedCache("categories", timeout=3600)
+# {user id: version} của các token bị thu hồi, đọc ở mỗi request có JWT (account/authentication.py)
+token_revocation_cache = VersionedCache("token-revocations", timeout=60)
@@ -0,0 +1,92 @@
+"""
+Who is making the request: role, profile and seller of ``request.user``.
+
+``get_identity(request)`` returns one ``Identity`` per request and stores it
+as ``request.identity``. With a token issued by account/authentication.py,
+role, profile id and seller id come from its claims and cost no query; the
+``Seller`` / ``Profile`` rows are only read if a view needs the objects.
+Otherwise ``account.authentication.JWTAuthentication`` has loaded the
+profile and seller together with the user, or both are fetched with a
+single query the first time a view or permission asks. Further uses in
+the same request (permission, view, serializer, notification) cost nothing.
+"""
+from django.contrib.auth.models import User
+from django.utils.functional import cached_property
+
+from .models import Profile, Seller
+
+
+class Identity:
+    def __init__(self, user, claims=None):
+        self.user = user
+        # Token do account.authentication cấp đã có role, profile_id, seller_id
+        self.claims = claims if claims is not None and "ver" in claims else None
+
+    @cached_property
+    def _related(self):
+        """(profile, seller) of the user, fetched together."""
+        user = self.user
+        if not user.is_authenticated:
+            return None, None
+        if not (User.profile.is_cached(user) and User.seller.is_cached(user)):
+            user = User.objects.select_related("profile", "seller").get(pk=user.pk)
+        return self._attach(getattr(user, "profile", None)), self._attach(getattr(user, "seller", None))
+
+    def _attach(self, related):
+        # profile.user / seller.user là chính user của request, không cần query lại
+        if related is not None:
+            related.user = self.user
+        return related
+
+    @cached_property
+    def profile(self):
+        if self.claims is not None:
+            profile_id = self.claims["profile_id"]
+            return self._attach(Profile.objects.filter(pk=profile_id).first()) if profile_id else None
+        return self._related[0]
+
+    @cached_property
+    def seller(self):
+        if self.claims is not None:
+            seller_id = self.claims["seller_id"]
+            return self._attach(Seller.objects.filter(pk=seller_id).first()) if seller_id else None
+        return self._related[1]
+
+    @property
+    def profile_id(self):
+        if self.claims is not None:
+            return self.claims["profile_id"]
+        return self.profile.pk if self.profile else None
+
+    @property
+    def seller_id(self):
+        if self.claims is not None:
+            return self.claims["seller_id"]
+        return self.seller.pk if self.seller else None
+
+    @property
+    def role(self):
+        if self.claims is not None:
+            return self.claims["role"]
+        return self.profile.role if self.profile else None
+
+    @property
+    def is_seller(self):
+        return self.seller_id is not None
+
+    @property
+    def notification_role(self):
+        """Role whose broadcast notifications the user sees ("admin" for staff)."""
+        if self.user.is_superuser or self.user.is_staff:
+            return "admin"
+        return self.role
+
+
+def get_identity(request):
+    """The ``Identity`` of ``request.user``, created once per request."""
+    # DRF Request chuyển thuộc tính sang HttpRequest, nên lưu ở đó để mọi lớp dùng chung
+    http_request = getattr(request, "_request", request)
+    identity = getattr(http_request, "identity", None)
+    if identity is None or identity.user is not request.user:
+        identity = http_request.identity = Identity(request.user, getattr(request, "auth", None))
+    return identity
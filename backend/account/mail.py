@@ -0,0 +1,118 @@
+"""
+Outbound email queue.
+
+Requests call ``enqueue_mail`` which only inserts an ``OutboundEmail`` row,
+so they never wait on SMTP. The ``send_queued_mail`` command drains the
+queue in batches over one SMTP connection and retries failures with
+exponential backoff. A batch is claimed (``sending``) in a short
+transaction, sent with no transaction open, and the results are written
+in a second one.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 6 * 60 * 60
+# Lô đã nhận mà worker không ghi kết quả sau thời gian này thì được gửi lại
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue_mail(subject, body, recipients, from_email=None):
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(recipients),
+    )
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts``: 30s, 60s, 120s, ... capped at 6h."""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def send_queued_mail(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """Send one batch of due emails. Returns (sent, failed) counts."""
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    # Gửi ngoài transaction: không giữ khóa dòng / transaction mở trong lúc chờ SMTP
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:
+        # Không kết nối được máy chủ email: cả lô tính là một lần thử thất bại
+        logger.warning("Không kết nối được máy chủ email: %s", exc)
+        for email in batch:
+            _record_failure(email, exc, max_attempts)
+        failed = len(batch)
+    else:
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email, email.to, connection=connection
+                )
+                try:
+                    message.send()
+                except Exception as exc:
+                    logger.warning("Gửi email %s thất bại: %s", email.pk, exc)
+                    _record_failure(email, exc, max_attempts)
+                    failed += 1
+                    # Kết nối có thể đã hỏng; backend tự mở lại ở lần gửi sau
+                    connection.close()
+                    continue
+                email.status = "sent"
+                email.sent_at = timezone.now()
+                email.last_error = ""
+                sent += 1
+        finally:
+            connection.close()
+
+    with transaction.atomic():
+        OutboundEmail.objects.bulk_update(
+            batch, ["status", "attempts", "next_attempt_at", "last_error", "sent_at"]
+        )
+    return sent, failed
+
+
+def claim_batch(batch_size):
+    """
+    Mark up to ``batch_size`` due emails as ``sending`` and return them.
+    The claim expires after ``CLAIM_TIMEOUT`` so a crashed worker's batch is
+    picked up again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked để nhiều worker chạy song song không lấy trùng lô
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=["pending", "sending"], next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        for email in batch:
+            email.status = "sending"
+            email.next_attempt_at = now + CLAIM_TIMEOUT
+        OutboundEmail.objects.bulk_update(batch, ["status", "next_attempt_at"])
+    return batch
+
+
+def _record_failure(email, exc, max_attempts):
+    email.attempts += 1
+    email.last_error = str(exc)[:1000]
+    if email.attempts >= max_attempts:
+        email.status = "failed"
+    else:
+        email.status = "pending"
+        email.next_attempt_at = timezone.now() + backoff(email.attempts)
@@ -0,0 +1,87 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt import authentication as simplejwt_authentication
+from rest_framework_simplejwt.tokens import AccessToken as SimpleJWTAccessToken
+
+from account.authentication import AccessToken, JWTAuthentication
+from account.models import Notification, Profile, Seller
+from product.models import Product
+
+ENDPOINTS = ("/api/account/notifications/unread-count/", "/api/product/seller/", "/api/order/seller-orders/")
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh xác thực JWT không query user (token có claim) với cách tải user từ DB "
+        "(token cũ / JWTAuthentication của simplejwt): thời gian xác thực và số request/giây "
+        "của vài endpoint đọc. Dữ liệu được tạo trong một transaction và rollback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--auth-runs", type=int, default=2000)
+        parser.add_argument("--requests", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=["testserver"]), transaction.atomic():
+            user = self.seed()
+            tokens = {
+                "stateless": str(AccessToken.for_user(user)),
+                "db lookup": str(SimpleJWTAccessToken.for_user(user)),
+            }
+            self.bench_authenticate(tokens, options["auth_runs"])
+            self.bench_endpoints(tokens, options["requests"])
+            transaction.set_rollback(True)
+
+    def seed(self):
+        user = User.objects.create_user("bench-jwt-seller")
+        Profile.objects.create(user=user, role="seller")
+        seller = Seller.objects.create(user=user, shop_name="Bench JWT")
+        Product.objects.bulk_create(Product(name=f"Bench {i}", price=1000, seller=seller) for i in range(10))
+        Notification.objects.bulk_create(
+            Notification(user=user, target_role="seller", title="Bench", message="bench") for _ in range(10)
+        )
+        return user
+
+    def bench_authenticate(self, tokens, runs):
+        self.stdout.write(f"authenticate() x{runs}")
+        backends = [
+            ("stateless", JWTAuthentication()),
+            ("db lookup", JWTAuthentication()),
+            ("db lookup", simplejwt_authentication.JWTAuthentication()),
+        ]
+        for token_name, backend in backends:
+            request = Request(APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {tokens[token_name]}"))
+            backend.authenticate(request)  # nạp cache danh sách thu hồi
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                for _ in range(runs):
+                    backend.authenticate(request)
+                elapsed = time.perf_counter() - start
+            label = f"{token_name} ({type(backend).__module__.split('.')[0]})"
+            self.stdout.write(
+                f"  {label:<40} {elapsed / runs * 1e6:8.1f} µs/auth  "
+                f"{len(ctx.captured_queries) / runs:.0f} queries/auth"
+            )
+
+    def bench_endpoints(self, tokens, requests):
+        self.stdout.write(f"GET x{requests}")
+        for url in ENDPOINTS:
+            for token_name, token in tokens.items():
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+                client.get(url)
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    for _ in range(requests):
+                        client.get(url)
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"  {url:<42} {token_name:<10} {requests / elapsed:8.0f} req/s  "
+                    f"{len(ctx.captured_queries) / requests:.0f} queries/request"
+                )
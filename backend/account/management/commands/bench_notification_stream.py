@@ -0,0 +1,168 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection, transaction
+from rest_framework_simplejwt.tokens import AccessToken
+
+from account.models import Notification, Profile
+from account.realtime import get_broker, hub, notification_payload
+from backend.asgi import application
+
+POLL_INTERVAL_SECONDS = 10
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class FakeClient:
+    """One browser tab talking to the ASGI application."""
+
+    def __init__(self, path, query_string=b"", headers=()):
+        self.scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query_string,
+            "root_path": "",
+            "headers": [(b"host", b"localhost"), *headers],
+            "client": ("127.0.0.1", 50000),
+            "server": ("localhost", 8000),
+        }
+        self.connected = asyncio.Event()
+        self.disconnect = asyncio.Event()
+        self.events = 0
+        self.status = None
+        self.body = b""
+        self.received = asyncio.Condition()
+
+    async def receive(self):
+        if not hasattr(self, "_sent_request"):
+            self._sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            self.body += body
+            if body.startswith(b"retry:"):
+                self.connected.set()
+            elif body.startswith(b"id:"):
+                async with self.received:
+                    self.events += 1
+                    self.received.notify_all()
+
+    async def run(self):
+        await application(self.scope, self.receive, self.send)
+
+
+class Command(BaseCommand):
+    help = (
+        "Giả lập nhiều trình duyệt giữ stream thông báo (SSE) qua ASGI và so sánh "
+        "số query với cách cũ hỏi lại danh sách mỗi 10 giây. "
+        "Dữ liệu được tạo trong một transaction và rollback khi kết thúc."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=5000)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--idle", type=float, default=20, help="Số giây giữ kết nối không có thông báo mới")
+        parser.add_argument("--broadcasts", type=int, default=5)
+
+    def handle(self, *args, **options):
+        # ASGI handler đóng kết nối DB ở đầu/cuối request, việc đó sẽ phá transaction dùng để rollback
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        counter = QueryCounter()
+        try:
+            with transaction.atomic(), connection.execute_wrapper(counter):
+                users = self.seed(options["users"])
+                async_to_sync(self.measure)(users, counter, options)
+                transaction.set_rollback(True)
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+
+    def seed(self, count):
+        users = User.objects.bulk_create(User(username=f"bench-stream-{i}") for i in range(count))
+        Profile.objects.bulk_create(Profile(user=user, role="customer") for user in users)
+        Notification.objects.bulk_create(
+            Notification(target_role="customer", title="Cũ", message=f"Thông báo cũ {i}") for i in range(20)
+        )
+        return users
+
+    async def measure(self, users, counter, options):
+        clients_count = options["clients"]
+        tokens = [str(AccessToken.for_user(user)).encode() for user in users]
+
+        # Cách cũ: mỗi tab tải lại toàn bộ danh sách mỗi 10 giây
+        poll = FakeClient("/api/account/notifications/", headers=[(b"authorization", b"Bearer " + tokens[0])])
+        before = counter.count
+        await poll.run()
+        per_poll = counter.count - before
+        self.stdout.write(
+            f"Polling: {per_poll} queries/request -> "
+            f"{clients_count * per_poll / POLL_INTERVAL_SECONDS:,.0f} queries/s for {clients_count} clients"
+        )
+
+        clients = [
+            FakeClient("/api/account/notifications/stream/", b"token=" + tokens[i % len(tokens)])
+            for i in range(clients_count)
+        ]
+        before = counter.count
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(client.run()) for client in clients]
+        await asyncio.gather(*(client.connected.wait() for client in clients))
+        self.stdout.write(
+            f"Connect: {clients_count} streams in {time.perf_counter() - started:.2f}s, "
+            f"{counter.count - before} queries ({(counter.count - before) / clients_count:.1f}/client, once)"
+        )
+
+        before = counter.count
+        await asyncio.sleep(options["idle"])
+        idle_queries = counter.count - before
+        self.stdout.write(
+            f"Idle: {idle_queries} queries in {options['idle']:.0f}s "
+            f"({idle_queries / options['idle']:.2f} queries/s), {hub.subscriber_count()} subscribers"
+        )
+
+        broker = get_broker()
+        latencies = []
+        for i in range(options["broadcasts"]):
+            notification = await sync_to_async(Notification.objects.create)(
+                target_role="customer", title="Khuyến mãi", message=f"Bench {i}"
+            )
+            started = time.perf_counter()
+            # Trong transaction của benchmark on_commit không chạy, nên đẩy thẳng qua broker
+            broker.publish(notification_payload(notification))
+            for client in clients:
+                async with client.received:
+                    await client.received.wait_for(lambda: client.events > i)
+            latencies.append(time.perf_counter() - started)
+        self.stdout.write(
+            f"Broadcast: {options['broadcasts']} notifications to {clients_count} streams, "
+            f"fan-out max {max(latencies) * 1000:.0f}ms, avg {sum(latencies) / len(latencies) * 1000:.0f}ms"
+        )
+
+        for client in clients:
+            client.disconnect.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+        self.stdout.write(f"Disconnected, {hub.subscriber_count()} subscribers left")
@@ -0,0 +1,73 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from account.authentication import AccessToken
+from account.models import Notification, Profile, Seller
+from category.models import Category
+from order.models import Order, OrderItem
+from product.models import Product, Review
+
+# Query đọc user / seller / profile (thường chỉ để biết người gửi request là ai)
+IDENTITY_QUERY = re.compile(r'^SELECT .*? FROM "(auth_user|account_seller|account_profile)"')
+
+
+class Command(BaseCommand):
+    help = (
+        "Đếm số query của các endpoint seller / thông báo với JWT thật, tách riêng các query "
+        "chỉ để tra user, profile, seller. Dữ liệu được tạo trong một transaction và rollback."
+    )
+
+    def handle(self, *args, **options):
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=["testserver"]), transaction.atomic():
+            self.seed()
+            rows = [(name, *self.measure(method, url, data)) for name, method, url, data in self.endpoints()]
+            transaction.set_rollback(True)
+
+        width = max(len(row[0]) for row in rows)
+        self.stdout.write(f"{'endpoint':<{width}}  status  queries  user/seller/profile")
+        for name, status, queries, identity in rows:
+            self.stdout.write(f"{name:<{width}}  {status:>6}  {queries:>7}  {identity:>19}")
+
+    def seed(self):
+        user = User.objects.create_user("bench-identity-seller")
+        Profile.objects.create(user=user, role="seller")
+        self.seller = Seller.objects.create(user=user, shop_name="Bench identity")
+        customer = User.objects.create_user("bench-identity-customer")
+        self.category = Category.objects.create(name="Bench identity", slug="bench-identity")
+        self.product = Product.objects.create(name="Bench", price=1000, stock=100, seller=self.seller, category=self.category)
+        self.review = Review.objects.create(product=self.product, user=customer, rating=5, comment="ok")
+        self.order = Order.objects.create(user=customer, seller=self.seller, address="bench")
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1, price=1000)
+        Notification.objects.create(user=user, target_role="seller", title="Bench", message="bench")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    def endpoints(self):
+        product = {"name": "Bench mới", "price": 2000, "stock": 5, "category": self.category.id}
+        return [
+            ("POST product/", "post", "/api/product/", product),
+            ("PATCH product/<id>/", "patch", f"/api/product/{self.product.id}/", {"stock": 7}),
+            ("GET product/seller/", "get", "/api/product/seller/", None),
+            ("POST product/seller/", "post", "/api/product/seller/", product),
+            ("PATCH product/seller/<id>/", "patch", f"/api/product/seller/{self.product.id}/", {"stock": 8}),
+            ("PATCH product/reviews/<id>/reply/", "patch", f"/api/product/reviews/{self.review.id}/reply/", {"reply": "cảm ơn"}),
+            ("GET order/seller-orders/", "get", "/api/order/seller-orders/", None),
+            ("GET order/seller-order-detail/<id>/", "get", f"/api/order/seller-order-detail/{self.order.id}/", None),
+            ("GET order/seller-stats/", "get", "/api/order/seller-stats/", None),
+            ("GET account/notifications/", "get", "/api/account/notifications/", None),
+            ("GET account/notifications/unread-count/", "get", "/api/account/notifications/unread-count/", None),
+        ]
+
+    def measure(self, method, url, data):
+        with transaction.atomic(), CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, format="json")
+            transaction.set_rollback(True)
+        # Bỏ SAVEPOINT / RELEASE của transaction.atomic
+        queries = [q["sql"] for q in ctx.captured_queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE", "ROLLBACK"))]
+        identity = sum(1 for sql in queries if IDENTITY_QUERY.match(sql))
+        return response.status_code, len(queries), identity
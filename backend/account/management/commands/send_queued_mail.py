@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from account.mail import MAX_ATTEMPTS, send_queued_mail
+
+
+class Command(BaseCommand):
+    help = (
+        "Gửi các email đang chờ trong hàng đợi OutboundEmail theo lô, "
+        "mỗi lô dùng chung một kết nối SMTP. Mặc định chạy liên tục."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+        parser.add_argument("--interval", type=float, default=5, help="Số giây chờ khi hàng đợi trống")
+        parser.add_argument("--once", action="store_true", help="Gửi hết email đến hạn rồi thoát")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_mail(options["batch_size"], options["max_attempts"])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+            # Lô đầy thì gửi tiếp ngay, lô trống hoặc toàn lỗi thì nghỉ
+            if sent + failed == options["batch_size"] and sent:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:48
+
+import product.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0014_outboundemail'),
+    ]
+
+    operations = [
+        # Chỉ đổi storage của field, cột trong DB giữ nguyên nên không cần SQLite dựng lại bảng
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='profile',
+                    name='avatar',
+                    field=models.ImageField(blank=True, null=True, storage=product.storage.ContentAddressedStorage(), upload_to='avatars/'),
+                ),
+                migrations.AlterField(
+                    model_name='seller',
+                    name='banner',
+                    field=models.ImageField(blank=True, null=True, storage=product.storage.ContentAddressedStorage(), upload_to='seller/banners/'),
+                ),
+                migrations.AlterField(
+                    model_name='seller',
+                    name='logo',
+                    field=models.ImageField(blank=True, null=True, storage=product.storage.ContentAddressedStorage(), upload_to='seller/logos/'),
+                ),
+            ],
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from product.storage import content_storage
 
 class Profile(models.Model):
     ROLE_CHOICES = (
@@ -12,7 +14,7 @@ class Profile(models.Model):
 
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(blank=True)
-    avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    avatar = models.ImageField(upload_to='avatars/', storage=content_storage, null=True, blank=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='customer')
     phone_number = models.TextField(null=True) 
     fullname = models.TextField(null=True)
@@ -51,8 +53,8 @@ class Seller(models.Model):
     address = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_approved = models.BooleanField(default=False) 
-    logo = models.ImageField(upload_to='seller/logos/', blank=True, null=True)
-    banner = models.ImageField(upload_to='seller/banners/', blank=True, null=True)
+    logo = models.ImageField(upload_to='seller/logos/', storage=content_storage, blank=True, null=True)
+    banner = models.ImageField(upload_to='seller/banners/', storage=content_storage, blank=True, null=True)
     description = models.TextField(blank=True)
     email_contact = models.EmailField(blank=True)
     def __str__(self):
@@ -64,6 +66,16 @@ class Seller(models.Model):
         self.clean()  # gọi validate trước khi save
         super().save(*args, **kwargs)
     
+class NotificationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create không gửi post_save nên tự đẩy thông báo mới tới các stream
+        from .realtime import publish
+
+        created = super().bulk_create(objs, *args, **kwargs)
+        publish(created)
+        return created
+
+
 class Notification(models.Model):
     ROLE_CHOICES = (
         ("customer", "Customer"),
@@ -83,7 +95,100 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     link = models.CharField(max_length=255, null=True, blank=True)
+
+    objects = NotificationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at"], name="notification_user_created"),
+            models.Index(fields=["target_role", "created_at"], name="notification_role_created"),
+        ]
+
     def __str__(self):
         if self.user:
             return f"{self.user.username} - {self.title}"
-        return f"{self.target_role} - {self.title}"
\ No newline at end of file
+        return f"{self.target_role} - {self.title}"
+
+
+class NotificationRead(models.Model):
+    """Marks a role broadcast as read by one user.
+
+    Personal notifications keep using ``Notification.is_read``; broadcasts
+    are shared by every user of the role, so each reader gets a receipt.
+    """
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name="reads")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notification_reads")
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "notification"], name="unique_notification_read"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} đã đọc {self.notification_id}"
+
+
+class OutboundEmail(models.Model):
+    """Email waiting to be sent by the ``send_queued_mail`` worker."""
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbound_email_due"),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+class TokenVersion(models.Model):
+    """Version embedded as ``ver`` in access tokens (account/authentication.py).
+
+    It is bumped when anything the token claims (role, seller, staff flags,
+    active state, password) changes, so older tokens stop being accepted.
+    Not a foreign key: the row outlives a deleted user to revoke their tokens.
+    """
+    user_id = models.PositiveIntegerField(primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+    fingerprint = models.CharField(max_length=64)  # băm các giá trị trong token để biết khi nào cần tăng version
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at"], name="token_version_updated"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+
+class TokenUser(User):
+    """``request.user`` built from access token claims (account/authentication.py).
+
+    Only the claimed columns are loaded and they may be stale until the
+    revocation cache expires, so saving it could write old ``is_active`` /
+    staff flags back. Views that change the user reload it from the database.
+    """
+
+    class Meta:
+        proxy = True
+
+    def save(self, *args, **kwargs):
+        raise TypeError("TokenUser is built from token claims; reload the user from the database before saving.")
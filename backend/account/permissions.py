@@ -1,16 +1,20 @@
 from rest_framework.permissions import BasePermission
 
+from .identity import get_identity
+
+
 class IsAdminUser(BasePermission):
     def has_permission(self, request, view):
         return request.user and request.user.is_staff
 
 class IsSellerUser(BasePermission):
     def has_permission(self, request, view):
-        return hasattr(request.user, 'seller')
+        return get_identity(request).is_seller
 
 class IsCustomerUser(BasePermission):
     def has_permission(self, request, view):
-        return hasattr(request.user, 'profile') and not hasattr(request.user, 'seller')
+        identity = get_identity(request)
+        return identity.profile is not None and not identity.is_seller
 
 
 class IsStaffOrSuperUser(BasePermission):
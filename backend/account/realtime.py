@@ -0,0 +1,196 @@
+"""
+Push new notifications to connected browsers.
+
+``NotificationHub`` keeps the open streams of this process, keyed by user and
+by role. Creating a ``Notification`` publishes it through the configured
+broker once the transaction commits:
+
+* ``LocalBroker`` (default) hands it straight to this process's hub. Enough
+  for a single ASGI worker.
+* ``PostgresBroker`` sends it with ``pg_notify`` and every worker LISTENs on
+  the channel, so a notification created in one worker reaches streams held
+  by the others.
+
+Choose one with ``NOTIFICATION_BROKER`` in settings (a dotted path).
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BROKER = "account.realtime.LocalBroker"
+
+
+class Subscriber:
+    """One open stream: a queue living on the event loop that serves it."""
+
+    def __init__(self, user_id, role, max_pending=100):
+        self.user_id = user_id
+        self.role = role
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def push(self, payload):
+        # Client đọc chậm thì bỏ bớt, khi kết nối lại nó sẽ lấy bù theo Last-Event-ID
+        if not self.queue.full():
+            self.queue.put_nowait(payload)
+
+
+class NotificationHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_user = defaultdict(set)
+        self._by_role = defaultdict(set)
+
+    def subscribe(self, user_id, role):
+        subscriber = Subscriber(user_id, role)
+        with self._lock:
+            self._by_user[user_id].add(subscriber)
+            if role:
+                self._by_role[role].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._discard(self._by_user, subscriber.user_id, subscriber)
+            if subscriber.role:
+                self._discard(self._by_role, subscriber.role, subscriber)
+
+    @staticmethod
+    def _discard(index, key, subscriber):
+        subscribers = index.get(key)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del index[key]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._by_user.values())
+
+    def dispatch(self, payload):
+        """Deliver ``payload`` to matching streams. Safe to call from any thread."""
+        with self._lock:
+            if payload.get("user"):
+                targets = list(self._by_user.get(payload["user"], ()))
+            else:
+                targets = list(self._by_role.get(payload.get("target_role"), ()))
+        for subscriber in targets:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.push, payload)
+            except RuntimeError:
+                # Event loop đã đóng, stream sẽ tự hủy đăng ký
+                pass
+        return len(targets)
+
+
+hub = NotificationHub()
+
+
+class LocalBroker:
+    """Deliver notifications to streams held by this process only."""
+
+    def start(self):
+        pass
+
+    def publish(self, payload):
+        hub.dispatch(payload)
+
+
+class PostgresBroker:
+    """Fan notifications out to every worker with PostgreSQL LISTEN/NOTIFY."""
+
+    channel = "notifications"
+    # NOTIFY giới hạn payload 8000 byte
+    max_payload = 7900
+
+    def __init__(self):
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._listen, name="notification-listener", daemon=True).start()
+
+    def publish(self, payload):
+        message = json.dumps(payload, ensure_ascii=False, default=str)
+        if len(message.encode()) > self.max_payload:
+            message = json.dumps({key: payload.get(key) for key in ("id", "user", "target_role", "link", "created_at")}, default=str)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, message])
+
+    def _listen(self):
+        import psycopg2
+
+        db = settings.DATABASES["default"]
+        while True:
+            try:
+                conn = psycopg2.connect(
+                    dbname=db["NAME"], user=db["USER"], password=db["PASSWORD"],
+                    host=db["HOST"], port=db["PORT"],
+                )
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        hub.dispatch(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("Mất kết nối LISTEN thông báo, thử lại sau 5 giây")
+                threading.Event().wait(5)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker = import_string(getattr(settings, "NOTIFICATION_BROKER", DEFAULT_BROKER))()
+                broker.start()
+                _broker = broker
+    return _broker
+
+
+def notification_payload(notification):
+    return {
+        "id": notification.id,
+        "user": notification.user_id,
+        "target_role": notification.target_role,
+        "title": notification.title,
+        "message": notification.message,
+        "link": notification.link,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+def publish(notifications):
+    """Push ``notifications`` to open streams after the current transaction commits."""
+    payloads = [notification_payload(n) for n in notifications if n.pk]
+    if not payloads:
+        return
+
+    def send():
+        broker = get_broker()
+        for payload in payloads:
+            broker.publish(payload)
+
+    transaction.on_commit(send)
@@ -6,6 +6,7 @@ from .models import Profile, Seller, Notification
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Profile, Seller
+from product.images import ImageVariantsField
 
 # ----------------------------
 # Serializer đăng ký User
@@ -41,10 +42,11 @@ class ProfileSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.EmailField(source='user.email', read_only=True)
     avatar_url = serializers.SerializerMethodField()
+    avatar_variants = ImageVariantsField(source='avatar')
 
     class Meta:
         model = Profile
-        fields = ['id', 'bio', 'avatar_url', 'role', 'user', 'username', 'email','phone_number','fullname']
+        fields = ['id', 'bio', 'avatar_url', 'avatar_variants', 'role', 'user', 'username', 'email','phone_number','fullname']
 
     def get_avatar_url(self, obj):
         request = self.context.get('request')
@@ -72,7 +74,7 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
             instance.user.username = user_data['username']
         if 'email' in user_data:
             instance.user.email = user_data['email']
-        instance.user.save()
+        instance.user.save(update_fields=['username', 'email'])
 
         # Update Profile
         for attr, value in validated_data.items():
@@ -85,9 +87,11 @@ class SellerSerializer(serializers.ModelSerializer):
     total_products = serializers.IntegerField(read_only=True)
     avg_rating = serializers.FloatField(read_only=True)
     total_sold = serializers.IntegerField(read_only=True)
+    logo_variants = ImageVariantsField(source='logo')
+    banner_variants = ImageVariantsField(source='banner')
     class Meta:
         model = Seller
-        fields = ['id','username','shop_name', 'phone', 'address','user','is_approved','logo','banner','description','email_contact','total_products','avg_rating','total_sold']
+        fields = ['id','username','shop_name', 'phone', 'address','user','is_approved','logo','logo_variants','banner','banner_variants','description','email_contact','total_products','avg_rating','total_sold']
 
     def create(self, validated_data):
         
@@ -116,6 +120,12 @@ class AdminUserSerializer(serializers.ModelSerializer):
             'date_joined',
             'last_login']
 class NotificationSerializer(serializers.ModelSerializer):
+    # Thông báo gửi chung lấy trạng thái đọc từ biên nhận của user hiện tại
+    is_read = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
-        fields = "__all__"
\ No newline at end of file
+        fields = "__all__"
+
+    def get_is_read(self, obj):
+        return getattr(obj, "read", obj.is_read)
\ No newline at end of file
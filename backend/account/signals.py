@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from category.models import Category
+from order.models import Order
+from product.models import Product
+
+from .authentication import sync_token_version
+from .cache import admin_stats_cache, category_cache
+from .models import Notification, Profile, Seller
+from .realtime import publish
+
+
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Seller)
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_admin_stats(sender, **kwargs):
+    # Chờ commit để request khác không kịp cache lại dữ liệu cũ
+    transaction.on_commit(admin_stats_cache.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_categories(sender, **kwargs):
+    # Danh sách danh mục kèm số sản phẩm của từng danh mục
+    transaction.on_commit(category_cache.invalidate)
+
+
+@receiver(post_save, sender=Notification)
+def publish_notification(sender, instance, created, **kwargs):
+    if created:
+        publish([instance])
+
+
+@receiver([post_save, post_delete], sender=User)
+def sync_user_token_version(sender, instance, **kwargs):
+    sync_token_version(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+@receiver([post_save, post_delete], sender=Seller)
+def sync_owner_token_version(sender, instance, **kwargs):
+    # Đổi role / đăng ký bán hàng làm token cũ mang claim sai
+    sync_token_version(instance.user_id)
@@ -1,3 +1,403 @@
-from django.test import TestCase
+import asyncio
+import smtplib
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from category.models import Category
+from product.models import Product
+
+from .authentication import AccessToken as StatelessAccessToken, RefreshToken as StatelessRefreshToken, token_user
+from .mail import send_queued_mail
+from .models import Notification, NotificationRead, OutboundEmail, Profile, Seller, TokenVersion
+from .realtime import hub
+
+
+class AdminStatsCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get_stats(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/account/admin/stats/")
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_second_request_runs_no_queries(self):
+        _, first = self.get_stats()
+        data, second = self.get_stats()
+
+        self.assertGreater(first, 0)
+        self.assertEqual(second, 0)
+        self.assertEqual(data["cache"], {"hits": 1, "misses": 1})
+
+    def test_product_save_invalidates(self):
+        data, _ = self.get_stats()
+        self.assertEqual(data["total_products"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name="Mới", price=1)
+        data, queries = self.get_stats()
+
+        self.assertGreater(queries, 0)
+        self.assertEqual(data["total_products"], 1)
+
+
+class RequestIdentityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("shop", password="x")
+        Profile.objects.create(user=cls.user, role="seller")
+        cls.seller = Seller.objects.create(user=cls.user, shop_name="Shop")
+        cls.category = Category.objects.create(name="Đồ", slug="do")
+        cls.product = Product.objects.create(name="A", price=1, seller=cls.seller, category=cls.category)
+
+    def jwt_client(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        return client
+
+    def test_jwt_authentication_loads_profile_and_seller(self):
+        # 1 query xác thực (kèm profile, seller) + 1 query danh sách sản phẩm
+        with self.assertNumQueries(2):
+            response = self.jwt_client().get("/api/product/seller/")
+
+        self.assertEqual([p["id"] for p in response.data], [self.product.id])
+
+    def test_seller_resolved_once_per_write(self):
+        client = self.jwt_client()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(
+                "/api/product/", {"name": "B", "price": 5, "stock": 1, "category": self.category.id}, format="json",
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Product.objects.get(pk=response.data["id"]).seller, self.seller)
+        lookups = [q["sql"] for q in ctx.captured_queries if 'FROM "account_seller"' in q["sql"]]
+        self.assertEqual(lookups, [])
+
+    def test_forced_authentication_resolves_with_one_query(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.user.pk))
+
+        # 1 query profile + seller, 1 query danh sách sản phẩm
+        with self.assertNumQueries(2):
+            response = client.get("/api/product/seller/")
+        self.assertEqual(response.status_code, 200)
+
+        other = User.objects.create_user("customer")
+        client.force_authenticate(other)
+        self.assertEqual(client.get("/api/order/seller-orders/").status_code, 403)
+
+
+class StatelessJWTTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("shop", password="secret-123")
+        Profile.objects.create(user=cls.user, role="seller")
+        cls.seller = Seller.objects.create(user=cls.user, shop_name="Shop")
+        Product.objects.create(name="A", price=1, seller=cls.seller)
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return client
+
+    def test_login_token_carries_claims(self):
+        response = APIClient().post("/api/token/", {"username": "shop", "password": "secret-123"})
+
+        token = StatelessAccessToken(response.data["access"])
+        self.assertEqual(
+            (token["role"], token["seller_id"], token["is_staff"], token["ver"]),
+            ("seller", self.seller.id, False, TokenVersion.objects.get(user_id=self.user.id).version),
+        )
+
+    def test_requests_do_not_query_the_user(self):
+        client = self.client_for(StatelessAccessToken.for_user(self.user))
+        client.get("/api/product/seller/")  # nạp danh sách thu hồi vào cache
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get("/api/product/seller/")
+
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual([q["sql"] for q in ctx.captured_queries if '"auth_user"' in q["sql"]], [])
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_changed_claims_revoke_old_tokens_until_refresh(self):
+        refresh = StatelessRefreshToken.for_user(self.user)
+        client = self.client_for(refresh.access_token)
+        self.assertEqual(client.get("/api/order/seller-orders/").status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Seller.objects.filter(pk=self.seller.pk).get().delete()
+        response = client.get("/api/order/seller-orders/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["code"], "token_revoked")
+
+        access = APIClient().post("/api/token/refresh/", {"refresh": str(refresh)}).data["access"]
+        self.assertIsNone(StatelessAccessToken(access)["seller_id"])
+        self.assertEqual(self.client_for(access).get("/api/order/seller-orders/").status_code, 403)
+
+    def test_change_password_does_not_write_back_stale_claims(self):
+        client = self.client_for(StatelessAccessToken.for_user(self.user))
+        client.get("/api/product/seller/")  # nạp danh sách thu hồi vào cache
+        # Khóa tài khoản ở worker khác: danh sách thu hồi trong cache chưa biết
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = client.post(
+            "/api/account/change-password/", {"current_password": "secret-123", "new_password": "new-secret-456"}
+        )
+
+        self.assertEqual(response.status_code, 401)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(self.user.check_password("secret-123"))
+
+    def test_change_password_saves_only_the_password(self):
+        client = self.client_for(StatelessAccessToken.for_user(self.user))
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+
+        response = client.post(
+            "/api/account/change-password/", {"current_password": "secret-123", "new_password": "new-secret-456"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_staff)
+        self.assertTrue(self.user.check_password("new-secret-456"))
+
+    def test_token_user_cannot_be_saved(self):
+        user = token_user(StatelessAccessToken.for_user(self.user))
+
+        with self.assertRaises(TypeError):
+            user.save()
+
+    def test_token_user_str_is_username(self):
+        user = token_user(StatelessAccessToken.for_user(self.user))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(str(user), "shop")
+        version = TokenVersion.objects.get(user_id=self.user.id)
+        self.assertEqual(str(version), f"{self.user.id} v{version.version}")
+
+
+class NotificationReadStateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user("alice", password="x")
+        cls.bob = User.objects.create_user("bob", password="x")
+        for user in (cls.alice, cls.bob):
+            Profile.objects.create(user=user, role="customer")
+        cls.broadcast = Notification.objects.create(target_role="customer", title="Khuyến mãi", message="Giảm giá")
+        Notification.objects.create(target_role="seller", title="Seller", message="Chỉ cho seller")
+        cls.personal = Notification.objects.create(
+            user=cls.alice, target_role="customer", title="Đơn hàng", message="Đặt hàng thành công"
+        )
+        Notification.objects.create(user=cls.bob, target_role="customer", title="Đơn hàng", message="Của Bob")
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def unread(self, user):
+        return self.client_for(user).get("/api/account/notifications/unread-count/").data["unread_count"]
+
+    def test_only_own_and_role_broadcasts_are_visible(self):
+        response = self.client_for(self.alice).get("/api/account/notifications/")
+
+        self.assertEqual({n["id"] for n in response.data}, {self.broadcast.id, self.personal.id})
+        self.assertEqual(self.unread(self.alice), 2)
+
+    def test_broadcast_read_is_per_user(self):
+        response = self.client_for(self.alice).post(f"/api/account/notifications/{self.broadcast.id}/read/")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.unread(self.alice), 1)
+        self.assertEqual(self.unread(self.bob), 2)
+        self.broadcast.refresh_from_db()
+        self.assertFalse(self.broadcast.is_read)
+        listed = self.client_for(self.alice).get("/api/account/notifications/").data
+        self.assertTrue(next(n for n in listed if n["id"] == self.broadcast.id)["is_read"])
+
+    def test_mark_all_read_runs_one_update_and_one_insert(self):
+        client = self.client_for(self.alice)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post("/api/account/notifications/read-all/")
+
+        self.assertEqual(response.data["marked"], 2)
+        writes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith(("UPDATE", "INSERT"))]
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(self.unread(self.alice), 0)
+        self.assertEqual(self.unread(self.bob), 2)
+        self.assertEqual(NotificationRead.objects.filter(user=self.alice).count(), 1)
+
+        self.assertEqual(client.post("/api/account/notifications/read-all/").data["marked"], 0)
+
+
+class NotificationStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user("alice", password="x")
+        cls.bob = User.objects.create_user("bob", password="x")
+        for user in (cls.alice, cls.bob):
+            Profile.objects.create(user=user, role="customer")
+        cls.earlier = Notification.objects.create(user=cls.alice, target_role="customer", title="Cũ", message="Cũ")
+
+    async def open_stream(self, user, **headers):
+        response = await self.async_client.get(
+            "/api/account/notifications/stream/", {"token": str(AccessToken.for_user(user))}, headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        return stream
+
+    async def close(self, stream):
+        # Giống khi client ngắt kết nối: ASGI handler hủy task đang chờ sự kiện
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+
+    def notify(self, *notifications):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.bulk_create(list(notifications))
+
+    async def test_pushes_only_visible_new_notifications(self):
+        stream = await self.open_stream(self.alice)
+
+        await sync_to_async(self.notify)(
+            Notification(user=self.bob, target_role="customer", title="Bob", message="của Bob"),
+            Notification(target_role="seller", title="Seller", message="cho seller"),
+            Notification(target_role="customer", title="Khuyến mãi", message="Giảm giá"),
+        )
+        event = await asyncio.wait_for(anext(stream), 1)
+
+        # Thông báo của Bob và của seller bị bỏ qua, sự kiện đầu tiên là khuyến mãi
+        self.assertIn(b"event: notification", event)
+        self.assertIn("Giảm giá".encode(), event)
+        await self.close(stream)
+        self.assertEqual(hub.subscriber_count(), 0)
+
+    async def test_replays_missed_notifications_after_last_event_id(self):
+        missed = await sync_to_async(Notification.objects.create)(
+            user=self.alice, target_role="customer", title="Mới", message="Bỏ lỡ"
+        )
+
+        stream = await self.open_stream(self.alice, last_event_id=str(self.earlier.id))
+        event = await anext(stream)
+
+        self.assertTrue(event.startswith(f"id: {missed.id}\n".encode()))
+        await self.close(stream)
+
+    async def test_rejects_missing_token(self):
+        response = await self.async_client.get("/api/account/notifications/stream/")
+        self.assertEqual(response.status_code, 401)
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+    # (số atomic block đang mở, trạng thái các email trong DB) lúc gửi
+    sends = []
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        CountingBackend.sends.append(
+            (len(connection.atomic_blocks), set(OutboundEmail.objects.values_list("status", flat=True)))
+        )
+        if any("bad" in address for message in messages for address in message.to):
+            raise smtplib.SMTPRecipientsRefused({})
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND="account.tests.CountingBackend")
+class OutboundEmailQueueTests(TestCase):
+    def setUp(self):
+        CountingBackend.opened = 0
+        CountingBackend.sends = []
+
+    def queue(self, *addresses):
+        for address in addresses:
+            OutboundEmail.objects.create(subject="Xin chào", body="Nội dung", from_email="shop@example.com", to=[address])
+
+    def test_signup_only_enqueues(self):
+        response = APIClient().post("/api/account/register/", {
+            "username": "moi", "password": "matkhau123", "email": "moi@example.com",
+        }, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(CountingBackend.opened, 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.to, ["moi@example.com"])
+        self.assertIn("/api/account/activate/", queued.body)
+
+    def test_batch_uses_one_connection(self):
+        self.queue(*[f"user{i}@example.com" for i in range(5)])
+
+        self.assertEqual(send_queued_mail(batch_size=10), (5, 0))
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertFalse(OutboundEmail.objects.filter(status="pending").exists())
+
+    def test_failed_message_is_retried_with_backoff(self):
+        self.queue("ok@example.com", "bad@example.com")
+
+        self.assertEqual(send_queued_mail(max_attempts=2), (1, 1))
+        failed = OutboundEmail.objects.get(to=["bad@example.com"])
+        self.assertEqual((failed.status, failed.attempts), ("pending", 1))
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+        self.assertEqual(send_queued_mail(max_attempts=2), (0, 0))
+
+        OutboundEmail.objects.filter(pk=failed.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(send_queued_mail(max_attempts=2), (0, 1))
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.attempts), ("failed", 2))
+
+    def test_sends_outside_the_claim_transaction(self):
+        self.queue("a@example.com", "b@example.com")
+        # TestCase tự bọc mỗi test trong các atomic block này
+        outer = len(connection.atomic_blocks)
+
+        self.assertEqual(send_queued_mail(), (2, 0))
+
+        self.assertEqual(CountingBackend.sends, [(outer, {"sending"})] * 2)
+        self.assertEqual(set(OutboundEmail.objects.values_list("status", flat=True)), {"sent"})
+
+    def test_expired_claim_is_sent_again(self):
+        self.queue("a@example.com", "b@example.com")
+        stale, claimed = OutboundEmail.objects.order_by("id")
+        OutboundEmail.objects.filter(pk=stale.pk).update(status="sending", next_attempt_at=timezone.now() - timedelta(seconds=1))
+        OutboundEmail.objects.filter(pk=claimed.pk).update(status="sending", next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(send_queued_mail(), (1, 0))
+
+        self.assertEqual([message.to for message in mail.outbox], [["a@example.com"]])
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, "sending")
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProfileViewSet, RegisterViewSet, SellerRegisterView, AdminOrderViewSet, AdminProductViewSet, AdminReviewViewSet, AdminUserViewSet, AdminStatsView , CurrentUserView, change_password, activate, GoogleAuthView, AdminSellerViewSet, NotificationViewSet
+from .views import ProfileViewSet, RegisterViewSet, SellerRegisterView, AdminOrderViewSet, AdminProductViewSet, AdminReviewViewSet, AdminUserViewSet, AdminStatsView , CurrentUserView, change_password, activate, GoogleAuthView, AdminSellerViewSet, NotificationViewSet, notification_stream
 
 router = DefaultRouter()
 router.register(r'profiles', ProfileViewSet, basename='profile')
@@ -15,6 +15,8 @@ router.register(r'admin/orders', AdminOrderViewSet, basename='admin-orders')
 router.register(r'admin/reviews', AdminReviewViewSet, basename='admin-reviews')
 router.register(r'admin/sellers', AdminSellerViewSet, basename='admin-sellers')
 urlpatterns = [
+    # Đặt trước router để "stream" không bị hiểu là id thông báo
+    path("notifications/stream/", notification_stream, name="notification-stream"),
     path('', include(router.urls)),
     path("admin/stats/", AdminStatsView.as_view(), name="admin-stats"),
     path("me/", CurrentUserView.as_view(), name="current-user"),
@@ -1,34 +1,50 @@
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.contrib.auth.models import User
-from .models import Profile, Seller, Notification
+from .models import Profile, Seller, Notification, NotificationRead
 from .serializers import ProfileSerializer, UserSerializer, AdminUserSerializer , ProfileUpdateSerializer, SellerSerializer, NotificationSerializer
-from django.db.models import Q
+from django.db.models import Q, OuterRef, Subquery, Exists, Case, When, BooleanField
+from django.db.models.functions import Coalesce
+from django.db import transaction
 from rest_framework.permissions import IsAdminUser
 from rest_framework import generics, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from category.models import Category
 from product.models import Product, Review
-from order.models import Order, OrderItem
+from order.models import Order, OrderItem, DailySalesRollup, OrderStatusCount
 from order.serializers import OrderSerializer
+from order.views import ORDER_EXPORT_COLUMNS, filter_orders
 from product.serializers import ProductSerializer, ReviewSerializer
+from product.views import ProductQuerysetMixin, filter_products
+from product.exports import EXPORT_RENDERERS, PRODUCT_EXPORT_COLUMNS, export_response
+from product.pagination import KeysetPagination
+from product.images import with_derivatives
 from django.db.models.functions import TruncMonth
 from django.db.models import Count, Sum, F, Func, Value
 from .serializers import AdminUserSerializer
 from .permissions import IsStaffOrSuperUser
+from .cache import admin_stats_cache
+from .identity import Identity, get_identity
 from rest_framework.decorators import action
 from rest_framework.decorators import api_view, permission_classes
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
-from django.core.mail import send_mail
+from .mail import enqueue_mail
 from django.urls import reverse
 from django.conf import settings
 from .token import account_activation_token
 from django.db.models.functions import TruncMonth
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import JWTAuthentication, RefreshToken
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework.exceptions import AuthenticationFailed
+from django.http import JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+import asyncio
+import json
+from .realtime import get_broker, hub, notification_payload
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 from django.db.models import Avg, Count
@@ -47,7 +63,10 @@ class ProfileViewSet(viewsets.ModelViewSet):
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def change_password(request):
-    user = request.user
+    # request.user dựng từ claim của token (có thể đã cũ), nên đọc lại user từ DB trước khi ghi
+    user = User.objects.get(pk=request.user.pk)
+    if not user.is_active:
+        raise AuthenticationFailed("Tài khoản đã bị khóa", code="user_inactive")
     current_password = request.data.get("current_password")
     new_password = request.data.get("new_password")
 
@@ -55,13 +74,14 @@ def change_password(request):
         return Response({"detail": "Mật khẩu hiện tại không đúng"}, status=status.HTTP_400_BAD_REQUEST)
 
     user.set_password(new_password)
-    user.save()
+    user.save(update_fields=["password"])
     return Response({"detail": "Đổi mật khẩu thành công"})
 class RegisterViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -84,14 +104,8 @@ class RegisterViewSet(viewsets.ModelViewSet):
         {activation_link}
         """
 
-        # Gửi email
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,  # Gmail chung
-            [user.email],                 # Gmail user nhập khi đăng ký
-            fail_silently=False,
-        )
+        # Đưa vào hàng đợi, worker send_queued_mail sẽ gửi qua SMTP
+        enqueue_mail(subject, message, [user.email])
 
         return Response(
             {"detail": "Đăng ký thành công. Vui lòng kiểm tra email để xác nhận."},
@@ -177,14 +191,16 @@ class SellerRegisterView(viewsets.ModelViewSet):
     
     def get_queryset(self):
         return (
-            Seller.objects.all()
+            with_derivatives(Seller.objects.all(), "logo", "banner")
             .annotate(
                 total_products=Count("products", filter=Q(products__is_active=True),distinct=True),
                 avg_rating=Avg("products__reviews__rating"),
-                total_sold=Sum(
-                    "products__order_items__quantity",
-                    filter=Q(products__order_items__order__status="delivered")
-                )
+                total_sold=Coalesce(Subquery(
+                    Product.objects.filter(seller=OuterRef("pk"))
+                    .values("seller")
+                    .annotate(sold=Sum("total_sold"))
+                    .values("sold")
+                ), 0),
             )
         )
 
@@ -218,10 +234,19 @@ class AdminUserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 # ================== ADMIN PRODUCT ==================
-class AdminProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+class AdminProductViewSet(ProductQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = [IsStaffOrSuperUser]
+    list_deferred_fields = ('search_vector',)
+
+    def get_queryset(self):
+        return filter_products(self.get_product_queryset(), self.request.query_params)
+
+    @action(detail=False, methods=["get"], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """Every product (filtered like the list) as CSV or JSONL, with the shop name."""
+        columns = {**PRODUCT_EXPORT_COLUMNS, "shop_name": "seller__shop_name"}
+        return export_response(request, self.get_queryset().order_by("id"), columns, "products")
 
     @action(detail=True, methods=["post"])
     def approve(self, request, pk=None):
@@ -253,16 +278,30 @@ class AdminProductViewSet(viewsets.ModelViewSet):
 
 # ================== ADMIN ORDER ==================
 class AdminOrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsStaffOrSuperUser]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return filter_orders(Order.objects.with_items().order_by("-created_at", "-id"), self.request.query_params)
+
+    @action(detail=False, methods=["get"], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """One row per order line of the filtered orders, as CSV or JSONL."""
+        items = OrderItem.objects.filter(order__in=self.get_queryset()).order_by("order_id", "id")
+        columns = {**ORDER_EXPORT_COLUMNS, "shop_name": "order__seller__shop_name"}
+        return export_response(request, items, columns, "orders")
 
     # PATCH/PUT toàn bộ đơn hàng
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         order = self.get_object()
+        previous_status = order.status
         serializer = self.get_serializer(order, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        updated_status = serializer.validated_data.get('status', previous_status)
+        order.apply_status_change(previous_status)
         Notification.objects.create(
             user=order.user,
             target_role="customer",
@@ -298,11 +337,11 @@ class AdminOrderViewSet(viewsets.ModelViewSet):
             return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
 
 class AdminReviewViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.all()
+    queryset = with_derivatives(Review.objects.all(), "image")
     serializer_class = ReviewSerializer
     permission_classes = [IsStaffOrSuperUser]
 class AdminSellerViewSet(viewsets.ModelViewSet):
-    queryset = Seller.objects.all()
+    queryset = with_derivatives(Seller.objects.all(), "logo", "banner")
     serializer_class = SellerSerializer
     permission_classes = [IsStaffOrSuperUser]
 
@@ -339,6 +378,10 @@ class AdminStatsView(APIView):
 
     def get(self, request):
         today = now().date()
+        data = admin_stats_cache.get_or_build(lambda: self.build_stats(today), today)
+        return Response({**data, "cache": admin_stats_cache.counters()})
+
+    def build_stats(self, today):
 
         # --------------------------
         # Tổng số
@@ -346,22 +389,21 @@ class AdminStatsView(APIView):
         total_users = User.objects.count()
         total_sellers = Seller.objects.count()
         total_products = Product.objects.count()
-        total_orders = Order.objects.count()
-        revenue = (
-            Order.objects.filter(status="delivered").aggregate(Sum("total_price"))[
-                "total_price__sum"
-            ]
-            or 0
-        )
+        # order_count của bảng tổng hợp đếm mỗi đơn một lần, cộng qua các danh mục vẫn đúng
+        delivered = DailySalesRollup.objects.aggregate(total=Sum("revenue"), orders=Sum("order_count"))
+        revenue = delivered["total"] or 0
 
         # --------------------------
         # Đơn hàng theo trạng thái
         # --------------------------
-        order_status = (
-            Order.objects.values("status")
-            .annotate(count=Count("id"))
+        # Từ bộ đếm OrderStatusCount thay vì đếm bảng Order
+        order_status = list(
+            OrderStatusCount.objects.values("status")
+            .annotate(count=Sum("count"))
+            .filter(count__gt=0)
             .order_by("status")
         )
+        total_orders = sum(row["count"] for row in order_status)
 
         # --------------------------
         # Sản phẩm theo category
@@ -399,33 +441,27 @@ class AdminStatsView(APIView):
         )
 
         # --------------------------
-        # Doanh thu (ngày / tuần / tháng)
+        # Doanh thu (ngày / tuần / tháng) từ bảng tổng hợp DailySalesRollup
         # --------------------------
         revenue_by_day = (
-            Order.objects.filter(status="delivered")
-            .annotate(day=TruncDay("created_at"))
-            .values("day")
-            .annotate(total=Sum("total_price"))
+            DailySalesRollup.objects.values(day=F("date"))
+            .annotate(total=Sum("revenue"))
             .order_by("day")
         )
 
         revenue_by_week = (
-            Order.objects.filter(
-                status="delivered",
-                created_at__month=today.month,
-                created_at__year=today.year,
-            )
-            .annotate(week=TruncWeek("created_at"))
+            DailySalesRollup.objects.filter(date__gte=today.replace(day=1))
+            .annotate(week=TruncWeek("date"))
             .values("week")
-            .annotate(total=Sum("total_price"))
+            .annotate(total=Sum("revenue"))
             .order_by("week")
         )
 
         revenue_by_month = (
-            Order.objects.filter(status="delivered", created_at__year=today.year)
-            .annotate(month=TruncMonth("created_at"))
+            DailySalesRollup.objects.filter(date__gte=today.replace(month=1, day=1))
+            .annotate(month=TruncMonth("date"))
             .values("month")
-            .annotate(total=Sum("total_price"))
+            .annotate(total=Sum("revenue"))
             .order_by("month")
         )
 
@@ -438,7 +474,8 @@ class AdminStatsView(APIView):
             "total_products": total_products,
             "total_orders": total_orders,
             "revenue": revenue,
-            "orderStatus": list(order_status),
+            "delivered_orders": delivered["orders"] or 0,
+            "orderStatus": order_status,
             "productCategories": list(product_categories),
 
             # User growth
@@ -470,22 +507,146 @@ class AdminStatsView(APIView):
             ],
         }
 
-        return Response(data)
+        return data
+
+def visible_notifications_q(user, role):
+    # Thông báo riêng của user và thông báo gửi chung (không có user) cho role của user
+    visible = Q(user=user)
+    if role:
+        visible |= Q(user__isnull=True, target_role=role)
+    return visible
+
+
+READ_RECEIPT_BATCH_SIZE = 500
+
 
 class NotificationViewSet(viewsets.ModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
-    def get_queryset(self):
-        user = self.request.user
+    def visible_notifications(self):
+        identity = get_identity(self.request)
+        queryset = Notification.objects.filter(visible_notifications_q(identity.user, identity.notification_role))
 
-        if user.is_superuser or user.is_staff:
-            role = "admin"
-        elif hasattr(user, "profile"):
-            role = user.profile.role
+        # Mỗi trang (khách hàng, seller, admin) chỉ hiện thông báo của nó
+        target_role = self.request.query_params.get("target_role")
+        if target_role:
+            queryset = queryset.filter(target_role=target_role)
+        return queryset
+
+    def read_receipts(self):
+        return NotificationRead.objects.filter(notification=OuterRef("pk"), user=self.request.user)
+
+    def get_queryset(self):
+        return self.visible_notifications().annotate(
+            read=Case(
+                When(user__isnull=True, then=Exists(self.read_receipts())),
+                default=F("is_read"),
+                output_field=BooleanField(),
+            )
+        ).order_by("-created_at", "-id")
+
+    @action(detail=False, methods=["get"], url_path="unread-count")
+    def unread_count(self, request):
+        count = self.visible_notifications().filter(
+            Q(user__isnull=False, is_read=False)
+            | Q(user__isnull=True) & ~Exists(self.read_receipts())
+        ).count()
+        return Response({"unread_count": count})
+
+    @action(detail=True, methods=["post"], url_path="read")
+    def mark_read(self, request, pk=None):
+        notification = self.get_object()
+        if notification.user_id:
+            Notification.objects.filter(pk=notification.pk).update(is_read=True)
         else:
-            role = None
+            NotificationRead.objects.get_or_create(notification=notification, user=request.user)
+        return Response({"detail": "Đã đánh dấu đã đọc"})
+
+    @action(detail=False, methods=["post"], url_path="read-all")
+    def mark_all_read(self, request):
+        visible = self.visible_notifications()
+        with transaction.atomic():
+            updated = visible.filter(user=request.user, is_read=False).update(is_read=True)
+
+            # Ghi biên nhận cho mọi thông báo chung chưa đọc; trùng (đọc song song) thì bỏ qua
+            unread = visible.filter(user__isnull=True).exclude(Exists(self.read_receipts()))
+            receipts = [
+                NotificationRead(notification_id=pk, user_id=request.user.pk)
+                for pk in unread.values_list("pk", flat=True)
+            ]
+            NotificationRead.objects.bulk_create(receipts, ignore_conflicts=True, batch_size=READ_RECEIPT_BATCH_SIZE)
+        return Response({"marked": updated + len(receipts)})
+
+
+STREAM_HEARTBEAT_SECONDS = 15
+
+
+def _stream_user(request):
+    # EventSource không gửi được header Authorization nên token đi qua query string
+    authenticator = JWTAuthentication()
+    raw_token = request.GET.get("token")
+    if not raw_token:
+        return None, None
+    try:
+        token = authenticator.get_validated_token(raw_token)
+        user = authenticator.get_user(token)
+    except (InvalidToken, AuthenticationFailed):
+        return None, None
+    return user, Identity(user, token).notification_role
 
-        return Notification.objects.filter(
-            Q(user=user) | Q(target_role=role)
-        ).order_by("-created_at")
\ No newline at end of file
+
+def _missed_notifications(user, role, last_id):
+    return [
+        notification_payload(notification)
+        for notification in Notification.objects.filter(
+            visible_notifications_q(user, role), id__gt=last_id
+        ).order_by("id")[:50]
+    ]
+
+
+def _sse_event(payload):
+    data = json.dumps(payload, ensure_ascii=False, default=str)
+    return f"id: {payload['id']}\nevent: notification\ndata: {data}\n\n"
+
+
+async def notification_stream(request):
+    """Server-Sent Events stream of new notifications for the token's user.
+
+    Holds the connection open and only touches the database when it opens
+    (auth, plus missed notifications after ``Last-Event-ID``). Needs an ASGI
+    server such as uvicorn or daphne; runserver would tie up a thread per
+    client.
+    """
+    user, role = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({"detail": "Token không hợp lệ"}, status=401)
+
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_id") or ""
+    get_broker()
+
+    async def events():
+        subscriber = hub.subscribe(user.pk, role)
+        try:
+            yield "retry: 5000\n\n"
+            sent_up_to = 0
+            if last_id.isdigit():
+                for payload in await sync_to_async(_missed_notifications)(user, role, int(last_id)):
+                    sent_up_to = payload["id"]
+                    yield _sse_event(payload)
+            while True:
+                try:
+                    payload = await asyncio.wait_for(subscriber.queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if payload["id"] > sent_up_to:
+                    yield _sse_event(payload)
+        finally:
+            hub.unsubscribe(subscriber)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
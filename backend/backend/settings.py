@@ -51,7 +51,7 @@ INSTALLED_APPS = [
 REST_USE_JWT = True 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'account.authentication.JWTAuthentication',  # không query user, xem account/authentication.py
     ),
      "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"]
 }
@@ -93,6 +93,9 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,                    # cấp refresh mới khi refresh
     "BLACKLIST_AFTER_ROTATION": True,                 # revoke refresh cũ khi rotate
     "AUTH_HEADER_TYPES": ("Bearer",),
+    # Token kèm role, seller_id, ... để xác thực không cần query user
+    "TOKEN_OBTAIN_SERIALIZER": "account.authentication.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "account.authentication.TokenRefreshSerializer",
 }
 
 # Database
@@ -110,6 +113,21 @@ DATABASES = {
 }
 
 
+# Cache
+# Mặc định dùng bộ nhớ trong process; khi chạy nhiều worker có thể chuyển sang Redis:
+# 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'myshop',
+    }
+}
+
+# Cách đẩy thông báo mới tới các stream SSE. LocalBroker đủ cho một worker ASGI;
+# chạy nhiều worker thì dùng "account.realtime.PostgresBroker" (LISTEN/NOTIFY)
+NOTIFICATION_BROKER = "account.realtime.LocalBroker"
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -147,6 +165,14 @@ USE_TZ = True
 STATIC_URL = 'static/'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Giao file media cho proxy phía trước thay vì đọc trong Python:
+# None (Django tự gửi), "nginx" (X-Accel-Redirect) hoặc "sendfile" (X-Sendfile)
+MEDIA_ACCEL = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 3600
+# Ảnh thu nhỏ do worker "manage.py build_image_derivatives --watch" tạo theo hàng đợi;
+# True = tạo ngay sau khi upload commit, trong process web (chỉ dùng khi dev)
+IMAGE_DERIVATIVES_INLINE = False
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
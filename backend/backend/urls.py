@@ -15,13 +15,16 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.conf import settings
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import permissions
-from django.conf.urls.static import static
+from product.media import serve_media
 
 class APIRootView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -48,4 +51,6 @@ urlpatterns = [
     
   
 ]
-urlpatterns += static('media/', document_root='media/') 
+urlpatterns += [
+    re_path(rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>.+)$", serve_media, name="media"),
+] 
@@ -3,6 +3,12 @@ from django.db import models
 from product.models import Product
 from django.contrib.auth.models import User
 
+class CartItemQuerySet(models.QuerySet):
+    def with_product(self):
+        # Lấy sản phẩm, danh mục và shop của từng dòng trong cùng một query
+        return self.select_related('product__category', 'product__seller')
+
+
 class CartItem(models.Model):
     """
     Represents an item in a user's cart.
@@ -11,6 +17,9 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cart_items')
     quantity = models.PositiveIntegerField(default=1)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         unique_together = ('cart', 'product')
         verbose_name = "Cart Item"
@@ -20,6 +29,11 @@ class CartItem(models.Model):
     def __str__(self):
         return f"{self.product.name} (x{self.quantity}) in {self.cart.user.username}'s cart"
 
+class CartQuerySet(models.QuerySet):
+    def with_items(self):
+        return self.prefetch_related(models.Prefetch('items', queryset=CartItem.objects.with_product()))
+
+
 class Cart(models.Model):
     """
     Represents a user's shopping cart.
@@ -27,8 +41,12 @@ class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CartQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.username}'s cart - {self.items.count()} items"
 
     def total_price(self):
-        return sum(item.product.price * item.quantity for item in self.items.all())
\ No newline at end of file
+        # Dùng giá sau giảm; với with_items() các dòng đã được tải sẵn nên không tốn thêm query
+        return sum(item.product.get_final_price() * item.quantity for item in self.items.all())
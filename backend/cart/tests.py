@@ -1,3 +1,68 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from account.models import Seller
+from category.models import Category
+from product.models import Product
+
+from .models import Cart, CartItem
+
+
+class CartQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("customer", password="x")
+        seller = Seller.objects.create(user=User.objects.create_user("seller", password="x"), shop_name="Shop")
+        category = Category.objects.create(name="Sách", slug="sach")
+        cls.products = Product.objects.bulk_create([
+            Product(name=f"Sách {i}", price=100, stock=100, category=category, seller=seller)
+            for i in range(200)
+        ])
+        cls.cart = Cart.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def fill_cart(self, lines):
+        CartItem.objects.all().delete()
+        CartItem.objects.bulk_create([
+            CartItem(cart=self.cart, product=product, quantity=2) for product in self.products[:lines]
+        ])
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_query_count_is_flat_for_1_to_200_lines(self):
+        for url in ("/api/cart/carts/", "/api/cart/cart-items/"):
+            counts = {}
+            for lines in (1, 20, 200):
+                self.fill_cart(lines)
+                _, counts[lines] = self.count_queries(url)
+            self.assertEqual(counts[1], counts[200], url)
+            self.assertEqual(counts[20], counts[200], url)
+
+    def test_total_uses_discounted_price(self):
+        now = timezone.now()
+        discounted = self.products[0]
+        discounted.discount_percent = 10
+        discounted.discount_start = now - timedelta(days=1)
+        discounted.discount_end = now + timedelta(days=1)
+        discounted.save()
+        self.fill_cart(3)
+
+        data, _ = self.count_queries("/api/cart/carts/")
+        cart = data["results"][0] if isinstance(data, dict) else data[0]
 
-# Create your tests here.
+        self.assertEqual(len(cart["items"]), 3)
+        self.assertEqual(Decimal(str(cart["total_price"])), Decimal("580"))
@@ -12,15 +12,14 @@ class CartViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        return Cart.objects.with_items().filter(user=self.request.user)
 
 class CartItemViewSet(viewsets.ModelViewSet):
     serializer_class = CartItemSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        cart, _ = Cart.objects.get_or_create(user=self.request.user)
-        return CartItem.objects.filter(cart=cart)
+        return CartItem.objects.with_product().filter(cart__user=self.request.user)
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -36,11 +35,11 @@ class CartItemViewSet(viewsets.ModelViewSet):
         quantity = request.data.get('quantity', 1)
 
         try:
-            product = Product.objects.get(id=product_id)
+            product = Product.objects.select_related('category', 'seller').get(id=product_id)
             quantity = int(quantity)
         except (Product.DoesNotExist, ValueError):
             return Response({'error': 'Invalid product or quantity'}, status=status.HTTP_400_BAD_REQUEST)
-        if product.stock < quantity:
+        if product.available_stock < quantity:
             return Response({'error': 'Số lượng sản phẩm vượt quá tồn kho'}, status=status.HTTP_400_BAD_REQUEST)
         cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
         
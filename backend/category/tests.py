@@ -1,3 +1,52 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from product.models import Product
+
+from .models import Category
+
+
+class CategoryCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.phones = Category.objects.create(name="Phones", slug="phones")
+        cls.books = Category.objects.create(name="Books", slug="books")
+        Product.objects.create(name="A", price=1, category=cls.phones)
+        Product.objects.create(name="B", price=1, category=cls.phones)
+        Product.objects.create(name="C", price=1, category=cls.phones, is_active=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_is_cached_with_product_counts(self):
+        first = APIClient().get("/api/category/categories/")
+        with self.assertNumQueries(0):
+            second = APIClient().get("/api/category/categories/")
+
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(
+            [(c["name"], c["product_count"]) for c in second.json()], [("Phones", 2), ("Books", 0)]
+        )
+        self.assertIn("no-cache", second["Cache-Control"])
+        self.assertIn("Last-Modified", second)
+
+    def test_matching_etag_gets_304(self):
+        etag = APIClient().get("/api/category/categories/")["ETag"]
+
+        response = APIClient().get("/api/category/categories/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_category_change_invalidates(self):
+        etag = APIClient().get("/api/category/categories/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.books.name = "Sách"
+            self.books.save()
+        response = APIClient().get("/api/category/categories/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()[1]["name"], "Sách")
@@ -1,9 +1,43 @@
+import hashlib
+import json
+import time
+
+from django.db.models import Count, Q
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from rest_framework import viewsets
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from account.cache import category_cache
+
 from .models import Category
 from .serializers import CategorySerializer
-from rest_framework.permissions import AllowAny
+
+
+def build_catalog():
+    """Every category with its active product count, plus the ETag and build time of the list."""
+    categories = Category.objects.annotate(
+        product_count=Count('products', filter=Q(products__is_active=True))
+    ).order_by('id')
+    data = [dict(item) for item in CategorySerializer(categories, many=True).data]
+    etag = hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    return {"categories": data, "etag": f'"{etag}"', "last_modified": int(time.time())}
+
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+
+    def list(self, request, *args, **kwargs):
+        # Danh sách lấy từ cache, xóa khi Category/Product thay đổi (account/signals.py);
+        # trình duyệt luôn hỏi lại bằng ETag và nhận 304 nếu không có gì mới
+        catalog = category_cache.get_or_build(build_catalog)
+        response = Response(catalog["categories"])
+        response["ETag"] = catalog["etag"]
+        response["Last-Modified"] = http_date(catalog["last_modified"])
+        patch_cache_control(response, public=True, no_cache=True)
+        return get_conditional_response(
+            request, etag=catalog["etag"], last_modified=catalog["last_modified"], response=response,
+        )
@@ -0,0 +1,94 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from account.models import Seller
+from order.models import DailySalesRollup, Order, OrderItem, OrderStatusCount
+from order.views import SellerStatsView
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo số query và độ trễ của SellerStatsView trên dữ liệu giả lập. "
+        "Dữ liệu được tạo trong một transaction và rollback khi kết thúc."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=100_000)
+        parser.add_argument("--items-per-order", type=int, default=4)
+        parser.add_argument("--days", type=int, default=400)
+        parser.add_argument("--runs", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.seed(options)
+            self.measure(user, options["runs"])
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        user = User.objects.create_user("bench-seller-stats")
+        seller = Seller.objects.create(user=user, shop_name="Bench shop")
+        customer = User.objects.create_user("bench-seller-stats-customer")
+        products = Product.objects.bulk_create(
+            Product(name=f"Bench {i}", price=1000 + i, stock=10**6, seller=seller)
+            for i in range(50)
+        )
+
+        per_order = options["items_per_order"]
+        statuses = ["delivered", "delivered", "delivered", "pending", "canceled"]
+        orders = Order.objects.bulk_create(
+            (
+                Order(user=customer, seller=seller, status=statuses[i % len(statuses)], address="bench")
+                for i in range(options["items"] // per_order)
+            ),
+            batch_size=5000,
+        )
+        OrderItem.objects.bulk_create(
+            (
+                OrderItem(order=order, product=products[(i + j) % len(products)], quantity=1 + j, price=1000)
+                for i, order in enumerate(orders)
+                for j in range(per_order)
+            ),
+            batch_size=5000,
+        )
+
+        # auto_now_add bỏ qua giá trị truyền vào, nên rải lại created_at theo ngày
+        today = now()
+        days = options["days"]
+        for offset in range(days):
+            Order.objects.filter(pk__in=[o.pk for o in orders[offset::days]]).update(
+                created_at=today - timedelta(days=offset)
+            )
+        DailySalesRollup.rebuild()
+        OrderStatusCount.rebuild()
+        self.stdout.write(f"Seeded {len(orders)} orders / {len(orders) * per_order} order items")
+        return user
+
+    def measure(self, user, runs):
+        factory = APIRequestFactory()
+        view = SellerStatsView.as_view()
+        timings = []
+        for _ in range(runs):
+            request = factory.get("/api/order/seller-stats/")
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = view(request)
+                timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.data
+
+        timings.sort()
+        self.stdout.write(
+            f"queries={len(ctx.captured_queries)} "
+            f"median={statistics.median(timings):.1f}ms "
+            f"p95={timings[int(len(timings) * 0.95) - 1]:.1f}ms "
+            f"min={timings[0]:.1f}ms"
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from order.models import DailySalesRollup, OrderStatusCount
+
+
+class Command(BaseCommand):
+    help = "Xây lại bảng DailySalesRollup từ toàn bộ đơn hàng đã giao và bộ đếm OrderStatusCount."
+
+    def handle(self, *args, **options):
+        rows = DailySalesRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Đã tạo {rows} dòng tổng hợp doanh thu."))
+        rows = OrderStatusCount.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Đã tạo {rows} dòng đếm đơn theo trạng thái."))
@@ -0,0 +1,67 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    OrderItem = apps.get_model('order', 'OrderItem')
+    DailySalesRollup = apps.get_model('order', 'DailySalesRollup')
+    rows = (
+        OrderItem.objects.filter(order__status='delivered')
+        .values(
+            day=TruncDate('order__created_at'),
+            seller_key=F('order__seller'),
+            category_key=F('product__category'),
+        )
+        .annotate(
+            revenue=Sum(F('price') * F('quantity')),
+            units=Sum('quantity'),
+            orders=Count('order', distinct=True),
+        )
+        .order_by()
+    )
+    DailySalesRollup.objects.bulk_create(
+        [
+            DailySalesRollup(
+                date=row['day'],
+                seller_id=row['seller_key'],
+                category_id=row['category_key'],
+                revenue=row['revenue'],
+                order_count=row['orders'],
+                units_sold=row['units'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0012_notification_link'),
+        ('category', '0001_initial'),
+        ('order', '0008_alter_orderitem_product'),
+        ('product', '0016_product_total_sold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('order_count', models.IntegerField(default=0)),
+                ('units_sold', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_sales', to='category.category')),
+                ('seller', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='account.seller')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['seller', 'date'], name='order_daily_seller__b2d69b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'seller', 'category'), name='unique_daily_sales_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:10
+
+import django.db.models.functions.datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0015_content_storage'),
+        ('order', '0009_dailysalesrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='order_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['seller', 'created_at', 'id'], name='order_seller_created'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(models.F('seller'), models.F('status'), django.db.models.functions.datetime.TruncDate('created_at'), name='order_seller_status_day'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(models.F('status'), django.db.models.functions.datetime.TruncDate('created_at'), name='order_status_day'),
+        ),
+    ]
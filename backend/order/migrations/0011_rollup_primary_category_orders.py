@@ -0,0 +1,55 @@
+from django.db import migrations
+from django.db.models import Count, F, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
+
+
+def recount_rollup(apps, schema_editor):
+    # Trước đây đơn nhiều danh mục bị đếm ở mọi dòng; xây lại theo danh mục nhỏ nhất
+    OrderItem = apps.get_model('order', 'OrderItem')
+    DailySalesRollup = apps.get_model('order', 'DailySalesRollup')
+    primary = Subquery(
+        OrderItem.objects.filter(order=OuterRef('order'))
+        .values('order').annotate(category=Min('product__category')).values('category')[:1]
+    )
+    counted = Q(product__category=F('primary')) | Q(primary__isnull=True, product__category__isnull=True)
+    rows = (
+        OrderItem.objects.filter(order__status='delivered')
+        .annotate(primary=primary)
+        .values(
+            day=TruncDate('order__created_at'),
+            seller_key=F('order__seller'),
+            category_key=F('product__category'),
+        )
+        .annotate(
+            revenue=Sum(F('price') * F('quantity')),
+            units=Sum('quantity'),
+            orders=Count('order', distinct=True, filter=counted),
+        )
+        .order_by()
+    )
+    DailySalesRollup.objects.all().delete()
+    DailySalesRollup.objects.bulk_create(
+        [
+            DailySalesRollup(
+                date=row['day'],
+                seller_id=row['seller_key'],
+                category_id=row['category_key'],
+                revenue=row['revenue'],
+                order_count=row['orders'],
+                units_sold=row['units'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0010_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(recount_rollup, migrations.RunPython.noop),
+    ]
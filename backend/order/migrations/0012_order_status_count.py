@@ -0,0 +1,82 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    # Dòng trùng do hai lần tạo đồng thời khi seller/category là NULL: gộp vào dòng đầu tiên
+    DailySalesRollup = apps.get_model('order', 'DailySalesRollup')
+    duplicates = (
+        DailySalesRollup.objects.values('date', 'seller', 'category')
+        .annotate(rows=Count('id'), keep=Min('id'), revenue_total=Sum('revenue'),
+                  orders=Sum('order_count'), units=Sum('units_sold'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        group = DailySalesRollup.objects.filter(
+            date=row['date'], seller_id=row['seller'], category_id=row['category']
+        )
+        group.exclude(pk=row['keep']).delete()
+        group.filter(pk=row['keep']).update(
+            revenue=row['revenue_total'], order_count=row['orders'], units_sold=row['units']
+        )
+
+
+def backfill_status_counts(apps, schema_editor):
+    Order = apps.get_model('order', 'Order')
+    OrderStatusCount = apps.get_model('order', 'OrderStatusCount')
+    rows = Order.objects.values('seller', 'status').annotate(total=Count('id')).order_by()
+    OrderStatusCount.objects.bulk_create(
+        [OrderStatusCount(seller_id=row['seller'], status=row['status'], count=row['total']) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0018_outbound_email_sending'),
+        ('category', '0001_initial'),
+        ('order', '0011_rollup_primary_category_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('date', 'seller'), name='unique_daily_sales_no_category'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('seller__isnull', True)), fields=('date', 'category'), name='unique_daily_sales_no_seller'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True), ('seller__isnull', True)), fields=('date',), name='unique_daily_sales_no_seller_category'),
+        ),
+        migrations.AddField(
+            model_name='orderstatuscount',
+            name='seller',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='order_status_counts', to='account.seller'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderstatuscount',
+            constraint=models.UniqueConstraint(fields=('seller', 'status'), name='unique_order_status_count'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderstatuscount',
+            constraint=models.UniqueConstraint(condition=models.Q(('seller__isnull', True)), fields=('status',), name='unique_order_status_count_no_seller'),
+        ),
+        migrations.RunPython(backfill_status_counts, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,24 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import Count, F, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncDate
 from django.contrib.auth.models import User
+from django.utils import timezone
 from product.models import Product
+from category.models import Category
 from account.models import Seller  
+from . import stock
+class OrderQuerySet(models.QuerySet):
+    def with_items(self):
+        # Tải user, các dòng hàng và sản phẩm của chúng với số query cố định
+        return self.select_related('user').prefetch_related(models.Prefetch(
+            'items',
+            queryset=OrderItem.objects.select_related('product__category', 'product__seller')
+            .defer('product__description', 'product__search_vector'),
+        ))
+
+
 class Order(models.Model):
     SHIPPING_METHOD_CHOICE={
         'standard': 'Giao hàng tiêu chuẩn (3-5 ngày)',
@@ -21,8 +38,27 @@ class Order(models.Model):
         default='standard'
     )
     shipping_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        # Theo các truy vấn thật, kiểm tra bằng `manage.py explain_queries`
+        indexes = [
+            # Danh sách đơn của khách / seller, mới nhất trước (kể cả phân trang cursor)
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created'),
+            models.Index(fields=['seller', 'created_at', 'id'], name='order_seller_created'),
+            # created_after/created_before lọc theo created_at__date: index trên biểu thức
+            # ngày để DB dùng được index thay vì tính DATE() cho từng dòng
+            models.Index(F('seller'), F('status'), TruncDate('created_at'), name='order_seller_status_day'),
+            models.Index(F('status'), TruncDate('created_at'), name='order_status_day'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} by {self.user.username}"
+    def apply_status_change(self, previous_status, quantities=None):
+        # Cập nhật tồn kho và bảng tổng hợp doanh thu sau khi đổi trạng thái
+        stock.apply_status_change(self, previous_status, self.status, quantities)
+        DailySalesRollup.apply_status_change(self, previous_status)
     @staticmethod
     def calculate_shipping_cost(method):
         if method == 'express':
@@ -47,4 +83,187 @@ class Address(models.Model):
     is_default = models.BooleanField(default=False)  # nếu muốn đánh dấu địa chỉ mặc định
     
     def __str__(self):
-        return f"{self.detail_address}, {self.ward}, {self.province}"
\ No newline at end of file
+        return f"{self.detail_address}, {self.ward}, {self.province}"
+
+class CounterRow(models.Model):
+    """Row of counters keyed by its unique columns, created on first use."""
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def _bump(cls, key, **deltas):
+        increments = {field: F(field) + delta for field, delta in deltas.items()}
+        if cls.objects.filter(**key).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**key, **deltas)
+        except IntegrityError:
+            # Một request khác vừa tạo dòng này
+            cls.objects.filter(**key).update(**increments)
+
+
+class DailySalesRollup(CounterRow):
+    """
+    Delivered sales per day, seller and category, kept in step with order
+    status changes so dashboards never aggregate raw order items.
+    The day is the order's creation date. ``order_count`` counts each order
+    once, on the row of its lowest category id, so it can be summed across
+    categories.
+    """
+    date = models.DateField()
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='daily_sales', null=True)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, related_name='daily_sales', null=True)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+    units_sold = models.IntegerField(default=0)
+
+    class Meta:
+        # NULL không trùng nhau trong unique index nên mỗi tổ hợp seller/category rỗng
+        # cần một ràng buộc riêng, nếu không hai lần tạo đồng thời sẽ ra hai dòng
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'seller', 'category'], name='unique_daily_sales_rollup'),
+            models.UniqueConstraint(
+                fields=['date', 'seller'], condition=Q(category__isnull=True),
+                name='unique_daily_sales_no_category',
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'category'], condition=Q(seller__isnull=True),
+                name='unique_daily_sales_no_seller',
+            ),
+            models.UniqueConstraint(
+                fields=['date'], condition=Q(seller__isnull=True, category__isnull=True),
+                name='unique_daily_sales_no_seller_category',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['seller', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} seller={self.seller_id} category={self.category_id}: {self.revenue}"
+
+    @classmethod
+    def apply_status_change(cls, order, previous_status):
+        was_delivered = previous_status == 'delivered'
+        is_delivered = order.status == 'delivered'
+        if was_delivered == is_delivered:
+            return
+        sign = 1 if is_delivered else -1
+        day = timezone.localdate(order.created_at)
+        lines = list(
+            order.items.values('product__category')
+            .annotate(revenue=Sum(F('price') * F('quantity')), units=Sum('quantity'))
+        )
+        primary = cls._primary_category(line['product__category'] for line in lines)
+        for line in lines:
+            cls._bump(
+                {'date': day, 'seller_id': order.seller_id, 'category_id': line['product__category']},
+                revenue=sign * line['revenue'],
+                order_count=sign if line['product__category'] == primary else 0,
+                units_sold=sign * line['units'],
+            )
+
+    @staticmethod
+    def _primary_category(categories):
+        """Category row that counts the order: the lowest category id, None if no line has one."""
+        return min((category for category in categories if category is not None), default=None)
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        # Danh mục nhỏ nhất của đơn (như _primary_category); đơn chỉ được đếm ở dòng đó
+        primary = Subquery(
+            OrderItem.objects.filter(order=OuterRef('order'))
+            .values('order').annotate(category=Min('product__category')).values('category')[:1]
+        )
+        counted = Q(product__category=F('primary')) | Q(primary__isnull=True, product__category__isnull=True)
+        rows = (
+            OrderItem.objects.filter(order__status='delivered')
+            .annotate(primary=primary)
+            .values(
+                day=TruncDate('order__created_at'),
+                seller_key=F('order__seller'),
+                category_key=F('product__category'),
+            )
+            .annotate(
+                revenue=Sum(F('price') * F('quantity')),
+                units=Sum('quantity'),
+                orders=Count('order', distinct=True, filter=counted),
+            )
+            .order_by()
+        )
+        with transaction.atomic():
+            cls.objects.all().delete()
+            created = cls.objects.bulk_create(
+                (
+                    cls(
+                        date=row['day'],
+                        seller_id=row['seller_key'],
+                        category_id=row['category_key'],
+                        revenue=row['revenue'],
+                        order_count=row['orders'],
+                        units_sold=row['units'],
+                    )
+                    for row in rows.iterator()
+                ),
+                batch_size=batch_size,
+            )
+        return len(created)
+
+
+class OrderStatusCount(CounterRow):
+    """
+    Number of orders per seller and status, so dashboards read a handful of
+    rows instead of counting ``Order``. Kept up to date by order/signals.py;
+    ``Order.objects.bulk_create`` callers call ``record_created`` themselves.
+    """
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='order_status_counts', null=True)
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'status'], name='unique_order_status_count'),
+            models.UniqueConstraint(
+                fields=['status'], condition=Q(seller__isnull=True), name='unique_order_status_count_no_seller',
+            ),
+        ]
+
+    def __str__(self):
+        return f"seller={self.seller_id} {self.status}: {self.count}"
+
+    @classmethod
+    def record_created(cls, orders):
+        """Count new orders with a fixed number of queries, however many sellers they span."""
+        created = Counter((order.seller_id, order.status) for order in orders)
+        cls.objects.bulk_create(
+            [cls(seller_id=seller_id, status=status) for seller_id, status in created],
+            ignore_conflicts=True,
+        )
+        by_amount = {}
+        for (seller_id, status), amount in created.items():
+            by_amount[amount] = by_amount.get(amount, Q()) | Q(seller_id=seller_id, status=status)
+        for amount, rows in by_amount.items():
+            cls.objects.filter(rows).update(count=F('count') + amount)
+
+    @classmethod
+    def move(cls, before, after):
+        """Move one order from ``(seller_id, status)`` ``before`` to ``after``; either may be None."""
+        if before == after:
+            return
+        if before is not None:
+            # Chỉ trừ vào dòng đã có; không tạo dòng âm (ví dụ khi seller đang bị xóa cùng các đơn)
+            cls.objects.filter(seller_id=before[0], status=before[1]).update(count=F('count') - 1)
+        if after is not None:
+            cls._bump({'seller_id': after[0], 'status': after[1]}, count=1)
+
+    @classmethod
+    def rebuild(cls):
+        rows = Order.objects.values('seller', 'status').annotate(total=Count('id')).order_by()
+        with transaction.atomic():
+            cls.objects.all().delete()
+            created = cls.objects.bulk_create(
+                cls(seller_id=row['seller'], status=row['status'], count=row['total']) for row in rows
+            )
+        return len(created)
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import Order, OrderItem
 from product.models import Product
-from product.serializers import ProductSerializer
+from product.images import ImageVariantsField
 from django.contrib.auth.models import User
 
 # User Serializer
@@ -11,9 +11,21 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email']
 
 
+# Thông tin sản phẩm rút gọn cho từng dòng hàng trong đơn
+class OrderProductSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True, default=None)
+    shop_name = serializers.CharField(source='seller.shop_name', read_only=True, default=None)
+    image_variants = ImageVariantsField(source='image')
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'image', 'image_variants', 'price', 'category', 'category_name', 'seller', 'shop_name']
+        read_only_fields = fields
+
+
 # OrderItem Serializer cho output
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = OrderProductSerializer(read_only=True)
 
     class Meta:
         model = OrderItem
@@ -35,39 +47,17 @@ class OrderSerializer(serializers.ModelSerializer):
 
 
 # OrderItem Serializer cho input (tạo mới)
-class OrderItemCreateSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = OrderItem
-        fields = ['product_id', 'quantity', 'price', 'seller_id']
-
-
-# Order Create Serializer cho input (tạo mới)
-class OrderCreateSerializer(serializers.ModelSerializer):
-    items = OrderItemCreateSerializer(many=True)
-
-    class Meta:
-        model = Order
-        fields = ['address', 'shipping_method', 'items']
-
-    def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        user = self.context['request'].user
-
-        order = Order.objects.create(user=user, **validated_data)
-
-        total_price = 0
-        for item in items_data:
-            product = item['product']
-            quantity = item['quantity']
-            price = product.price * quantity
-            OrderItem.objects.create(order=order, product=product, quantity=quantity, price=price)
-            total_price += price
+class OrderItemCreateSerializer(serializers.Serializer):
+    seller_id = serializers.IntegerField(min_value=1)
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    price = serializers.FloatField(min_value=0, required=False)
 
-        order.shipping_cost = 30000
-        order.total_price = total_price + order.shipping_cost
-        order.save()
 
-        return order
+# Order Create Serializer cho input (tạo mới); OrderViewSet.create tách thành một đơn cho mỗi seller
+class OrderCreateSerializer(serializers.Serializer):
+    items = OrderItemCreateSerializer(many=True, allow_empty=False)
+    shipping_cost = serializers.FloatField(min_value=0, default=0)
 
 from .models import Address
 
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Order, OrderStatusCount
+
+
+def _status_key(instance):
+    # Đọc thẳng từ __dict__ để không truy vấn thêm khi field bị defer
+    if "status" not in instance.__dict__ or "seller_id" not in instance.__dict__:
+        return None
+    return instance.seller_id, instance.status
+
+
+@receiver(post_init, sender=Order)
+def remember_status(sender, instance, **kwargs):
+    instance._counted_status = _status_key(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Order)
+def count_status(sender, instance, created, **kwargs):
+    after = _status_key(instance)
+    if created:
+        OrderStatusCount.move(None, after)
+    elif instance._counted_status is not None:
+        OrderStatusCount.move(instance._counted_status, after)
+    instance._counted_status = after
+
+
+@receiver(post_delete, sender=Order)
+def uncount_status(sender, instance, **kwargs):
+    OrderStatusCount.move(instance._counted_status, None)
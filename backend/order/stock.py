@@ -0,0 +1,113 @@
+"""
+Stock reservation for orders.
+
+Each order status holds stock in one of three ways:
+
+* pending/processing/shipping: the quantity is reserved (``reserved_stock``)
+* delivered: the quantity has left the warehouse (``stock`` was decremented)
+  and counts towards ``total_sold``
+* canceled: the order holds nothing
+
+Moving an order between statuses applies the difference between the two
+states as one conditional ``UPDATE`` over all of its products, so concurrent
+checkouts and deliveries never lose updates or oversell.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from rest_framework.exceptions import ValidationError
+
+from product.models import Product
+
+COMMITTED_STATUSES = {"delivered"}
+RELEASED_STATUSES = {"canceled"}
+
+
+class InsufficientStock(ValidationError):
+    default_detail = "Sản phẩm không đủ tồn kho."
+    default_code = "insufficient_stock"
+
+
+def _holding(status):
+    """(stock, reserved_stock, total_sold) held per unit by an order in ``status``."""
+    if status in COMMITTED_STATUSES:
+        return -1, 0, 1
+    if status in RELEASED_STATUSES:
+        return 0, 0, 0
+    return 0, 1, 0
+
+
+def order_quantities(order):
+    """Map product id -> ordered quantity for ``order`` in one query."""
+    quantities = defaultdict(int)
+    for product_id, quantity in order.items.values_list("product_id", "quantity"):
+        quantities[product_id] += quantity
+    return quantities
+
+
+def reserve(quantities):
+    """Reserve stock for a new order given a product id -> quantity map."""
+    _apply(quantities, stock_delta=0, reserved_delta=1, sold_delta=0)
+
+
+def apply_status_change(order, previous_status, new_status, quantities=None):
+    """Move the stock held by ``order`` from ``previous_status`` to ``new_status``."""
+    old = _holding(previous_status)
+    new = _holding(new_status)
+    if old == new:
+        return
+    if quantities is None:
+        quantities = order_quantities(order)
+    _apply(quantities, *(after - before for before, after in zip(old, new)))
+
+
+def _apply(quantities, stock_delta, reserved_delta, sold_delta):
+    quantities = {pk: qty for pk, qty in quantities.items() if qty}
+    if not quantities:
+        return
+
+    quantity = Case(
+        *[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    updates = {}
+    if stock_delta > 0:
+        updates["stock"] = F("stock") + quantity
+    elif stock_delta < 0:
+        updates["stock"] = F("stock") - quantity
+    if reserved_delta > 0:
+        updates["reserved_stock"] = F("reserved_stock") + quantity
+    elif reserved_delta < 0:
+        updates["reserved_stock"] = Greatest(F("reserved_stock") - quantity, Value(0))
+    if sold_delta > 0:
+        updates["total_sold"] = F("total_sold") + quantity
+    elif sold_delta < 0:
+        updates["total_sold"] = Greatest(F("total_sold") - quantity, Value(0))
+
+    # Lượng hàng còn bán được (stock - reserved_stock) chỉ được giảm khi đủ hàng
+    condition = Q()
+    for pk, qty in quantities.items():
+        row = Q(pk=pk)
+        if stock_delta - reserved_delta < 0:
+            row &= Q(stock__gte=F("reserved_stock") + qty)
+        if stock_delta < 0:
+            row &= Q(stock__gte=qty)
+        condition |= row
+
+    try:
+        with transaction.atomic():
+            if Product.objects.filter(condition).update(**updates) != len(quantities):
+                raise InsufficientStock()
+    except InsufficientStock:
+        # Savepoint đã rollback, đọc lại để báo đúng sản phẩm thiếu hàng
+        short = (
+            Product.objects.filter(pk__in=quantities)
+            .exclude(condition)
+            .values_list("name", flat=True)
+        )
+        raise InsufficientStock(
+            [f"Sản phẩm {name} không đủ tồn kho" for name in short] or None
+        )
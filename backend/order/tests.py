@@ -1,3 +1,472 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import sys
+import threading
+import time
+import unittest
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from account.models import Notification, Seller
+from category.models import Category
+from product.models import Product
+
+from . import stock
+from .models import DailySalesRollup, Order, OrderItem, OrderStatusCount
+
+
+class OrderCreateQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer", password="x")
+        category = Category.objects.create(name="Sách", slug="sach")
+        cls.sellers = [
+            Seller.objects.create(
+                user=User.objects.create_user(f"seller{i}", password="x"),
+                shop_name=f"Shop {i}",
+            )
+            for i in range(5)
+        ]
+        cls.products = [
+            Product.objects.create(
+                name=f"Sản phẩm {i}",
+                price=10000 + i,
+                stock=1000,
+                category=category,
+                seller=cls.sellers[i % 5],
+            )
+            for i in range(100)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def checkout(self, lines):
+        payload = {
+            "address": "1 Tràng Tiền",
+            "shipping_cost": 15000,
+            "items": [
+                {
+                    "product_id": product.id,
+                    "seller_id": product.seller_id,
+                    "quantity": 2,
+                    "price": product.price,
+                }
+                for product in self.products[:lines]
+            ],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/api/order/orders/", payload, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_is_flat_for_1_10_100_lines(self):
+        counts = {}
+        for lines in (1, 10, 100):
+            Order.objects.all().delete()
+            _, counts[lines] = self.checkout(lines)
+            self.assertEqual(OrderItem.objects.count(), lines)
+
+        self.assertEqual(counts[1], counts[10])
+        self.assertEqual(counts[10], counts[100])
+
+    def test_splits_orders_per_seller(self):
+        response, _ = self.checkout(10)
+
+        self.assertEqual(len(response.data), 5)
+        for order in Order.objects.prefetch_related("items__product"):
+            self.assertEqual(order.items.count(), 2)
+            self.assertTrue(all(item.product.seller_id == order.seller_id for item in order.items.all()))
+            self.assertEqual(order.total_price, sum(i.price * i.quantity for i in order.items.all()) + 15000)
+        self.assertEqual(Notification.objects.count(), 10)
+
+    def test_unknown_product_rolls_back(self):
+        payload = {"items": [{"product_id": 999999, "seller_id": self.sellers[0].id}]}
+        response = self.client.post("/api/order/orders/", payload, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_invalid_lines_are_rejected_without_touching_stock(self):
+        product = self.products[0]
+        line = {"product_id": product.id, "seller_id": product.seller_id}
+        for items in (
+            [],
+            [{**line, "product_id": "abc"}],
+            [{"seller_id": product.seller_id}],
+            [{**line, "seller_id": None}],
+            [{**line, "quantity": 0}],
+            [{**line, "quantity": -3}],
+            [{**line, "quantity": "2.5"}],
+        ):
+            with self.subTest(items=items):
+                response = self.client.post("/api/order/orders/", {"items": items}, format="json")
+                self.assertEqual(response.status_code, 400)
+
+        product.refresh_from_db()
+        self.assertEqual(product.reserved_stock, 0)
+        self.assertFalse(Order.objects.exists())
+
+
+class StockReservationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer", password="x")
+        cls.seller = Seller.objects.create(
+            user=User.objects.create_user("seller", password="x"), shop_name="Shop"
+        )
+        cls.product = Product.objects.create(name="Áo", price=100, stock=10, seller=cls.seller)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def place(self, quantity):
+        return self.client.post("/api/order/orders/", {
+            "address": "12 Lý Thái Tổ",
+            "items": [{"product_id": self.product.id, "seller_id": self.seller.id, "quantity": quantity}],
+        }, format="json")
+
+    def set_status(self, order_id, new_status):
+        return self.client.patch(f"/api/order/orders/{order_id}/", {"status": new_status}, format="json")
+
+    def assertStock(self, stock_left, reserved):
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.reserved_stock), (stock_left, reserved))
+
+    def test_reserve_release_and_commit(self):
+        first = self.place(4).data[0]["id"]
+        second = self.place(3).data[0]["id"]
+        self.assertStock(10, 7)
+
+        self.set_status(first, "canceled")
+        self.assertStock(10, 3)
+
+        self.set_status(second, "shipping")
+        self.assertStock(10, 3)
+        self.set_status(second, "delivered")
+        self.assertStock(7, 0)
+        self.assertEqual(self.product.total_sold, 3)
+
+    def test_rejects_order_beyond_available_stock(self):
+        self.place(8)
+        response = self.place(3)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertStock(10, 8)
+
+    def test_reopening_canceled_order_needs_stock(self):
+        canceled = self.place(6).data[0]["id"]
+        self.set_status(canceled, "canceled")
+        self.place(6)
+
+        response = self.set_status(canceled, "pending")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.get(pk=canceled).status, "canceled")
+        self.assertStock(10, 6)
+
+    def test_undoing_delivery_returns_stock(self):
+        order = self.place(5).data[0]["id"]
+        self.set_status(order, "delivered")
+        self.set_status(order, "canceled")
+        self.assertStock(10, 0)
+        self.assertEqual(self.product.total_sold, 0)
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    threads = 8
+    attempts_per_thread = 25
+    initial_stock = 100
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise unittest.SkipTest("Cần database dạng file hoặc PostgreSQL để chạy nhiều luồng")
+        self.product = Product.objects.create(name="Flash sale", price=1, stock=self.initial_stock)
+
+    def test_stock_is_never_oversold(self):
+        reserved = []
+        errors = []
+        barrier = threading.Barrier(self.threads)
+
+        def worker():
+            barrier.wait()
+            try:
+                for _ in range(self.attempts_per_thread):
+                    try:
+                        stock.reserve({self.product.pk: 1})
+                    except stock.InsufficientStock:
+                        continue
+                    reserved.append(1)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(errors, [])
+        self.product.refresh_from_db()
+        self.assertEqual(len(reserved), self.initial_stock)
+        self.assertEqual(self.product.reserved_stock, self.initial_stock)
+        attempts = self.threads * self.attempts_per_thread
+        sys.stderr.write(
+            f"\n{attempts} reservation attempts in {elapsed:.3f}s "
+            f"({attempts / elapsed:.0f}/s, {self.threads} threads)\n"
+        )
+
+
+class SellerStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("seller", password="x")
+        cls.seller = Seller.objects.create(user=cls.user, shop_name="Shop")
+        cls.customer = User.objects.create_user("customer", password="x")
+        cls.product = Product.objects.create(name="Áo", price=100, stock=100, seller=cls.seller)
+
+    def add_order(self, days_ago, quantity, price, status="delivered"):
+        order = Order.objects.create(user=self.customer, seller=self.seller, address="HN")
+        OrderItem.objects.create(order=order, product=self.product, quantity=quantity, price=price)
+        Order.objects.filter(pk=order.pk).update(created_at=now() - timedelta(days=days_ago))
+        order.refresh_from_db()
+        order.status = status
+        order.save()
+        order.apply_status_change("pending")
+        return order
+
+    def get_stats(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get("/api/order/seller-stats/")
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_revenue_buckets(self):
+        self.add_order(0, 2, 100)
+        self.add_order(0, 1, 50)
+        self.add_order(1, 1, 30, status="pending")
+
+        data, _ = self.get_stats()
+
+        self.assertEqual(data["revenue_by_day"][-1]["revenue"], 250)
+        self.assertEqual(data["revenue_by_day"][-2]["revenue"], 0)
+        self.assertEqual(sum(week["revenue"] for week in data["revenue_by_week"]), 250)
+        self.assertEqual(data["revenue_by_month"][now().month - 1]["revenue"], 250)
+        self.assertEqual(data["top_products"], [{"name": "Áo", "quantity": 3}])
+
+    def test_query_count_does_not_depend_on_history(self):
+        self.add_order(0, 1, 10)
+        _, queries = self.get_stats()
+        for days_ago in range(0, 60, 3):
+            self.add_order(days_ago, 1, 10)
+
+        _, more_queries = self.get_stats()
+
+        self.assertEqual(queries, more_queries)
+
+    def test_rollup_follows_status_changes_and_matches_rebuild(self):
+        delivered = self.add_order(0, 2, 100)
+        self.add_order(2, 1, 40)
+        self.add_order(0, 5, 10, status="canceled")
+        delivered.status = "canceled"
+        delivered.save()
+        delivered.apply_status_change("delivered")
+
+        rebuilt = self.assertRollupMatchesRebuild()
+        self.assertEqual(len(rebuilt), 1)
+        self.assertEqual(rebuilt[0][3:], (40, 1, 1))
+
+    def assertRollupMatchesRebuild(self):
+        columns = ("date", "seller", "category", "revenue", "order_count", "units_sold")
+        incremental = sorted(
+            DailySalesRollup.objects.exclude(revenue=0, order_count=0, units_sold=0).values_list(*columns)
+        )
+        DailySalesRollup.rebuild()
+        rebuilt = sorted(DailySalesRollup.objects.values_list(*columns))
+
+        self.assertEqual(incremental, rebuilt)
+        return rebuilt
+
+    def test_multi_category_order_is_counted_once(self):
+        shirts = Category.objects.create(name="Áo", slug="ao")
+        shoes = Category.objects.create(name="Giày", slug="giay")
+        Product.objects.filter(pk=self.product.pk).update(category=shirts)
+        shoe = Product.objects.create(name="Giày", price=300, stock=10, seller=self.seller, category=shoes)
+        order = Order.objects.create(user=self.customer, seller=self.seller, address="HN", status="delivered")
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=100)
+        OrderItem.objects.create(order=order, product=shoe, quantity=1, price=300)
+        order.apply_status_change("pending")
+
+        self.assertEqual(DailySalesRollup.objects.filter(seller=self.seller).count(), 2)
+        self.assertEqual(DailySalesRollup.objects.aggregate(orders=Sum("order_count"))["orders"], 1)
+        self.assertRollupMatchesRebuild()
+
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user("admin", password="x", is_staff=True))
+        data = admin.get("/api/account/admin/stats/").data
+        self.assertEqual((data["delivered_orders"], data["revenue"]), (1, 400))
+
+
+    def test_uncategorized_rows_are_unique_per_day(self):
+        self.add_order(0, 1, 10)
+        self.add_order(0, 2, 10)
+
+        row = DailySalesRollup.objects.get(seller=self.seller, category=None)
+        self.assertEqual((row.revenue, row.order_count, row.units_sold), (30, 2, 3))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DailySalesRollup.objects.create(date=row.date, seller=self.seller, category=None)
+
+    def test_order_counts_come_from_status_counters(self):
+        self.add_order(0, 1, 10)
+        self.add_order(0, 1, 10, status="canceled")
+        pending = Order.objects.create(user=self.customer, seller=self.seller, address="HN")
+        Order.objects.create(user=self.customer, seller=self.seller, address="HN")
+        pending.delete()
+
+        data, _ = self.get_stats()
+        expected = [{"status": "canceled", "count": 1}, {"status": "delivered", "count": 1}, {"status": "pending", "count": 1}]
+        self.assertEqual(list(data["orders_by_status"]), expected)
+
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create_user("admin", password="x", is_staff=True))
+        cache.clear()  # thống kê admin được cache, mà on_commit không chạy trong TestCase
+        with CaptureQueriesContext(connection) as ctx:
+            admin_data = admin.get("/api/account/admin/stats/").data
+        self.assertEqual((admin_data["orderStatus"], admin_data["total_orders"]), (expected, 3))
+        self.assertFalse(any('FROM "order_order"' in query["sql"] for query in ctx.captured_queries))
+
+        incremental = sorted(OrderStatusCount.objects.filter(count__gt=0).values_list("seller", "status", "count"))
+        OrderStatusCount.rebuild()
+        self.assertEqual(incremental, sorted(OrderStatusCount.objects.values_list("seller", "status", "count")))
+
+
+class OrderListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer", password="x")
+        cls.admin = User.objects.create_user("admin", password="x", is_staff=True)
+        cls.seller_user = User.objects.create_user("seller", password="x")
+        cls.seller = Seller.objects.create(user=cls.seller_user, shop_name="Shop")
+        category = Category.objects.create(name="Sách", slug="sach")
+        cls.products = [
+            Product.objects.create(name=f"Sách {i}", price=100, stock=100, category=category, seller=cls.seller)
+            for i in range(3)
+        ]
+
+    def add_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(user=self.customer, seller=self.seller, address="HN")
+            for product in self.products:
+                OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+
+    def count_queries(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_list_query_count_does_not_depend_on_order_count(self):
+        endpoints = [
+            (self.customer, "/api/order/orders/"),
+            (self.seller_user, "/api/order/seller-orders/"),
+            (self.admin, "/api/account/admin/orders/"),
+        ]
+        self.add_orders(1)
+        few = [self.count_queries(user, url)[1] for user, url in endpoints]
+        self.add_orders(20)
+        many = [self.count_queries(user, url)[1] for user, url in endpoints]
+
+        self.assertEqual(few, many)
+
+    def test_order_lines_embed_slim_product(self):
+        self.add_orders(1)
+        data, _ = self.count_queries(self.customer, "/api/order/orders/")
+        orders = data["results"] if isinstance(data, dict) else data
+
+        product = orders[0]["items"][0]["product"]
+        self.assertEqual(product["category_name"], "Sách")
+        self.assertEqual(product["shop_name"], "Shop")
+        self.assertNotIn("description", product)
+
+    def test_cursor_pagination_is_opt_in(self):
+        self.add_orders(5)
+        client = APIClient()
+        client.force_authenticate(self.seller_user)
+
+        self.assertEqual(len(client.get("/api/order/seller-orders/").data), 5)
+        first = client.get("/api/order/seller-orders/?cursor=&page_size=3").data
+        second = client.get(first["next"]).data
+        ids = [order["id"] for order in first["results"] + second["results"]]
+        self.assertEqual(ids, list(Order.objects.order_by("-created_at", "-id").values_list("id", flat=True)))
+        self.assertIsNone(second["next"])
+
+
+class OrderExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user("customer", password="x")
+        cls.admin = User.objects.create_user("admin", password="x", is_staff=True)
+        cls.seller_user = User.objects.create_user("seller", password="x")
+        cls.seller = Seller.objects.create(user=cls.seller_user, shop_name="Shop")
+        other = Seller.objects.create(user=User.objects.create_user("other"), shop_name="Khác")
+        category = Category.objects.create(name="Sách", slug="sach")
+        book = Product.objects.create(name="Sách", sku="B1", price=100, category=category, seller=cls.seller)
+        pen = Product.objects.create(name="Bút", price=5, category=category, seller=other)
+        for seller, product, status, method in [
+            (cls.seller, book, "delivered", "express"),
+            (cls.seller, book, "pending", "standard"),
+            (other, pen, "delivered", "express"),
+        ]:
+            order = Order.objects.create(
+                user=cls.customer, seller=seller, status=status, shipping_method=method, total_price=product.price * 2
+            )
+            OrderItem.objects.create(order=order, product=product, quantity=2, price=product.price)
+
+    def export(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode("utf-8-sig")
+
+    def test_seller_export_honors_filters(self):
+        response, body = self.export(self.seller_user, "/api/order/seller-orders/export/?status=delivered")
+
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("attachment;", response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([(row["sku"], row["status"], row["quantity"]) for row in rows], [("B1", "delivered", "2")])
+
+    def test_admin_export_as_jsonl(self):
+        _, body = self.export(self.admin, "/api/account/admin/orders/export/?format=jsonl&shipping_method=express")
+
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(sorted(row["shop_name"] for row in rows), ["Khác", "Shop"])
+        self.assertEqual(rows[0]["customer"], "customer")
+
+    def test_export_requires_access(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        self.assertEqual(client.get("/api/order/seller-orders/export/").status_code, 403)
+        self.assertEqual(client.get("/api/account/admin/orders/export/").status_code, 403)
@@ -3,19 +3,26 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.decorators import action
 from django.db.models import Sum, F, Count, Q
 from django.utils.timezone import now, timedelta
 from django.db import transaction
 
-from .models import Order, OrderItem, Address
-from .serializers import OrderSerializer, OrderItemSerializer,AddressSerializer
+from . import stock
+from .models import Order, OrderItem, Address, OrderStatusCount
+from .serializers import OrderSerializer, OrderItemSerializer, AddressSerializer, OrderCreateSerializer
 from product.models import Product   
 from account.models import Seller, Notification
+from account.cache import admin_stats_cache
+from account.identity import get_identity
+from product.exports import EXPORT_RENDERERS, export_response
+from product.pagination import KeysetPagination
 
 
 # ------------------------ ORDER VIEWSET ------------------------
 class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.all()
+    queryset = Order.objects.with_items()
+    pagination_class = KeysetPagination
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
 
@@ -24,77 +31,96 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         data = request.data
         user = request.user
-        items = data.get("items", [])
-
-        if not items:
-            return Response({"error": "No items provided"}, status=status.HTTP_400_BAD_REQUEST)
+        # Số lượng phải là số nguyên dương: số 0 / âm sẽ làm tăng tồn kho khi giữ hàng
+        checkout = OrderCreateSerializer(data=data)
+        checkout.is_valid(raise_exception=True)
 
         # Gom sản phẩm theo seller
         grouped_items = {}
-        for item in items:
-            seller_id = item.get("seller_id")
-            if not seller_id:
-                return Response({"error": "Each item must include seller_id"}, status=status.HTTP_400_BAD_REQUEST)
-            grouped_items.setdefault(seller_id, []).append(item)
+        for item in checkout.validated_data["items"]:
+            grouped_items.setdefault(item["seller_id"], []).append((item["product_id"], item))
 
-        created_orders = []
+        # Tải toàn bộ sản phẩm và seller trong 1 query mỗi loại
+        products = Product.objects.in_bulk(
+            {product_id for lines in grouped_items.values() for product_id, _ in lines}
+        )
+        sellers = Seller.objects.select_related("user").in_bulk(grouped_items.keys())
+        for seller_id, seller_items in grouped_items.items():
+            if seller_id not in sellers:
+                return Response({"error": f"Seller {seller_id} not found"}, status=status.HTTP_400_BAD_REQUEST)
+            for product_id, _ in seller_items:
+                if product_id not in products:
+                    return Response({"error": f"Product {product_id} not found"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Giữ hàng trong kho cho toàn bộ giỏ bằng 1 câu UPDATE
+        quantities = {}
+        for seller_items in grouped_items.values():
+            for product_id, item in seller_items:
+                quantities[product_id] = quantities.get(product_id, 0) + item["quantity"]
+        stock.reserve(quantities)
+
+        shipping_cost = checkout.validated_data["shipping_cost"]
+        orders = []
+        order_lines = []
 
         # Tạo order riêng cho từng seller
         for seller_id, seller_items in grouped_items.items():
-            order = Order.objects.create(
+            lines = []
+            total_price = 0
+            for product_id, item in seller_items:
+                product = products[product_id]
+                quantity = item["quantity"]
+                price = item.get("price", float(product.price))
+                lines.append(OrderItem(product=product, quantity=quantity, price=price))
+                total_price += price * quantity
+
+            orders.append(Order(
                 user=user,
-                seller_id=seller_id,   # 🔥 mỗi order gắn với 1 seller
+                seller=sellers[seller_id],   # 🔥 mỗi order gắn với 1 seller
                 address=data.get("address"),
                 shipping_method=data.get("shipping_method", "standard"),
                 status="pending",
-                shipping_cost=data.get("shipping_cost", 0),
-            )
-
-            total_price = 0
-            for item in seller_items:
-                try:
-                    product = Product.objects.get(id=item["product_id"])
-                except Product.DoesNotExist:
-                    transaction.set_rollback(True)
-                    return Response({"error": f"Product {item['product_id']} not found"}, status=status.HTTP_400_BAD_REQUEST)
-
-                quantity = int(item.get("quantity", 1))
-                price = float(item.get("price", product.price))
-
-                OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    quantity=quantity,
-                    price=price,
-                )
-                total_price += price * quantity
-
-            order.total_price = total_price + float(order.shipping_cost)
-            order.save()
-            Notification.objects.create(
+                shipping_cost=shipping_cost,
+                total_price=total_price + shipping_cost,
+            ))
+            order_lines.append(lines)
+
+        Order.objects.bulk_create(orders)
+        OrderStatusCount.record_created(orders)  # bulk_create không gửi post_save
+
+        order_items = []
+        notifications = []
+        for order, lines in zip(orders, order_lines):
+            for line in lines:
+                line.order = order
+                order_items.append(line)
+            notifications.append(Notification(
                 user=user,
                 target_role='customer',
                 link=f"/order/{order.id}/",
                 message=f"Bạn đã đặt hàng thành công, mã đơn: {order.id}"
-            )
-
+            ))
             # Thông báo cho seller
-            seller_user = order.seller.user
-            Notification.objects.create(
-                user=seller_user,
+            notifications.append(Notification(
+                user=order.seller.user,
                 target_role='seller',
                 link=f"/seller/orders/{order.id}/",
                 message=f"Bạn có đơn hàng mới từ khách {user.username}, mã đơn: {order.id}"
-            )
-            created_orders.append(order)
+            ))
+        OrderItem.objects.bulk_create(order_items)
+        Notification.objects.bulk_create(notifications)
+        # bulk_create không gửi post_save
+        transaction.on_commit(admin_stats_cache.invalidate)
 
+        created_orders = Order.objects.with_items().filter(pk__in=[order.pk for order in orders]).order_by("id")
         serializer = self.get_serializer(created_orders, many=True)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def get_queryset(self):
         # User chỉ thấy đơn của mình
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.with_items().filter(user=self.request.user).order_by("-created_at", "-id")
 
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         order = self.get_object()
         previous_status = order.status
@@ -103,6 +129,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         serializer.save()
         updated_status = serializer.validated_data.get('status', previous_status)
+        order.apply_status_change(previous_status)
         if previous_status != updated_status:
             sellers = {item.product.seller for item in order.items.all()}
             for seller in sellers:
@@ -118,14 +145,6 @@ class OrderViewSet(viewsets.ModelViewSet):
                 link=f"/order/{order.id}/",
                 message=f"Đơn hàng {order.id} đã chuyển sang trạng thái: {updated_status}"
             )
-        if previous_status != 'delivered' and updated_status == 'delivered':
-            for item in order.items.all():
-                product = item.product
-                if product.stock < item.quantity:
-                    raise PermissionDenied(f"Sản phẩm {product.name} không đủ tồn kho")
-                product.stock -= item.quantity
-                product.save()
-
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -134,7 +153,7 @@ class OrderItemViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return OrderItem.objects.filter(order__user=self.request.user)
+        return OrderItem.objects.filter(order__user=self.request.user).select_related("product__category", "product__seller")
 
 class AddressViewSet(viewsets.ModelViewSet):
     serializer_class = AddressSerializer
@@ -145,71 +164,101 @@ class AddressViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+
+# Cột xuất đơn hàng: mỗi dòng là một sản phẩm trong đơn
+ORDER_EXPORT_COLUMNS = {
+    "order_id": "order_id",
+    "created_at": "order__created_at",
+    "status": "order__status",
+    "shipping_method": "order__shipping_method",
+    "shipping_cost": "order__shipping_cost",
+    "order_total": "order__total_price",
+    "customer": "order__user__username",
+    "address": "order__address",
+    "product_id": "product_id",
+    "sku": "product__sku",
+    "product": "product__name",
+    "quantity": "quantity",
+    "price": "price",
+}
+
+
+def filter_orders(qs, params):
+    """Filters of the seller/admin order pages (status, shipping method, total, dates, search)."""
+    # --- Bộ lọc ---
+    status_val = params.get("status")
+    if status_val:
+        qs = qs.filter(status=status_val)
+
+    shipping_method = params.get("shipping_method")
+    if shipping_method:
+        qs = qs.filter(shipping_method=shipping_method)
+
+    min_price = params.get("min_price")
+    if min_price:
+        qs = qs.filter(total_price__gte=min_price)
+
+    max_price = params.get("max_price")
+    if max_price:
+        qs = qs.filter(total_price__lte=max_price)
+
+    created_after = params.get("created_after")
+    if created_after:
+        qs = qs.filter(created_at__date__gte=created_after)
+
+    created_before = params.get("created_before")
+    if created_before:
+        qs = qs.filter(created_at__date__lte=created_before)
+
+    search = params.get("search")
+    if search:
+        qs = qs.filter(
+            Q(user__username__icontains=search) |
+            Q(id__icontains=search)
+        )
+
+    return qs
+
+
 # ------------------------ SELLER ORDER LIST ------------------------
 class SellerOrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        try:
-            seller = Seller.objects.get(user=self.request.user)
-        except Seller.DoesNotExist:
+        seller_id = get_identity(self.request).seller_id
+        if seller_id is None:
             raise PermissionDenied("Bạn không phải là người bán.")
 
-        qs = Order.objects.filter(seller=seller)  # 🔥 dùng trực tiếp trường seller
-
-        # --- Bộ lọc ---
-        status_val = self.request.query_params.get("status")
-        if status_val:
-            qs = qs.filter(status=status_val)
-
-        shipping_method = self.request.query_params.get("shipping_method")
-        if shipping_method:
-            qs = qs.filter(shipping_method=shipping_method)
+        qs = Order.objects.with_items().filter(seller_id=seller_id).order_by("-created_at", "-id")  # 🔥 dùng trực tiếp trường seller
+        return filter_orders(qs, self.request.query_params)
 
-        min_price = self.request.query_params.get("min_price")
-        if min_price:
-            qs = qs.filter(total_price__gte=min_price)
-
-        max_price = self.request.query_params.get("max_price")
-        if max_price:
-            qs = qs.filter(total_price__lte=max_price)
-
-        created_after = self.request.query_params.get("created_after")
-        if created_after:
-            qs = qs.filter(created_at__date__gte=created_after)
-
-        created_before = self.request.query_params.get("created_before")
-        if created_before:
-            qs = qs.filter(created_at__date__lte=created_before)
-
-        search = self.request.query_params.get("search")
-        if search:
-            qs = qs.filter(
-                Q(user__username__icontains=search) |
-                Q(id__icontains=search)
-            )
-
-        return qs
+    @action(detail=False, methods=["get"], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """One row per order line of the filtered orders, as CSV or JSONL."""
+        items = OrderItem.objects.filter(order__in=self.get_queryset()).order_by("order_id", "id")
+        return export_response(request, items, ORDER_EXPORT_COLUMNS, "orders")
 
 
 # ------------------------ SELLER ORDER DETAIL ------------------------
 class SellerOrderDetailView(viewsets.ModelViewSet):
-    queryset = Order.objects.all()
+    queryset = Order.objects.with_items()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
         order = super().get_object()
-        try:
-            seller = Seller.objects.get(user=self.request.user)
-        except Seller.DoesNotExist:
+        seller_id = get_identity(self.request).seller_id
+        if seller_id is None:
             raise PermissionDenied("Bạn không phải là người bán.")
 
-        if order.seller != seller:
+        if order.seller_id != seller_id:
             raise PermissionDenied("Bạn không có quyền xem đơn hàng này.")
         return order
 
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         order = self.get_object()
         previous_status = order.status
@@ -218,6 +267,8 @@ class SellerOrderDetailView(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         serializer.save()
         updated_status = serializer.validated_data.get('status', previous_status)
+        quantities = stock.order_quantities(order)
+        order.apply_status_change(previous_status, quantities)
         if previous_status != updated_status:
             if updated_status == "canceled":
                 if order.seller:  # đảm bảo đơn có seller
@@ -247,19 +298,16 @@ class SellerOrderDetailView(viewsets.ModelViewSet):
                 message=f"Đơn hàng #{order.id} đã được cập nhật sang trạng thái {updated_status}"
             )
         if previous_status != 'delivered' and updated_status == 'delivered':
-            for item in order.items.all():  # chỉ đơn của seller hiện tại
-                product = item.product
-                if product.stock < item.quantity:
-                    raise PermissionDenied(f"Sản phẩm {product.name} không đủ tồn kho")
-                product.stock -= item.quantity
-                if product.stock < 20:
-                    Notification.objects.create(
-                        user=order.seller.user,
-                        target_role="seller",
-                        title="Cảnh báo tồn kho",
-                        message=f"Sản phẩm {product.name} sắp hết hàng. Chỉ còn {product.stock} sản phẩm trong kho."
-                    )
-                product.save()
+            low_stock = Product.objects.filter(pk__in=quantities, stock__lt=20).values_list("name", "stock")
+            Notification.objects.bulk_create([
+                Notification(
+                    user=order.seller.user,
+                    target_role="seller",
+                    title="Cảnh báo tồn kho",
+                    message=f"Sản phẩm {name} sắp hết hàng. Chỉ còn {remaining} sản phẩm trong kho."
+                )
+                for name, remaining in low_stock
+            ])
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -273,40 +321,49 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 import calendar
 
-from .models import Seller, Order, OrderItem
+from .models import Seller, Order, OrderItem, DailySalesRollup, OrderStatusCount
 
 
 class SellerStatsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, format=None):
-        try:
-            seller = Seller.objects.get(user=request.user)
-        except Seller.DoesNotExist:
+        seller_id = get_identity(request).seller_id
+        if seller_id is None:
             return Response({"detail": "Bạn không phải là người bán."}, status=403)
 
         today = now().date()
+        first_day_of_month = today.replace(day=1)
+        last_7_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
 
         # --------------------------
-        # 1. Doanh thu theo ngày (7 ngày gần nhất)
+        # Doanh thu từng ngày trong cửa sổ cần thống kê (1 query trên bảng tổng hợp),
+        # sau đó gom theo ngày / tuần / tháng bằng Python
         # --------------------------
-        last_7_days = [today - timedelta(days=i) for i in range(6, -1, -1)]
-        revenue_by_day = []
-        for day in last_7_days:
-            total = (
-                OrderItem.objects.filter(
-                    order__seller=seller,
-                    order__created_at__date=day,
-                    order__status="delivered",
-                ).aggregate(total_revenue=Sum(F("price") * F("quantity")))["total_revenue"]
-                or 0
+        window_start = min(last_7_days[0], today.replace(month=1, day=1))
+        daily = dict(
+            DailySalesRollup.objects.filter(seller_id=seller_id, date__gte=window_start)
+            .values("date")
+            .annotate(total_revenue=Sum("revenue"))
+            .values_list("date", "total_revenue")
+        )
+
+        def revenue_between(start, end):
+            return sum(
+                (total for day, total in daily.items() if start <= day <= end), 0
             )
-            revenue_by_day.append({"date": day.strftime("%Y-%m-%d"), "revenue": total})
+
+        # --------------------------
+        # 1. Doanh thu theo ngày (7 ngày gần nhất)
+        # --------------------------
+        revenue_by_day = [
+            {"date": day.strftime("%Y-%m-%d"), "revenue": daily.get(day, 0)}
+            for day in last_7_days
+        ]
 
         # --------------------------
         # 2. Doanh thu theo tuần (trong tháng hiện tại)
         # --------------------------
-        first_day_of_month = today.replace(day=1)
         weeks = []
         revenue_by_week = []
 
@@ -319,17 +376,8 @@ class SellerStatsView(APIView):
                 end = min(week[-1], today.replace(day=calendar.monthrange(today.year, today.month)[1]))
                 weeks.append((start, end))
 
-        # Tính doanh thu từng tuần
         for idx, (start, end) in enumerate(weeks, 1):
-            total = (
-                OrderItem.objects.filter(
-                    order__seller=seller,
-                    order__created_at__date__range=(start, end),
-                    order__status="delivered",
-                ).aggregate(total_revenue=Sum(F("price") * F("quantity")))["total_revenue"]
-                or 0
-            )
-            revenue_by_week.append({"week": f"Tuần {idx}", "revenue": total})
+            revenue_by_week.append({"week": f"Tuần {idx}", "revenue": revenue_between(start, end)})
 
         # --------------------------
         # 3. Doanh thu theo tháng (trong năm hiện tại)
@@ -337,38 +385,28 @@ class SellerStatsView(APIView):
         revenue_by_month = []
         for month in range(1, 13):
             start = today.replace(month=month, day=1)
-            end_day = calendar.monthrange(today.year, month)[1]
-            end = today.replace(month=month, day=end_day)
-            total = (
-                OrderItem.objects.filter(
-                    order__seller=seller,
-                    order__created_at__date__range=(start, end),
-                    order__status="delivered",
-                ).aggregate(total_revenue=Sum(F("price") * F("quantity")))["total_revenue"]
-                or 0
-            )
-            revenue_by_month.append({"month": month, "revenue": total})
+            end = start.replace(day=calendar.monthrange(today.year, month)[1])
+            revenue_by_month.append({"month": month, "revenue": revenue_between(start, end)})
 
         # --------------------------
         # 4. Đơn hàng theo trạng thái
         # --------------------------
         orders_by_status = (
-            Order.objects.filter(seller=seller)
-            .values("status")
-            .annotate(count=Count("id", distinct=True))
+            OrderStatusCount.objects.filter(seller_id=seller_id, count__gt=0)
+            .values("status", "count")
+            .order_by("status")
         )
 
         # --------------------------
         # 5. Top sản phẩm bán chạy
         # --------------------------
         top_products = (
-            OrderItem.objects.filter(order__seller=seller, order__status="delivered")
-            .values("product__name")
-            .annotate(quantity=Sum("quantity"))
-            .order_by("-quantity")[:5]
+            Product.objects.filter(seller_id=seller_id, total_sold__gt=0)
+            .order_by("-total_sold")
+            .values("name", "total_sold")[:5]
         )
         top_products = [
-            {"name": p["product__name"], "quantity": p["quantity"]} for p in top_products
+            {"name": p["name"], "quantity": p["total_sold"]} for p in top_products
         ]
 
         return Response(
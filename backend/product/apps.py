@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProductConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'product'
+
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(signals.restore_search_index, sender=self)
@@ -0,0 +1,113 @@
+"""
+Streaming CSV / JSON Lines exports.
+
+``export_response`` turns a queryset into a ``StreamingHttpResponse``:
+rows come from ``values()`` through ``iterator(chunk_size=...)`` (a
+server-side cursor on PostgreSQL) and are written out in small chunks,
+so memory does not depend on how many rows are exported. Views pick the
+format with DRF content negotiation (``?format=csv|jsonl``) by using
+``EXPORT_RENDERERS``.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+# Cột xuất của sản phẩm, tên cột khớp với file nhập (product/importer.py)
+PRODUCT_EXPORT_COLUMNS = {
+    "id": "id",
+    "sku": "sku",
+    "name": "name",
+    "category": "category__name",
+    "price": "price",
+    "stock": "stock",
+    "reserved_stock": "reserved_stock",
+    "total_sold": "total_sold",
+    "status": "status",
+    "is_active": "is_active",
+    "average_rating": "average_rating",
+    "total_reviews": "total_reviews",
+    "discount_price": "discount_price",
+    "discount_percent": "discount_percent",
+    "discount_start": "discount_start",
+    "discount_end": "discount_end",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+
+
+class ExportRenderer(BaseRenderer):
+    """Only used for content negotiation and error bodies; exports stream their own content."""
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False).encode(self.charset)
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class JSONLExportRenderer(ExportRenderer):
+    media_type = "application/x-ndjson"
+    format = "jsonl"
+
+
+EXPORT_RENDERERS = [CSVExportRenderer, JSONLExportRenderer]
+
+
+class _Echo:
+    # csv.writer ghi vào đây và nhận lại chính dòng đã định dạng
+    def write(self, value):
+        return value
+
+
+def _csv_lines(rows, columns):
+    writer = csv.writer(_Echo())
+    # BOM để Excel nhận đúng UTF-8 (tiếng Việt)
+    yield "\ufeff" + writer.writerow(columns)
+    lookups = list(columns.values())
+    for row in rows:
+        yield writer.writerow([row[lookup] for lookup in lookups])
+
+
+def _jsonl_lines(rows, columns):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode({name: row[lookup] for name, lookup in columns.items()}) + "\n"
+
+
+def _chunked(lines):
+    # Gộp vài trăm dòng mỗi lần ghi thay vì mỗi dòng một lần
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def export_response(request, queryset, columns, name):
+    """
+    Stream ``queryset`` as CSV or JSONL, chosen by ``request.accepted_renderer``.
+    ``columns`` maps output column -> ``values()`` lookup.
+    """
+    fmt = getattr(request.accepted_renderer, "format", "csv")
+    rows = queryset.values(*columns.values()).iterator(chunk_size=CHUNK_SIZE)
+    lines = _jsonl_lines(rows, columns) if fmt == "jsonl" else _csv_lines(rows, columns)
+    response = StreamingHttpResponse(
+        _chunked(lines),
+        content_type=JSONLExportRenderer.media_type if fmt == "jsonl" else "text/csv; charset=utf-8",
+    )
+    filename = f"{name}-{timezone.localdate():%Y%m%d}.{fmt}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,195 @@
+"""
+Resized derivatives of uploaded images.
+
+Every image in ``IMAGE_FIELDS`` gets WebP and JPEG copies at each size in
+``VARIANTS``. Their names come from the original's name, e.g.
+``products/shoe.png`` -> ``derivatives/products/shoe/card.webp``. Once
+written, the actual width of each variant is recorded in
+``StoredFile.derivatives``; serializers read it from there (or from a
+``with_derivatives`` annotation) and never touch the filesystem.
+
+Rows whose ``derivatives`` is still NULL are the work queue: the
+``build_image_derivatives`` command (``--watch`` for a long-running
+worker) generates them outside the web process. With
+``IMAGE_DERIVATIVES_INLINE`` they are generated right after the upload
+commits instead, for development.
+"""
+import io
+import logging
+import os
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import OuterRef, Subquery
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from .storage import CONTENT_DIR
+
+logger = logging.getLogger(__name__)
+
+# Tên biến thể -> cạnh dài nhất (px); ảnh nhỏ hơn không bị phóng to
+VARIANTS = {
+    "thumbnail": 160,
+    "card": 480,
+    "detail": 1200,
+}
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+DERIVATIVES_DIR = "derivatives"
+
+# (app_label.Model, [field, ...]) có ảnh cần tạo biến thể
+IMAGE_FIELDS = {
+    "product.Product": ["image"],
+    "product.Review": ["image"],
+    "account.Seller": ["logo", "banner"],
+    "account.Profile": ["avatar"],
+}
+
+
+def derivative_name(name, variant, fmt):
+    stem, _ = posixpath.splitext(name)
+    return posixpath.join(DERIVATIVES_DIR, stem, f"{variant}.{fmt}")
+
+
+def generate_derivatives(name, force=False):
+    """Write every variant of the image stored at ``name`` and record their widths. Returns bytes written."""
+    from .models import StoredFile
+
+    storage = default_storage
+    if not force and StoredFile.objects.filter(name=name, derivatives__isnull=False).exists():
+        return 0
+    last = derivative_name(name, list(VARIANTS)[-1], list(FORMATS)[-1])
+    if not force and storage.exists(last):
+        # Biến thể đã có sẵn trên đĩa (tạo trước khi ghi vào DB): chỉ đọc lại kích thước
+        widths = {}
+        for variant in VARIANTS:
+            with storage.open(derivative_name(name, variant, "webp"), "rb") as handle, Image.open(handle) as image:
+                widths[variant] = image.width
+        StoredFile.objects.filter(name=name).update(derivatives=widths)
+        return 0
+
+    with storage.open(name, "rb") as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+
+    written = 0
+    widths = {}
+    for variant, size in VARIANTS.items():
+        resized = original.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        widths[variant] = resized.width
+        for fmt, (pil_format, options) in FORMATS.items():
+            image = resized
+            if pil_format == "JPEG" and image.mode != "RGB":
+                image = _flatten(image)
+            elif image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, **options)
+            target = derivative_name(name, variant, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            written += buffer.tell()
+    StoredFile.objects.filter(name=name).update(derivatives=widths)
+    _recorded.pop(name, None)
+    return written
+
+
+def delete_derivatives(name):
+    for variant in VARIANTS:
+        for fmt in FORMATS:
+            default_storage.delete(derivative_name(name, variant, fmt))
+
+
+def _flatten(image):
+    # JPEG không có kênh alpha, phủ lên nền trắng
+    image = image.convert("RGBA")
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def safe_generate(name, force=False):
+    from .models import StoredFile
+
+    try:
+        return generate_derivatives(name, force)
+    except Exception:
+        logger.exception("Không tạo được biến thể cho ảnh %s", name)
+        # Ghi {} để ảnh lỗi rời hàng đợi; --force sẽ thử lại
+        StoredFile.objects.filter(name=name, derivatives__isnull=True).update(derivatives={})
+        return 0
+
+
+def init_worker():
+    """ProcessPoolExecutor initializer for ``build_image_derivatives --workers``."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+
+    django.setup()
+
+
+# Biến thể của file lưu theo nội dung không đổi sau khi tạo, nên nhớ luôn trong process
+_recorded = {}
+RECORDED_MEMO_SIZE = 10_000
+
+
+def with_derivatives(queryset, *fields):
+    """Annotate ``<field>_derivatives`` for each image field, so a page of rows needs no extra query."""
+    from .models import StoredFile
+
+    return queryset.annotate(**{
+        f"{field}_derivatives": Subquery(StoredFile.objects.filter(name=OuterRef(field)).values("derivatives")[:1])
+        for field in fields
+    })
+
+
+def recorded_derivatives(field_file):
+    """{variant: width} recorded for the image, or None when not generated yet."""
+    from .models import StoredFile
+
+    annotated = f"{field_file.field.name}_derivatives"
+    if annotated in field_file.instance.__dict__:
+        return field_file.instance.__dict__[annotated]
+    name = field_file.name
+    widths = _recorded.get(name)
+    if widths is None:
+        widths = StoredFile.objects.filter(name=name).values_list("derivatives", flat=True).first()
+        if widths and name.startswith(f"{CONTENT_DIR}/"):
+            if len(_recorded) >= RECORDED_MEMO_SIZE:
+                _recorded.clear()
+            _recorded[name] = widths
+    return widths
+
+
+def variant_urls(field_file, request=None):
+    """{"webp": {variant: url}, "jpeg": {...}, "srcset": "..."} or None when not generated yet."""
+    if not field_file or not field_file.name:
+        return None
+    widths = recorded_derivatives(field_file)
+    if not widths:
+        return None
+
+    def url(variant, fmt):
+        location = field_file.storage.url(derivative_name(field_file.name, variant, fmt))
+        return request.build_absolute_uri(location) if request else location
+
+    variants = {fmt: {variant: url(variant, fmt) for variant in VARIANTS} for fmt in FORMATS}
+    # Ảnh nhỏ hơn biến thể giữ nguyên kích thước: ghi chiều rộng thật, bỏ biến thể trùng chiều rộng
+    srcset = {}
+    for variant in VARIANTS:
+        srcset.setdefault(widths[variant], variants["webp"][variant])
+    variants["srcset"] = ", ".join(f"{location} {width}w" for width, location in srcset.items())
+    return variants
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Read-only map of variant URLs for an image field, see ``variant_urls``."""
+
+    def to_representation(self, value):
+        return variant_urls(value, self.context.get("request"))
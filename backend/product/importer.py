@@ -0,0 +1,183 @@
+"""
+Bulk product import for sellers.
+
+A CSV or JSON Lines file is read one row at a time and validated in
+batches of ``BATCH_SIZE``. Each batch is upserted on ``(seller, sku)``
+with a single ``bulk_create(update_conflicts=True)``, i.e. ``INSERT ...
+ON CONFLICT DO UPDATE``. Memory stays flat whatever the file
+size. Each row describes the whole product, so optional columns left out
+fall back to their defaults. Used by ``SellerProductViewSet.bulk_import``
+and the ``import_products`` command.
+"""
+import codecs
+import csv
+import json
+import posixpath
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from account.cache import admin_stats_cache, category_cache
+from account.models import Notification
+from category.models import Category
+
+from .models import Product
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+REQUIRED_COLUMNS = ("sku", "name", "category", "price", "stock")
+UPDATE_FIELDS = [
+    "name", "description", "category", "price", "stock", "is_active",
+    "discount_price", "discount_percent", "discount_start", "discount_end", "current_price", "updated_at",
+]
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """One row of an import file. ``category`` may be an id, slug or name."""
+    sku = serializers.CharField(max_length=64)
+    name = serializers.CharField(max_length=100)
+    description = serializers.CharField(allow_blank=True, default="")
+    category = serializers.CharField()
+    price = serializers.IntegerField(min_value=0)
+    stock = serializers.IntegerField(min_value=0)
+    is_active = serializers.BooleanField(default=True)
+    discount_price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0, allow_null=True, default=None)
+    discount_percent = serializers.IntegerField(min_value=0, max_value=100, allow_null=True, default=None)
+    discount_start = serializers.DateTimeField(allow_null=True, default=None)
+    discount_end = serializers.DateTimeField(allow_null=True, default=None)
+
+    def validate_category(self, value):
+        category_id = self.context["categories"].get(value.strip().lower())
+        if category_id is None:
+            raise serializers.ValidationError(f"Danh mục '{value}' không tồn tại.")
+        return category_id
+
+
+def import_format(filename):
+    return FORMATS.get(posixpath.splitext(filename or "")[1].lower())
+
+
+def category_map():
+    """Lower-cased id, slug and name -> category id, loaded in one query."""
+    categories = {}
+    for category_id, slug, name in Category.objects.values_list("id", "slug", "name"):
+        categories[str(category_id)] = category_id
+        categories[slug.lower()] = category_id
+        categories[name.lower()] = category_id
+    return categories
+
+
+def iter_rows(file, fmt):
+    """Yield (line number, row dict) from a binary file without reading it all."""
+    lines = codecs.iterdecode(file, "utf-8-sig")
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise serializers.ValidationError({"file": f"Thiếu cột: {', '.join(missing)}"})
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for line_num, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_num, row if isinstance(row, dict) else None
+    else:
+        raise serializers.ValidationError({"format": "Chỉ hỗ trợ file CSV hoặc JSONL."})
+
+
+class ProductImporter:
+    def __init__(self, seller, batch_size=BATCH_SIZE):
+        self.seller = seller
+        self.batch_size = batch_size
+        self.row_serializer = ProductImportRowSerializer(context={"categories": category_map()})
+        self.rows = self.created = self.updated = self.failed = 0
+        self.errors = []
+
+    def run(self, file, fmt):
+        batch = {}
+        for line_num, row in iter_rows(file, fmt):
+            self.rows += 1
+            data = self.validate(line_num, row)
+            if data is not None:
+                # SKU lặp lại trong cùng một lô: dòng sau ghi đè dòng trước
+                batch[data["sku"]] = data
+            if len(batch) >= self.batch_size:
+                self.write(batch)
+                batch = {}
+        if batch:
+            self.write(batch)
+        if self.created or self.updated:
+            self.notify()
+        return self.summary()
+
+    def validate(self, line_num, row):
+        if row is None:
+            self.add_error(line_num, None, {"row": ["Dòng không phải một object JSON hợp lệ."]})
+            return None
+        # Ô trống coi như không nhập, để field dùng giá trị mặc định
+        row = {key.strip(): value for key, value in row.items() if key and value not in ("", None)}
+        try:
+            # Dùng lại một serializer cho mọi dòng, không dựng lại field mỗi lần
+            return self.row_serializer.run_validation(row)
+        except serializers.ValidationError as exc:
+            self.add_error(line_num, row.get("sku"), exc.detail)
+            return None
+
+    def add_error(self, line_num, sku, detail):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_num, "sku": sku, "errors": detail})
+
+    @transaction.atomic
+    def write(self, batch):
+        existing = set(
+            Product.objects.filter(seller=self.seller, sku__in=list(batch)).values_list("sku", flat=True)
+        )
+        products = []
+        for data in batch.values():
+            product = Product(seller=self.seller, status="pending")
+            for field, value in data.items():
+                setattr(product, "category_id" if field == "category" else field, value)
+            products.append(product)
+        # Một câu INSERT ... ON CONFLICT (seller_id, sku) DO UPDATE cho cả lô;
+        # sản phẩm đã có giữ nguyên status, created_at và số liệu bán hàng
+        Product.objects.bulk_create(
+            products, update_conflicts=True, unique_fields=["seller", "sku"], update_fields=UPDATE_FIELDS,
+        )
+        self.created += len(batch) - len(existing)
+        self.updated += len(existing)
+        # bulk_create không phát signal
+        transaction.on_commit(admin_stats_cache.invalidate)
+        transaction.on_commit(category_cache.invalidate)
+
+    def notify(self):
+        Notification.objects.create(
+            target_role="admin",
+            title="Nhập sản phẩm",
+            link="/admin/products",
+            message=(
+                f"{self.seller.shop_name} vừa nhập {self.created + self.updated} sản phẩm "
+                f"({self.created} mới, {self.updated} cập nhật)"
+            ),
+        )
+
+    def summary(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def import_products(seller, file, fmt, batch_size=BATCH_SIZE):
+    """Import ``file`` (binary, CSV or JSONL) for ``seller``. Returns the summary dict."""
+    return ProductImporter(seller, batch_size).run(file, fmt)
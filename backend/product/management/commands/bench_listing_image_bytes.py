@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import time
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from account.models import Seller
+from product.images import derivative_name, generate_derivatives
+from product.models import Product, StoredFile
+from product.views import ProductViewSet
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh số byte ảnh một trang danh sách sản phẩm phải tải: ảnh gốc và biến thể card. "
+        "Dùng ảnh trong MEDIA_ROOT/products, chép sang thư mục tạm; dữ liệu được rollback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=os.path.join(settings.MEDIA_ROOT, "products"))
+        parser.add_argument("--variant", default="card")
+        parser.add_argument("--format", default="webp")
+
+    def handle(self, *args, **options):
+        sources = sorted(
+            name for name in os.listdir(options["source"]) if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        media_root = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(media_root, "products"))
+            for name in sources:
+                shutil.copy(os.path.join(options["source"], name), os.path.join(media_root, "products", name))
+            with override_settings(MEDIA_ROOT=media_root), transaction.atomic():
+                self.measure(media_root, sources, options)
+                transaction.set_rollback(True)
+        finally:
+            shutil.rmtree(media_root)
+
+    def measure(self, media_root, sources, options):
+        seller = Seller.objects.create(user=User.objects.create_user("bench-images"), shop_name="Bench")
+        Product.objects.bulk_create(
+            Product(name=f"Bench {name}", price=1000, stock=1, seller=seller, image=f"products/{name}")
+            for name in sources
+        )
+        StoredFile.objects.bulk_create(StoredFile(name=f"products/{name}", ref_count=1) for name in sources)
+
+        started = time.perf_counter()
+        for name in sources:
+            generate_derivatives(f"products/{name}")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Generated derivatives for {len(sources)} images in {elapsed:.2f}s")
+
+        request = APIRequestFactory(HTTP_HOST="localhost").get("/api/product/")
+        response = ProductViewSet.as_view({"get": "list"})(request)
+        results = response.data["results"]
+
+        prefix = f"http://localhost{settings.MEDIA_URL}"
+        before = after = 0
+        for product in results:
+            name = unquote(product["image"].removeprefix(prefix))
+            before += os.path.getsize(os.path.join(media_root, name))
+            after += os.path.getsize(os.path.join(
+                media_root, derivative_name(name, options["variant"], options["format"])
+            ))
+            self.check_url(product, prefix, name, options)
+
+        self.stdout.write(
+            f"Listing page ({len(results)} products): originals {before / 1024:.0f} KiB, "
+            f"{options['variant']}.{options['format']} {after / 1024:.0f} KiB "
+            f"({100 * (1 - after / before):.1f}% less)"
+        )
+
+    def check_url(self, product, prefix, name, options):
+        expected = prefix + derivative_name(name, options["variant"], options["format"])
+        if unquote(product["image_variants"][options["format"]][options["variant"]]) != expected:
+            raise AssertionError(f"Unexpected variant URL for {name}")
@@ -0,0 +1,61 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from product.media import serve_media
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo CPU của worker trên mỗi MB ảnh giao đi: Django tự gửi cả file, gửi theo Range, "
+        "trả 304, và chuyển cho nginx bằng X-Accel-Redirect."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--directory", default="products", help="Thư mục con trong MEDIA_ROOT")
+        parser.add_argument("--passes", type=int, default=50)
+
+    def handle(self, *args, **options):
+        directory = options["directory"]
+        names = [
+            f"{directory}/{name}" for name in sorted(os.listdir(os.path.join(settings.MEDIA_ROOT, directory)))
+            if os.path.isfile(os.path.join(settings.MEDIA_ROOT, directory, name))
+        ]
+        factory = RequestFactory(HTTP_HOST="localhost")
+        etags = {name: serve_media(factory.get(f"/media/{name}"), name)["ETag"] for name in names}
+
+        self.run("python (full body)", names, options["passes"], lambda name: factory.get(f"/media/{name}"))
+        self.run("python (Range 64 KiB)", names, options["passes"],
+                 lambda name: factory.get(f"/media/{name}", HTTP_RANGE="bytes=0-65535"))
+        self.run("304 If-None-Match", names, options["passes"],
+                 lambda name: factory.get(f"/media/{name}", HTTP_IF_NONE_MATCH=etags[name]))
+        with override_settings(MEDIA_ACCEL="nginx"):
+            self.run("X-Accel-Redirect", names, options["passes"], lambda name: factory.get(f"/media/{name}"),
+                     proxy_sends_file=True)
+
+    def run(self, label, names, passes, make_request, proxy_sends_file=False):
+        served = 0
+        requests = 0
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        for _ in range(passes):
+            for name in names:
+                response = serve_media(make_request(name), name)
+                if response.streaming:
+                    for chunk in response.streaming_content:
+                        served += len(chunk)
+                    response.close()
+                elif proxy_sends_file:
+                    served += os.path.getsize(os.path.join(settings.MEDIA_ROOT, name))
+                requests += 1
+        cpu = time.process_time() - cpu_started
+        elapsed = time.perf_counter() - started
+        megabytes = served / (1024 * 1024)
+        per_mb = f"{cpu * 1000 / megabytes:.2f} ms CPU/MB" if megabytes else "no body"
+        self.stdout.write(
+            f"{label:24} {requests} requests, {megabytes:8.1f} MB, {per_mb}, "
+            f"{cpu * 1e6 / requests:.0f} us CPU/request, {requests / elapsed:.0f} req/s"
+        )
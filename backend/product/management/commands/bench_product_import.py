@@ -0,0 +1,65 @@
+import csv
+import os
+import resource
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from account.models import Seller
+from category.models import Category
+from product.importer import BATCH_SIZE, import_products
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo thời gian và bộ nhớ khi nhập một file CSV lớn: lần đầu tạo mới, lần hai cập nhật "
+        "theo SKU. File được sinh ra thư mục tạm, dữ liệu được rollback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        try:
+            with os.fdopen(handle, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(["sku", "name", "description", "category", "price", "stock"])
+                for i in range(options["rows"]):
+                    writer.writerow([
+                        f"SKU-{i:07d}", f"Sản phẩm {i}", f"Mô tả sản phẩm số {i}",
+                        f"bench-category-{i % options['categories']}", 10_000 + i % 5000, i % 100,
+                    ])
+            self.stdout.write(f"{options['rows']} rows, {os.path.getsize(path) / 2**20:.1f} MiB CSV")
+            # DEBUG ghi lại mọi câu SQL, tắt đi để đo như production
+            with override_settings(DEBUG=False), transaction.atomic():
+                self.measure(path, options)
+                transaction.set_rollback(True)
+        finally:
+            os.remove(path)
+
+    def measure(self, path, options):
+        seller = Seller.objects.create(user=User.objects.create_user("bench-import"), shop_name="Bench")
+        Category.objects.bulk_create(
+            Category(name=f"Bench category {i}", slug=f"bench-category-{i}") for i in range(options["categories"])
+        )
+        for label in ("insert", "update"):
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            started = time.perf_counter()
+            with open(path, "rb") as file:
+                summary = import_products(seller, file, "csv", options["batch_size"])
+            elapsed = time.perf_counter() - started
+            rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.stdout.write(
+                f"{label}: {summary['created']} created, {summary['updated']} updated, "
+                f"{summary['failed']} failed in {elapsed:.1f}s ({summary['rows'] / elapsed:,.0f} rows/s), "
+                f"peak RSS +{(rss_after - rss_before) / 1024:.1f} MiB"
+            )
+        self.stdout.write(f"{Product.objects.filter(seller=seller).count()} products for the seller")
@@ -0,0 +1,86 @@
+import random
+from decimal import Decimal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from product.models import Product
+from product.pagination import KeysetPagination
+from product.views import PRODUCT_SORTS, ProductViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh độ trễ lấy trang thứ N của danh sách sản phẩm: phân trang OFFSET (?page=N) "
+        "và phân trang cursor (?cursor=...), cho từng kiểu sort. Dữ liệu được rollback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=200_000)
+        parser.add_argument("--page", type=int, default=1000)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        # DEBUG ghi lại mọi câu SQL, tắt đi để đo như production
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=["localhost"]), transaction.atomic():
+            self.seed(rng, options["products"])
+            for sort in PRODUCT_SORTS:
+                self.measure(sort, options)
+            transaction.set_rollback(True)
+
+    def seed(self, rng, count):
+        batch = 10_000
+        for start in range(0, count, batch):
+            Product.objects.bulk_create([
+                Product(
+                    name=f"Sản phẩm {i}", price=rng.randint(1, 10**6), total_sold=rng.randint(0, 500),
+                    average_rating=Decimal(rng.randint(0, 50)) / 10,
+                )
+                for i in range(start, min(start + batch, count))
+            ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE" if connection.vendor == "sqlite" else "ANALYZE product_product")
+
+    def fetch(self, params, repeat):
+        factory = APIRequestFactory(HTTP_HOST="localhost")
+        view = ProductViewSet.as_view({"get": "list"})
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = view(factory.get("/api/product/", params))
+                response.render()
+                timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.data
+        timings.sort()
+        return response, timings[len(timings) // 2], len(ctx.captured_queries)
+
+    def measure(self, sort, options):
+        page, size = options["page"], options["page_size"]
+        base = {"sort": sort, "page_size": size}
+        _, first_ms, _ = self.fetch({**base, "page": 1}, options["repeat"])
+        offset_response, offset_ms, offset_queries = self.fetch({**base, "page": page}, options["repeat"])
+
+        # Cursor của trang N lấy từ dòng cuối trang N-1 (như khi người dùng bấm "Xem thêm" liên tục)
+        previous, _, _ = self.fetch({**base, "page": page - 1}, 1)
+        cursor = self.cursor_after(previous.data["results"][-1]["id"], sort)
+        keyset_response, keyset_ms, keyset_queries = self.fetch({**base, "cursor": cursor}, options["repeat"])
+
+        same = [p["id"] for p in offset_response.data["results"]] == [p["id"] for p in keyset_response.data["results"]]
+        self.stdout.write(
+            f"sort={sort:<11} page 1: {first_ms:5.1f}ms | page {page}: OFFSET {offset_ms:7.1f}ms ({offset_queries} queries), "
+            f"cursor {keyset_ms:6.1f}ms ({keyset_queries} queries), "
+            f"{offset_ms / keyset_ms:5.1f}x faster, same rows: {same}"
+        )
+
+    def cursor_after(self, product_id, sort):
+        paginator = KeysetPagination()
+        paginator.ordering = list(PRODUCT_SORTS[sort])
+        return paginator.cursor_token(Product.objects.get(pk=product_id))
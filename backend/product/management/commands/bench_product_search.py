@@ -0,0 +1,65 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from product.models import Product
+from product.views import ProductViewSet
+
+WORDS = (
+    "áo quần giày dép túi ví mũ kính đồng hồ sữa bánh kẹo sách bút vở điện thoại "
+    "tai nghe sạc cáp chuột bàn phím màn hình laptop nồi chảo bát đĩa gối chăn "
+    "cotton jean da thể thao trẻ em nữ nam cao cấp giảm giá chính hãng nhập khẩu"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo độ trễ p50/p95 của tìm kiếm sản phẩm (keyword và sort=relevance) "
+        "trên dữ liệu giả lập. Dữ liệu được tạo trong một transaction và rollback khi kết thúc."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, nargs="+", default=[100_000, 1_000_000])
+        parser.add_argument("--queries", type=int, default=100)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            for size in sorted(options["products"]):
+                self.seed(rng, size - Product.objects.count())
+                for sort in (None, "relevance"):
+                    self.measure(rng, size, sort, options["queries"])
+            transaction.set_rollback(True)
+
+    def seed(self, rng, count):
+        def make(i):
+            name = " ".join(rng.sample(WORDS, 3))
+            description = " ".join(rng.choices(WORDS, k=30))
+            return Product(name=name[:100], description=description, price=rng.randint(1, 10**6))
+
+        batch = 10_000
+        for start in range(0, max(count, 0), batch):
+            Product.objects.bulk_create([make(i) for i in range(start, min(start + batch, count))])
+
+    def measure(self, rng, size, sort, queries):
+        factory = APIRequestFactory(HTTP_HOST="localhost")
+        view = ProductViewSet.as_view({"get": "list"})
+        timings = []
+        for _ in range(queries):
+            params = {"keyword": " ".join(rng.sample(WORDS, 2))}
+            if sort:
+                params["sort"] = sort
+            started = time.perf_counter()
+            response = view(factory.get("/api/product/", params))
+            response.render()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"products={size} sort={sort or 'default'} "
+            f"p50={timings[len(timings) // 2]:.1f}ms "
+            f"p95={timings[int(len(timings) * 0.95) - 1]:.1f}ms"
+        )
@@ -0,0 +1,50 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from product.models import Product, Review
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo chi phí tạo / sửa / xóa review khi sản phẩm đã có nhiều review. "
+        "Dữ liệu được tạo trong một transaction và rollback khi kết thúc."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reviews", type=int, default=50_000)
+        parser.add_argument("--samples", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user("bench-review-rating")
+            product = Product.objects.create(name="Bench rating", price=1)
+            for existing in (0, options["reviews"]):
+                missing = existing - product.reviews.count()
+                Review.objects.bulk_create(
+                    (Review(product=product, user=user, rating=Decimal(1 + i % 5)) for i in range(missing)),
+                    batch_size=5000,
+                )
+                self.measure(product, user, existing, options["samples"])
+            transaction.set_rollback(True)
+
+    def measure(self, product, user, existing, samples):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            for i in range(samples):
+                review = Review.objects.create(product=product, user=user, rating=Decimal(1 + i % 5))
+                review.rating = Decimal(5)
+                review.save()
+                review.reply = "Cảm ơn bạn"
+                review.save()
+                review.delete()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"existing_reviews={existing} "
+            f"per_review={elapsed / samples * 1000:.3f}ms "
+            f"queries_per_review={len(ctx.captured_queries) / samples:.1f}"
+        )
@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from product.images import init_worker, safe_generate
+from product.models import StoredFile
+
+
+class Command(BaseCommand):
+    help = (
+        "Tạo ảnh thu nhỏ WebP/JPEG (thumbnail, card, detail) cho các ảnh trong hàng đợi "
+        "(StoredFile chưa có biến thể). Mặc định chạy hết hàng đợi rồi thoát; --watch để chạy "
+        "liên tục như worker. Ảnh cũ chưa qua dedupe_media chưa có StoredFile nên không được tạo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Tạo lại cả ảnh đã có biến thể")
+        parser.add_argument("--workers", type=int, default=1, help="Số process tạo ảnh song song")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--watch", action="store_true", help="Chạy liên tục, chờ ảnh mới upload")
+        parser.add_argument("--interval", type=float, default=5, help="Số giây chờ khi hàng đợi trống")
+
+    def handle(self, *args, **options):
+        pool = None
+        if options["workers"] > 1:
+            pool = ProcessPoolExecutor(max_workers=options["workers"], initializer=init_worker)
+        try:
+            if options["force"]:
+                names = StoredFile.objects.filter(ref_count__gt=0).order_by("id").values_list("name", flat=True)
+                self.build(list(names), pool, force=True)
+            batch_size = options["batch_size"]
+            while True:
+                queue = StoredFile.objects.filter(derivatives__isnull=True, ref_count__gt=0).order_by("id")
+                names = list(queue.values_list("name", flat=True)[:batch_size])
+                if names:
+                    self.build(names, pool)
+                # Lô đầy thì làm tiếp ngay, hàng đợi trống thì nghỉ
+                if len(names) == batch_size:
+                    continue
+                if not options["watch"]:
+                    break
+                time.sleep(options["interval"])
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def build(self, names, pool, force=False):
+        generate = partial(safe_generate, force=force)
+        written = list(pool.map(generate, names, chunksize=8)) if pool else [generate(name) for name in names]
+        generated = sum(1 for size in written if size)
+        self.stdout.write(f"{len(names)} images, {generated} generated, {sum(written) / 1024:.0f} KiB written")
@@ -0,0 +1,119 @@
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from product.images import IMAGE_FIELDS, delete_derivatives
+from product.models import StoredFile
+from product.storage import CONTENT_DIR, content_digest, content_name, content_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Chuyển ảnh đã upload sang kho lưu theo nội dung (content/<sha256>): gộp các bản trùng, "
+        "cập nhật lại đường dẫn trong DB, đếm lại số tham chiếu và báo dung lượng thu hồi được."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Chỉ báo cáo, không đổi gì")
+        parser.add_argument(
+            "--delete-orphans", action="store_true",
+            help="Xóa cả file ảnh trong MEDIA_ROOT không còn bản ghi nào dùng",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        fields = [
+            (apps.get_model(label), field) for label, names in IMAGE_FIELDS.items() for field in names
+        ]
+
+        referenced = set()
+        for model, field in fields:
+            referenced.update(model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+                              .values_list(field, flat=True))
+
+        # Băm từng file (đọc theo chunk) và gom theo nội dung
+        targets = {}
+        sizes = {}
+        missing = []
+        for name in sorted(referenced):
+            if name.startswith(f"{CONTENT_DIR}/"):
+                continue
+            if not content_storage.exists(name):
+                missing.append(name)
+                continue
+            with content_storage.open(name, "rb") as source:
+                targets[name] = content_name(content_digest(File(source)), name)
+            sizes[name] = content_storage.size(name)
+
+        by_target = defaultdict(list)
+        for name, target in targets.items():
+            by_target[target].append(name)
+        stored_bytes = sum(
+            sizes[names[0]] for target, names in by_target.items() if not content_storage.exists(target)
+        )
+        legacy_bytes = sum(sizes.values())
+
+        orphans = self.find_orphans(referenced) if options["delete_orphans"] else []
+        orphan_bytes = sum(content_storage.size(name) for name in orphans)
+
+        if not dry_run:
+            for target, names in by_target.items():
+                if not content_storage.exists(target):
+                    with content_storage.open(names[0], "rb") as source:
+                        saved = content_storage.save(names[0], File(source))
+                    if saved != target:
+                        raise CommandError(f"{names[0]} was stored as {saved}, expected {target}")
+
+            with transaction.atomic():
+                for model, field in fields:
+                    for name, target in targets.items():
+                        model.objects.filter(**{field: name}).update(**{field: target})
+                self.rebuild_counts(fields)
+
+            for name in list(targets) + orphans:
+                content_storage.delete(name)
+                delete_derivatives(name)
+
+        self.stdout.write(
+            f"{len(targets)} files -> {len(by_target)} unique, "
+            f"{(legacy_bytes - stored_bytes + orphan_bytes) / 1024:.0f} KiB reclaimed "
+            f"({legacy_bytes / 1024:.0f} KiB before, {stored_bytes / 1024:.0f} KiB newly stored, "
+            f"{len(orphans)} orphans {orphan_bytes / 1024:.0f} KiB)"
+            + (" [dry run]" if dry_run else "")
+        )
+        for name in missing:
+            self.stderr.write(f"Missing file referenced in DB: {name}")
+        if targets and not dry_run:
+            self.stdout.write("Run build_image_derivatives to create thumbnails for the new names.")
+
+    def find_orphans(self, referenced):
+        orphans = []
+        upload_dirs = {
+            apps.get_model(label)._meta.get_field(field).upload_to.rstrip("/")
+            for label, names in IMAGE_FIELDS.items()
+            for field in names
+        }
+        for directory in upload_dirs:
+            if not content_storage.exists(directory):
+                continue
+            _, files = content_storage.listdir(directory)
+            for file_name in files:
+                name = f"{directory}/{file_name}"
+                if name not in referenced:
+                    orphans.append(name)
+        return sorted(orphans)
+
+    def rebuild_counts(self, fields):
+        counts = Counter()
+        for model, field in fields:
+            counts.update(model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+                          .values_list(field, flat=True))
+        # Giữ kích thước biến thể đã ghi; tên mới sẽ vào hàng đợi của build_image_derivatives
+        derivatives = dict(StoredFile.objects.filter(derivatives__isnull=False).values_list("name", "derivatives"))
+        StoredFile.objects.all().delete()
+        StoredFile.objects.bulk_create(
+            StoredFile(name=name, ref_count=count, derivatives=derivatives.get(name)) for name, count in counts.items()
+        )
@@ -0,0 +1,182 @@
+import random
+import re
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils.timezone import now
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from account.models import Seller
+from account.views import AdminOrderViewSet, AdminProductViewSet
+from cart.models import Cart, CartItem
+from category.models import Category
+from order.models import Order, OrderItem
+from order.views import OrderViewSet, SellerOrderViewSet
+from product.models import Product
+from product.pagination import KeysetPagination
+from product.views import PRODUCT_SORTS, ProductViewSet, SellerProductViewSet
+
+# Index dùng trong plan: SQLite "USING [COVERING] INDEX x", PostgreSQL "Index [Only] Scan using x" / "Bitmap Index Scan on x"
+INDEX_RE = re.compile(r"USING (?:COVERING )?INDEX (\w+)|Index (?:Only )?Scan(?: Backward)? using (\w+)|Bitmap Index Scan on (\w+)")
+FULL_SCAN_RE = re.compile(r"\bSCAN (\w+)$|Seq Scan on (\w+)")
+INDEXED_MODELS = (Product, Order)
+
+
+class Command(BaseCommand):
+    help = (
+        "Chạy EXPLAIN cho các truy vấn danh sách / thống kê chính trên dữ liệu giả lập, "
+        "lần lượt khi không có và khi có các index trong Meta.indexes của Product và Order. "
+        "Dữ liệu và việc xóa index đều được rollback. Dùng -v 2 để in toàn bộ plan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=50_000)
+        parser.add_argument("--orders", type=int, default=50_000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            self.seed(rng, options)
+            queries = self.queries()
+            after = {name: self.explain(build()) for name, build in queries}
+            self.drop_indexes()
+            before = {name: self.explain(build()) for name, build in queries}
+            transaction.set_rollback(True)
+
+        width = max(len(name) for name, _ in queries)
+        self.stdout.write(f"{'query':<{width}}  {'without Meta.indexes':<48}  with Meta.indexes")
+        for name, _ in queries:
+            self.stdout.write(f"{name:<{width}}  {self.summary(*before[name]):<48}  {self.summary(*after[name])}")
+            if self.verbosity > 1:
+                for label, (plan, _) in (("before", before[name]), ("after", after[name])):
+                    self.stdout.write(f"  {label}:\n    " + plan.replace("\n", "\n    "))
+
+    def seed(self, rng, options):
+        categories = Category.objects.bulk_create(
+            Category(name=f"Explain {i}", slug=f"explain-{i}") for i in range(20)
+        )
+        users = User.objects.bulk_create(User(username=f"explain-{i}") for i in range(1000))
+        sellers = Seller.objects.bulk_create(
+            Seller(user=user, shop_name=f"Explain shop {i}") for i, user in enumerate(users[:50])
+        )
+        self.seller, self.customer = sellers[0], users[100]
+        Product.objects.bulk_create(
+            (
+                Product(
+                    name=f"Explain {i}", price=rng.randint(1, 10**6), category=rng.choice(categories),
+                    seller=rng.choice(sellers), total_sold=rng.randint(0, 500),
+                    average_rating=rng.randint(0, 50) / 10, is_active=rng.random() < 0.9,
+                    status="pending" if rng.random() < 0.05 else "approved",
+                )
+                for i in range(options["products"])
+            ),
+            batch_size=5000,
+        )
+        products = list(Product.objects.values_list("id", flat=True)[:1000])
+        statuses = ["pending", "confirmed", "shipping", "delivered", "delivered", "delivered", "canceled"]
+        orders = Order.objects.bulk_create(
+            (
+                Order(user=rng.choice(users), seller=rng.choice(sellers), status=rng.choice(statuses))
+                for _ in range(options["orders"])
+            ),
+            batch_size=5000,
+        )
+        OrderItem.objects.bulk_create(
+            (OrderItem(order=order, product_id=rng.choice(products), price=1000) for order in orders),
+            batch_size=5000,
+        )
+        # auto_now_add bỏ qua giá trị truyền vào, nên rải lại created_at trong 1 năm
+        today = now()
+        ids = [order.pk for order in orders]
+        for offset in range(365):
+            Order.objects.filter(pk__in=ids[offset::365]).update(created_at=today - timedelta(days=offset))
+        carts = Cart.objects.bulk_create(Cart(user=user) for user in users[:200])
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product_id=product) for cart in carts for product in rng.sample(products, 5)
+        )
+        self.cart = carts[0]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def view_queryset(self, viewset, params, user=None):
+        """The queryset ``viewset`` builds for a list request with ``params``."""
+        request = APIRequestFactory().get("/", params)
+        force_authenticate(request, user=user)
+        view = viewset(request=Request(request), action="list", format_kwarg=None, kwargs={})
+        return view.get_queryset()
+
+    def keyset_page(self, sort):
+        # Trang giữa danh sách, lọc như KeysetPagination với cursor của dòng ở giữa
+        queryset = self.view_queryset(ProductViewSet, {"sort": sort})
+        pagination = KeysetPagination()
+        pagination.ordering = list(PRODUCT_SORTS[sort])
+        position = pagination.position_of(queryset[queryset.count() // 2])
+        return queryset.filter(KeysetPagination.after(pagination.ordering, position))
+
+    def queries(self):
+        today = now().date()
+        last_month = {"created_after": str(today - timedelta(days=30)), "created_before": str(today)}
+        seller_user = self.seller.user
+        staff = User(is_staff=True)
+        return [
+            ("product list newest", lambda: self.view_queryset(ProductViewSet, {})[:10]),
+            ("product list price_asc", lambda: self.view_queryset(ProductViewSet, {"sort": "price_asc"})[:10]),
+            ("product list bestselling", lambda: self.view_queryset(ProductViewSet, {"sort": "bestselling"})[:10]),
+            ("product list rating", lambda: self.view_queryset(ProductViewSet, {"sort": "rating"})[:10]),
+            ("product cursor page bestselling", lambda: self.keyset_page("bestselling")[:10]),
+            ("product category+price range", lambda: self.view_queryset(ProductViewSet, {
+                "categories": str(Category.objects.order_by("id").first().id),
+                "min_price": 100_000, "max_price": 200_000, "sort": "price_asc",
+            })[:10]),
+            ("product price range", lambda: self.view_queryset(
+                ProductViewSet, {"min_price": 100_000, "max_price": 110_000})[:10]),
+            ("seller products", lambda: self.view_queryset(SellerProductViewSet, {}, seller_user)
+                .order_by("-updated_at")[:10]),
+            ("seller top products", lambda: Product.objects.filter(seller=self.seller, total_sold__gt=0)
+                .order_by("-total_sold").values("name", "total_sold")[:5]),
+            ("admin pending products", lambda: self.view_queryset(AdminProductViewSet, {"status": "pending"}, staff)
+                .order_by("-created_at")[:10]),
+            ("customer orders", lambda: self.view_queryset(OrderViewSet, {}, self.customer)[:10]),
+            ("seller orders", lambda: self.view_queryset(SellerOrderViewSet, {}, seller_user)[:10]),
+            ("seller orders status+dates", lambda: self.view_queryset(
+                SellerOrderViewSet, {"status": "delivered", **last_month}, seller_user)[:10]),
+            ("seller orders by status", lambda: Order.objects.filter(seller=self.seller)
+                .values("status").annotate(count=Count("id", distinct=True))),
+            ("admin orders status+dates", lambda: self.view_queryset(
+                AdminOrderViewSet, {"status": "pending", **last_month}, staff)[:10]),
+            ("delivered order items", lambda: OrderItem.objects.filter(
+                order__status="delivered", order__created_at__date__gte=today - timedelta(days=7))),
+            ("cart items", lambda: CartItem.objects.with_product().filter(cart=self.cart)),
+        ]
+
+    def explain(self, queryset):
+        """(plan, best of 3 run times in ms)."""
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        return queryset.explain(), min(timings)
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+            cursor.execute("ANALYZE")
+
+    def summary(self, plan, elapsed):
+        indexes, scans = [], []
+        for line in plan.splitlines():
+            for match in INDEX_RE.finditer(line):
+                indexes.append(next(group for group in match.groups() if group))
+            for match in FULL_SCAN_RE.finditer(line.strip()):
+                scans.append(f"SCAN {next(group for group in match.groups() if group)}")
+        return f"{elapsed:7.2f} ms  " + (", ".join(dict.fromkeys(indexes + scans)) or "-")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from account.models import Seller
+from product.importer import BATCH_SIZE, import_format, import_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Nhập sản phẩm từ file CSV/JSONL cho một seller, cập nhật theo SKU nếu đã có. "
+        "File được đọc từng dòng và ghi theo lô nên dùng được cho catalog rất lớn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("seller", help="Username của tài khoản seller")
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Mặc định theo đuôi file")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            seller = Seller.objects.select_related("user").get(user__username=options["seller"])
+        except Seller.DoesNotExist:
+            raise CommandError(f"Seller {options['seller']} does not exist")
+        fmt = options["format"] or import_format(options["path"])
+        try:
+            with open(options["path"], "rb") as file:
+                summary = import_products(seller, file, fmt, options["batch_size"])
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        self.stdout.write(
+            f"{summary['rows']} rows: {summary['created']} created, "
+            f"{summary['updated']} updated, {summary['failed']} failed"
+        )
+        for error in summary["errors"]:
+            self.stderr.write(f"line {error['line']} ({error['sku']}): {error['errors']}")
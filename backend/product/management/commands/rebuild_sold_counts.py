@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from order.models import OrderItem
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = "Tính lại Product.total_sold từ lịch sử các đơn đã giao."
+
+    def handle(self, *args, **options):
+        delivered = (
+            OrderItem.objects.filter(product=OuterRef("pk"), order__status="delivered")
+            .values("product")
+            .annotate(sold=Sum("quantity"))
+            .values("sold")
+        )
+        updated = Product.objects.update(total_sold=Coalesce(Subquery(delivered), 0))
+        self.stdout.write(self.style.SUCCESS(f"Đã cập nhật total_sold cho {updated} sản phẩm."))
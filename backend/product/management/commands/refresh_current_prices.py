@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Cập nhật Product.current_price khi khung giờ giảm giá bắt đầu hoặc kết thúc. "
+        "Mặc định chạy liên tục, ngủ đến mốc giảm giá kế tiếp (tối đa --interval giây)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=300, help="Số giây chờ tối đa giữa hai lần cập nhật")
+        parser.add_argument("--once", action="store_true", help="Cập nhật một lần rồi thoát (chạy bằng cron)")
+
+    def handle(self, *args, **options):
+        while True:
+            updated = Product.objects.refresh_current_prices()
+            if updated:
+                self.stdout.write(f"Updated current_price of {updated} products")
+            if options["once"]:
+                break
+            time.sleep(self.seconds_until_next_boundary(options["interval"]))
+
+    def seconds_until_next_boundary(self, interval):
+        now = timezone.now()
+        boundaries = Product.objects.aggregate(
+            start=Min("discount_start", filter=Q(discount_start__gt=now)),
+            end=Min("discount_end", filter=Q(discount_end__gte=now)),
+        )
+        upcoming = [boundary for boundary in boundaries.values() if boundary is not None]
+        if not upcoming:
+            return interval
+        # discount_end vẫn còn giảm giá, nên chờ qua mốc một chút
+        wait = (min(upcoming) - now + timedelta(seconds=1)).total_seconds()
+        return min(max(wait, 0), interval)
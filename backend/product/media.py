@@ -0,0 +1,152 @@
+"""
+Serve files under ``MEDIA_ROOT``.
+
+Unlike ``django.views.static.serve`` this view answers conditional requests
+with 304 (strong ``ETag`` and ``Last-Modified``), supports single byte
+ranges, and marks content-addressed files (``content/...``) as immutable.
+Derivatives keep the normal max-age: ``build_image_derivatives --force``
+rewrites them under the same URL, so their ETag follows the file. With ``MEDIA_ACCEL`` set it only checks the
+request and hands the file to the front proxy, so the worker never reads
+the image bytes:
+
+* ``"nginx"``: ``X-Accel-Redirect: <MEDIA_ACCEL_PREFIX><path>``, with an
+  ``internal`` nginx location aliased to ``MEDIA_ROOT``
+* ``"sendfile"``: ``X-Sendfile: <absolute path>`` for Apache mod_xsendfile
+  or lighttpd
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .images import DERIVATIVES_DIR
+from .storage import CONTENT_DIR
+
+IMMUTABLE_PREFIXES = (f"{CONTENT_DIR}/",)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def _etag(path, stat):
+    # Tên file theo nội dung đã chứa sha256, dùng luôn làm ETag
+    if path.startswith(f"{CONTENT_DIR}/"):
+        return f'"{posixpath.splitext(posixpath.basename(path))[0]}"'
+    # Biến thể: derivatives/content/ab/<sha256>/card.webp -> "<sha256>-card.webp-<size>-<mtime>";
+    # tạo lại (--force) ghi đè cùng đường dẫn nên ETag phải đổi theo file
+    if path.startswith(f"{DERIVATIVES_DIR}/{CONTENT_DIR}/"):
+        digest, name = path.split("/")[-2:]
+        return f'"{digest}-{name}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        return "*" in etags or etag in etags
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def _requested_range(request, etag, mtime, size):
+    """(start, end) inclusive, None for the whole file, or False if unsatisfiable."""
+    header = request.headers.get("Range")
+    if not header:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range:
+        if_range_date = parse_http_date_safe(if_range)
+        if if_range != etag and (if_range_date is None or int(mtime) > if_range_date):
+            return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Không hỗ trợ nhiều khoảng, trả cả file như RFC 9110 cho phép
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(full_path, start, length):
+    with open(full_path, "rb") as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _set_headers(response, path, etag, mtime):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(mtime)
+    response["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL if path.startswith(IMMUTABLE_PREFIXES)
+        else f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+    )
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404("Không tìm thấy file")
+    if not os.path.isfile(full_path):
+        raise Http404("Không tìm thấy file")
+
+    path = path.replace(os.sep, "/")
+    etag = _etag(path, stat)
+    mtime = stat.st_mtime
+    if _not_modified(request, etag, mtime):
+        return _set_headers(HttpResponseNotModified(), path, etag, mtime)
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    accel = getattr(settings, "MEDIA_ACCEL", None)
+    if accel == "nginx":
+        # nginx tự xử lý Range và gửi file bằng sendfile()
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = quote(getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/") + path)
+        return _set_headers(response, path, etag, mtime)
+    if accel == "sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = full_path
+        return _set_headers(response, path, etag, mtime)
+
+    size = stat.st_size
+    byte_range = _requested_range(request, etag, mtime, size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    if byte_range is None:
+        response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        body = _read_range(full_path, start, length) if request.method == "GET" else []
+        response = StreamingHttpResponse(body, status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    return _set_headers(response, path, etag, mtime)
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_reserved_stock(apps, schema_editor):
+    # Các đơn chưa giao và chưa hủy đang giữ hàng trong kho
+    Product = apps.get_model('product', 'Product')
+    OrderItem = apps.get_model('order', 'OrderItem')
+    held = (
+        OrderItem.objects.exclude(order__status__in=['delivered', 'canceled'])
+        .values('product')
+        .annotate(total=Sum('quantity'))
+    )
+    for row in held:
+        Product.objects.filter(pk=row['product']).update(reserved_stock=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0008_alter_orderitem_product'),
+        ('product', '0014_remove_voucher_seller_product_discount_end_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='reserved_stock',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_reserved_stock, migrations.RunPython.noop),
+    ]
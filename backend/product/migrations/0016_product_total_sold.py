@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_total_sold(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    OrderItem = apps.get_model('order', 'OrderItem')
+    delivered = (
+        OrderItem.objects.filter(product=OuterRef('pk'), order__status='delivered')
+        .values('product')
+        .annotate(sold=Sum('quantity'))
+        .values('sold')
+    )
+    Product.objects.update(total_sold=Coalesce(Subquery(delivered), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0008_alter_orderitem_product'),
+        ('product', '0015_product_reserved_stock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='total_sold',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(backfill_total_sold, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_sum(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    Review = apps.get_model('product', 'Review')
+    per_product = Review.objects.filter(product=OuterRef('pk')).values('product')
+    Product.objects.update(
+        rating_sum=Coalesce(
+            Subquery(per_product.annotate(s=Sum('rating')).values('s')), 0,
+            output_field=models.DecimalField(),
+        ),
+        total_reviews=Coalesce(Subquery(per_product.annotate(c=Count('id')).values('c')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0016_product_total_sold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
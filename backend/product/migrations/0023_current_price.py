@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+import product.models
+
+
+def fill_current_price(apps, schema_editor):
+    apps.get_model('product', 'Product').objects.update(current_price=product.models.effective_price(timezone.now()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0022_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_price',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_cat_price',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='current_price',
+            field=product.models.CurrentPriceField(decimal_places=2, default=0, editable=False, max_digits=12),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_current_price, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['current_price', 'id'], name='product_active_price'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'current_price', 'id'], name='product_active_cat_price'),
+        ),
+    ]
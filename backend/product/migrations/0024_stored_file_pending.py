@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0023_current_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedfile',
+            name='pending',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0024_stored_file_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedfile',
+            name='derivatives',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='storedfile',
+            index=models.Index(condition=models.Q(('derivatives__isnull', True)), fields=['id'], name='storedfile_derivatives_todo'),
+        ),
+    ]
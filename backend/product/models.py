@@ -1,16 +1,76 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Cast, Round
+from django.db.models.lookups import GreaterThan
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 from decimal import Decimal
 from category.models import Category
 from account.models import Seller
 from django.utils import timezone
 from django.contrib.auth.models import User
+from .storage import content_storage
+
+CENT = Decimal('0.01')
+
+
+def effective_price(at):
+    """SQL form of ``Product.get_final_price()`` at time ``at``."""
+    in_window = Q(discount_start__lte=at, discount_end__gte=at)
+    return Cast(
+        Case(
+            When(in_window & ~Q(discount_price=0) & Q(discount_price__lt=F('price')), then=F('discount_price')),
+            When(
+                in_window & Q(discount_percent__gt=0, discount_percent__lte=100),
+                then=Cast('price', models.FloatField()) * (100 - F('discount_percent')) / 100,
+            ),
+            default=F('price'),
+            output_field=models.FloatField(),
+        ),
+        models.DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+class CurrentPriceField(models.DecimalField):
+    """
+    Price after discount, written from ``get_final_price()`` on every save and
+    ``bulk_create``. ``refresh_current_prices`` keeps it right when a discount
+    window opens or closes between saves.
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_digits', 12)
+        kwargs.setdefault('decimal_places', 2)
+        kwargs['editable'] = False
+        super().__init__(*args, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        value = Decimal(model_instance.get_final_price()).quantize(CENT)
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+class ProductQuerySet(models.QuerySet):
+    def refresh_current_prices(self, at=None):
+        """Rewrite ``current_price`` of products whose discount started or ended. Returns the count."""
+        price = effective_price(at or timezone.now())
+        return (
+            self.filter(discount_start__isnull=False, discount_end__isnull=False)
+            .exclude(current_price=price)
+            .update(current_price=price)
+        )
+
+
 class Product(models.Model):
     name = models.CharField(max_length=100)
+    sku = models.CharField(max_length=64, null=True, blank=True)  # mã hàng của seller, dùng khi nhập hàng loạt
     description = models.TextField(blank=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products',null=True, blank=True)
     price = models.IntegerField(default=0)
     stock = models.PositiveIntegerField(default=0)
-    image = models.ImageField(upload_to='products/', null=True, blank=True)
+    reserved_stock = models.PositiveIntegerField(default=0)  # giữ cho các đơn chưa giao
+    total_sold = models.PositiveIntegerField(default=0)  # tổng số lượng đã giao
+    image = models.ImageField(upload_to='products/', storage=content_storage, null=True, blank=True)
     seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='products', null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -23,12 +83,45 @@ class Product(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
     average_rating = models.DecimalField(max_digits=2, decimal_places=1, default=0.0)
     total_reviews = models.PositiveIntegerField(default=0)
+    rating_sum = models.DecimalField(max_digits=12, decimal_places=1, default=0)  # tổng điểm để tính average_rating
     discount_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     discount_percent = models.PositiveIntegerField(null=True, blank=True)
     discount_start = models.DateTimeField(null=True, blank=True)
     discount_end = models.DateTimeField(null=True, blank=True)
+    # Giá sau giảm lưu sẵn để lọc / sort giá bằng index
+    current_price = CurrentPriceField()
+    # tsvector do trigger trong DB cập nhật (PostgreSQL), xem product/search.py
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'sku'], name='unique_seller_sku'),
+        ]
+        # Theo các truy vấn thật, kiểm tra bằng `manage.py explain_queries`
+        indexes = [
+            # Trang chủ chỉ lấy sản phẩm đang bán: (khóa sort, id) cho từng kiểu sort và phân
+            # trang cursor (product/pagination.py); current_price/average_rating phục vụ luôn bộ lọc khoảng
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_active=True), name='product_active_created'),
+            models.Index(fields=['current_price', 'id'], condition=models.Q(is_active=True), name='product_active_price'),
+            models.Index(fields=['total_sold', 'id'], condition=models.Q(is_active=True), name='product_active_sold'),
+            models.Index(fields=['average_rating', 'id'], condition=models.Q(is_active=True), name='product_active_rating'),
+            # Lọc theo danh mục + khoảng giá / sort theo giá
+            models.Index(fields=['category', 'current_price', 'id'], condition=models.Q(is_active=True), name='product_active_cat_price'),
+            # Trang quản lý của seller (mặc định -updated_at) và trang shop công khai
+            models.Index(fields=['seller', 'updated_at'], name='product_seller_updated'),
+            # Top sản phẩm bán chạy của seller (SellerStatsView)
+            models.Index(fields=['seller', 'total_sold'], name='product_seller_sold'),
+            # Hàng chờ duyệt của admin
+            models.Index(fields=['created_at'], condition=models.Q(status='pending'), name='product_pending_created'),
+        ]
+
     def __str__(self):
         return self.name
+    @property
+    def available_stock(self):
+        return max(self.stock - self.reserved_stock, 0)
     def get_final_price(self):
             
         now = timezone.now()
@@ -37,27 +130,175 @@ class Product(models.Model):
                 if self.discount_price and self.discount_price < self.price:
                     return self.discount_price
                 if self.discount_percent and 0 < self.discount_percent <= 100:
-                    return self.price * (100 - self.discount_percent) / 100
+                    return Decimal(self.price * (100 - self.discount_percent)) / 100
         return self.price
+
+
+class ReviewQuerySet(models.QuerySet):
+    def delete(self):
+        # Trừ điểm của các review bị xóa bằng 1 câu UPDATE cho mỗi sản phẩm thay vì mỗi review
+        with transaction.atomic(savepoint=False):
+            totals = list(self.order_by().values('product').annotate(rating=Sum('rating'), count=Count('id')))
+            result = super().delete()
+            for row in totals:
+                Review.update_product_rating(row['product'], -row['rating'], -row['count'])
+        return result
+
+
 class Review(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
     rating = models.DecimalField(max_digits=2, decimal_places=1)
     comment = models.TextField(blank=True)
-    image = models.ImageField(upload_to='reviews/', null=True, blank=True)
+    image = models.ImageField(upload_to='reviews/', storage=content_storage, null=True, blank=True)
     reply = models.TextField(blank=True, null=True)  # phản hồi của seller
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ReviewQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at', 'id'], name='review_product_created_id'),
+        ]
+
     def __str__(self):
         return f"Review for {self.product.name} by {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        review = super().from_db(db, field_names, values)
+        # Ghi nhớ giá trị đã lưu để biết lần save sau có đổi điểm hay không
+        review._saved_rating = review.__dict__.get('rating')
+        review._saved_product_id = review.__dict__.get('product_id')
+        return review
+
     def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding and (getattr(self, '_saved_rating', None) is None or getattr(self, '_saved_product_id', None) is None):
+            # Tải bằng .only()/.defer() (hoặc không qua from_db): đọc giá trị đã lưu, không ghi đè giá trị mới
+            saved = Review.objects.filter(pk=self.pk).values_list('product_id', 'rating').first()
+            if saved is None:
+                adding = True
+            else:
+                self._saved_product_id, self._saved_rating = saved
         super().save(*args, **kwargs)
-        self.update_product_rating()
-
-    def update_product_rating(self):
-        reviews = Review.objects.filter(product=self.product)
-        avg = reviews.aggregate(models.Avg('rating'))['rating__avg'] or 0
-        self.product.average_rating = round(avg, 1)
-        self.product.total_reviews = reviews.count()
-        self.product.save()
+        if adding:
+            self.update_product_rating(self.product_id, self.rating, 1)
+        elif self.product_id != self._saved_product_id:
+            self.update_product_rating(self._saved_product_id, -self._saved_rating, -1)
+            self.update_product_rating(self.product_id, self.rating, 1)
+        elif self.rating != self._saved_rating:
+            self.update_product_rating(self.product_id, self.rating - self._saved_rating, 0)
+        self._saved_rating = self.rating
+        self._saved_product_id = self.product_id
+
+    @staticmethod
+    def update_product_rating(product_id, rating_delta, count_delta):
+        # Cập nhật tổng điểm / số review / điểm trung bình bằng 1 câu UPDATE
+        rating_sum = F('rating_sum') + Decimal(rating_delta)
+        total_reviews = F('total_reviews') + count_delta
+        Product.objects.filter(pk=product_id).update(
+            rating_sum=rating_sum,
+            total_reviews=total_reviews,
+            average_rating=Case(
+                When(GreaterThan(total_reviews, 0), then=Round(Cast(rating_sum, models.FloatField()) / total_reviews, 1)),
+                default=Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=2, decimal_places=1),
+            ),
+        )
+
+    def delete(self, *args, **kwargs):
+        product_id = getattr(self, '_saved_product_id', None)
+        rating = getattr(self, '_saved_rating', None)
+        if self.pk is not None and (product_id is None or rating is None):
+            # Tải bằng .only()/.defer(): lấy điểm đã lưu trong DB
+            product_id, rating = Review.objects.filter(pk=self.pk).values_list('product_id', 'rating').first() or (None, None)
+        with transaction.atomic(savepoint=False):
+            deleted = super().delete(*args, **kwargs)
+            if deleted[0] and rating is not None:
+                self.update_product_rating(product_id, -rating, -1)
+        return deleted
+
+
+@receiver(pre_delete, sender=User)
+def remove_user_review_ratings(sender, instance, **kwargs):
+    # Review bị xóa dây chuyền theo user không đi qua ReviewQuerySet.delete(); trừ điểm trước,
+    # 1 câu UPDATE cho mỗi sản phẩm. Xóa dây chuyền theo sản phẩm thì không cần cập nhật gì.
+    totals = Review.objects.filter(user=instance).order_by().values('product').annotate(
+        rating=Sum('rating'), count=Count('id'),
+    )
+    for row in totals:
+        Review.update_product_rating(row['product'], -row['rating'], -row['count'])
+
+
+class StoredFile(models.Model):
+    """How many rows point at a file in ``content_storage``.
+
+    ``pending`` counts uploads that reused or wrote the file in
+    ``ContentAddressedStorage._save`` but whose row has not been saved (and
+    ``incref``-ed) yet; the file is not deleted while any are pending.
+    ``derivatives`` is ``{variant: width}`` once product/images.py has
+    written the resized copies, NULL while they are still to be built.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    derivatives = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Hàng đợi của build_image_derivatives
+            models.Index(fields=['id'], condition=Q(derivatives__isnull=True), name='storedfile_derivatives_todo'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+    @classmethod
+    def lock(cls, name):
+        """Row of ``name``, created if missing, locked until the transaction ends."""
+        while True:
+            row = cls.objects.select_for_update().filter(name=name).first()
+            if row is not None:
+                return row
+            try:
+                with transaction.atomic():
+                    return cls.objects.create(name=name)
+            except IntegrityError:
+                # Một request khác vừa tạo dòng này
+                continue
+
+    @classmethod
+    def reserve(cls, name):
+        """Mark ``name`` as about to be referenced; call inside a transaction, before using the file."""
+        cls.lock(name)
+        cls.objects.filter(name=name).update(pending=F('pending') + 1)
+
+    @classmethod
+    def incref(cls, name):
+        with transaction.atomic():
+            cls.lock(name)
+            cls.objects.filter(name=name).update(
+                ref_count=F('ref_count') + 1,
+                pending=Case(When(pending__gt=0, then=F('pending') - 1), default=Value(0)),
+            )
+
+    @classmethod
+    def decref(cls, name):
+        """Drop one reference; the file is deleted after commit once nothing uses it."""
+        cls.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        transaction.on_commit(lambda: cls.delete_if_unused(name))
+
+    @classmethod
+    def delete_if_unused(cls, name):
+        from .images import delete_derivatives
+
+        with transaction.atomic():
+            # Khóa dòng rồi kiểm tra lại: upload cùng nội dung chờ tới khi xóa xong rồi ghi lại file
+            row = cls.objects.select_for_update().filter(name=name, ref_count=0, pending=0).first()
+            if row is None:
+                return
+            row.delete()
+            content_storage.delete(name)
+            delete_derivatives(name)
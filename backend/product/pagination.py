@@ -0,0 +1,174 @@
+"""
+Keyset (cursor) pagination.
+
+A page is found by filtering past the last row's sort key and id, e.g.
+``created_at <= :t AND (created_at < :t OR (created_at = :t AND id < :id))``,
+instead of ``OFFSET``. Page 1000 costs the same as page 1 on a
+``(sort key, id)`` index, and no ``COUNT(*)`` runs. The ordering comes
+from the view's queryset, with ``id`` appended as a tie-breaker.
+
+Requests opt in with ``?cursor=`` (empty for the first page) and follow
+the ``next``/``previous`` links. Without it the view behaves as before:
+``fallback_class`` paginates, or the list is not paginated at all.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder cắt còn mili giây, cursor cần đủ micro giây để so sánh bằng
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _flip(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class KeysetPagination(BasePagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    fallback_class = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fallback = None
+        if self.cursor_query_param not in request.query_params:
+            if self.fallback_class is None:
+                return None
+            self.fallback = self.fallback_class()
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        position, reverse = self.decode_cursor(request, queryset.model)
+        ordering = [_flip(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            # Đi lùi: lấy theo thứ tự ngược rồi đảo lại, dòng của cursor vẫn nằm phía sau
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset):
+        query = queryset.query
+        ordering = list(query.order_by or queryset.model._meta.ordering)
+        if query.extra_order_by or not all(isinstance(field, str) for field in ordering):
+            raise ValidationError({self.cursor_query_param: "Kiểu sắp xếp này không hỗ trợ phân trang bằng cursor."})
+        if not {"id", "pk"} & {field.lstrip("-") for field in ordering}:
+            # id làm khóa phụ để thứ tự luôn duy nhất
+            ordering.append("-id" if not ordering or ordering[-1].startswith("-") else "id")
+        return ordering
+
+    @staticmethod
+    def after(ordering, position):
+        """Rows strictly after ``position`` in ``ordering`` (tuple comparison)."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            condition |= Q(**equal, **{f"{name}__{'lt' if field.startswith('-') else 'gt'}": value})
+            equal[name] = value
+        # Cận theo cột đầu để DB quét index từ đúng vị trí thay vì từ đầu
+        first = ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+        return bound & condition
+
+    def position_of(self, obj):
+        values = []
+        for field in self.ordering:
+            value = obj
+            for attr in field.lstrip("-").split("__"):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def cursor_token(self, obj, reverse=False):
+        payload = {"p": self.position_of(obj)}
+        if reverse:
+            payload["r"] = 1
+        return base64.urlsafe_b64encode(json.dumps(payload, cls=_CursorEncoder).encode()).decode()
+
+    def encode_cursor(self, obj, reverse):
+        token = self.cursor_token(obj, reverse)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            position = payload["p"]
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound("Cursor không hợp lệ.")
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound("Cursor không hợp lệ.")
+        # Cursor do client gửi lên: ép từng giá trị về kiểu của cột sắp xếp trước khi lọc
+        try:
+            position = [
+                self.sort_field(model, field).to_python(value) for field, value in zip(self.ordering, position)
+            ]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound("Cursor không hợp lệ.")
+        if any(value is None for value in position):
+            raise NotFound("Cursor không hợp lệ.")
+        return position, bool(payload.get("r"))
+
+    @staticmethod
+    def sort_field(model, field):
+        """Model field behind an ordering entry such as ``-created_at`` or ``product__price``."""
+        *relations, name = field.lstrip("-").split("__")
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.pk if name == "pk" else model._meta.get_field(name)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
@@ -1,13 +1,18 @@
 from rest_framework.permissions import BasePermission
+
+from account.identity import get_identity
+
+
 class IsSellerOrReadOnly(BasePermission):
     def has_permission(self, request, view):
         # Cho phép mọi người đọc, chỉ seller mới tạo/sửa/xóa
         if request.method in ['GET', 'HEAD', 'OPTIONS']:
             return True
-        return hasattr(request.user, 'seller')
+        return get_identity(request).is_seller
 
     def has_object_permission(self, request, view, obj):
         # seller chỉ thao tác trên sản phẩm của mình
         if request.method in ['GET', 'HEAD', 'OPTIONS']:
             return True
-        return obj.seller.user == request.user
\ No newline at end of file
+        seller_id = get_identity(request).seller_id
+        return seller_id is not None and obj.seller_id == seller_id
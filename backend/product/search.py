@@ -0,0 +1,117 @@
+"""
+Full-text product search backed by a stored index.
+
+PostgreSQL keeps ``Product.search_vector`` up to date with a trigger and
+indexes it with GIN. SQLite, used for local development, mirrors name and
+description into the ``product_product_fts`` FTS5 table through triggers.
+Both are created by migration 0018, so inserts and updates made with
+``bulk_create``/``update`` are indexed too.
+
+SQLite drops a table's triggers whenever a migration rebuilds it, so
+``ensure_search_index`` recreates them after every ``migrate`` and
+rebuilds the FTS table if any were missing.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+
+TOKEN_RE = re.compile(r"\w+")
+
+SQLITE_FTS_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_product_fts USING fts5(
+        name, description,
+        content='product_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+SQLITE_FTS_TRIGGERS = {
+    "product_product_fts_insert": """
+        CREATE TRIGGER IF NOT EXISTS product_product_fts_insert AFTER INSERT ON product_product BEGIN
+            INSERT INTO product_product_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+    "product_product_fts_delete": """
+        CREATE TRIGGER IF NOT EXISTS product_product_fts_delete AFTER DELETE ON product_product BEGIN
+            INSERT INTO product_product_fts(product_product_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """,
+    "product_product_fts_update": """
+        CREATE TRIGGER IF NOT EXISTS product_product_fts_update AFTER UPDATE OF name, description ON product_product BEGIN
+            INSERT INTO product_product_fts(product_product_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO product_product_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+}
+
+
+def ensure_search_index(connection):
+    """Recreate missing SQLite FTS triggers and reindex. Returns True if anything was missing."""
+    if connection.vendor != "sqlite":
+        return False  # trigger của PostgreSQL không mất khi ALTER TABLE
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE 'product_product_fts%'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = {"product_product_fts", *SQLITE_FTS_TRIGGERS} - existing
+        if not missing:
+            return False
+        cursor.execute(SQLITE_FTS_TABLE)
+        for sql in SQLITE_FTS_TRIGGERS.values():
+            cursor.execute(sql)
+        # Các dòng ghi lúc thiếu trigger chưa vào index: dựng lại từ product_product
+        cursor.execute("INSERT INTO product_product_fts(product_product_fts) VALUES ('rebuild')")
+    return True
+
+
+def search_products(queryset, keyword, rank=False):
+    """Filter ``queryset`` to products matching every word of ``keyword``.
+
+    Words match as prefixes, so partially typed keywords still find results.
+    With ``rank=True`` the result is ordered by relevance.
+    """
+    tokens = TOKEN_RE.findall(keyword.lower())
+    if not tokens:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        query = SearchQuery(
+            " & ".join(f"{token}:*" for token in tokens),
+            config="simple",
+            search_type="raw",
+        )
+        queryset = queryset.filter(search_vector=query)
+        if rank:
+            queryset = queryset.annotate(rank=SearchRank(F("search_vector"), query)).order_by("-rank", "-id")
+        return queryset
+
+    if vendor == "sqlite":
+        match = " AND ".join(f'"{token}"*' for token in tokens)
+        if not rank:
+            return queryset.filter(pk__in=RawSQL(
+                "SELECT rowid FROM product_product_fts WHERE product_product_fts MATCH %s", [match]
+            ))
+        # JOIN với bảng FTS để bm25() chỉ tính 1 lần cho mỗi dòng khớp;
+        # bm25() càng nhỏ càng liên quan, tên sản phẩm nặng gấp 4 lần mô tả
+        return queryset.extra(
+            tables=["product_product_fts"],
+            where=[
+                "product_product_fts.rowid = product_product.id",
+                "product_product_fts MATCH %s",
+            ],
+            params=[match],
+            select={"rank": "-bm25(product_product_fts, 4.0, 1.0)"},
+            order_by=["-rank", "-id"],
+        )
+
+    for token in tokens:
+        queryset = queryset.filter(name__icontains=token)
+    return queryset
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Product, Category
-from account.models import Seller
+from account.identity import get_identity
+from .images import ImageVariantsField
 
 class ProductSerializer(serializers.ModelSerializer):
     price = serializers.DecimalField(
@@ -27,32 +28,69 @@ class ProductSerializer(serializers.ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
     seller = serializers.PrimaryKeyRelatedField(read_only=True)
     shop_name = serializers.CharField(source='seller.shop_name', read_only=True)
-    final_price = serializers.SerializerMethodField()
+    final_price = serializers.DecimalField(
+        source='current_price', max_digits=12, decimal_places=2, coerce_to_string=False, read_only=True
+    )
+    image_variants = ImageVariantsField(source='image')
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'description', 'price', 'stock', 'image', 
+            'id', 'name', 'sku', 'description', 'price', 'stock', 'image', 
             'is_active', 'created_at', 'updated_at', 'category_name', 
-            'category', 'status', 'average_rating', 'total_reviews', 'seller','shop_name', 'discount_price', 'discount_percent', 'discount_start', 'discount_end', 'final_price'
+            'category', 'status', 'average_rating', 'total_reviews', 'seller','shop_name', 'discount_price', 'discount_percent', 'discount_start', 'discount_end', 'final_price', 'total_sold', 'image_variants'
         ]
+        read_only_fields = ['total_sold']
         extra_kwargs = {
             'name': {'help_text': 'Product name'},
             'description': {'help_text': 'Product description'},
         }
 
     def create(self, validated_data):
-        # Gán seller tự động từ request.user
-        seller = Seller.objects.get(user=self.context['request'].user)
-        validated_data['seller'] = seller
+        # Gán seller tự động từ request.user nếu view chưa truyền vào save()
+        if 'seller' not in validated_data:
+            validated_data['seller'] = get_identity(self.context['request']).seller
         return super().create(validated_data)
-    def get_final_price(self, obj):
-        return obj.get_final_price()
+    def validate_sku(self, value):
+        # SKU trống lưu NULL để không đụng ràng buộc duy nhất (seller, sku)
+        return value or None
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        sku = attrs['sku'] if 'sku' in attrs else getattr(self.instance, 'sku', None)
+        seller_id = self._seller_id(attrs)
+        if sku and seller_id is not None:
+            # Kiểm tra theo seller của sản phẩm (admin có thể sửa sản phẩm của seller khác)
+            duplicates = Product.objects.filter(seller_id=seller_id, sku=sku)
+            if self.instance is not None:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise serializers.ValidationError({'sku': "SKU này đã được dùng cho sản phẩm khác."})
+        return attrs
+
+    def _seller_id(self, attrs):
+        """Seller the product will belong to after this save."""
+        if 'seller' in attrs:
+            return attrs['seller'].pk if attrs['seller'] else None
+        if self.instance is not None:
+            return self.instance.seller_id
+        request = self.context.get('request')
+        # Tạo mới: view gán seller của người gửi request
+        return get_identity(request).seller_id if request is not None else None
+
+
+class ProductListSerializer(ProductSerializer):
+    """ProductSerializer without the description, for public product listings."""
+    class Meta(ProductSerializer.Meta):
+        fields = [f for f in ProductSerializer.Meta.fields if f != 'description']
+
+
 from .models import Review
 from account.serializers import UserSerializer
 class ReviewSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.username', read_only=True)
     user = UserSerializer(read_only=True)
+    image_variants = ImageVariantsField(source='image')
     class Meta:
         model = Review
-        fields = ['id', 'product', 'user', 'user_name', 'rating', 'comment','reply', 'image', 'created_at']
+        fields = ['id', 'product', 'user', 'user_name', 'rating', 'comment','reply', 'image', 'image_variants', 'created_at']
         read_only_fields = ['user']
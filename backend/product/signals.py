@@ -0,0 +1,74 @@
+from functools import partial
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .images import IMAGE_FIELDS, safe_generate
+from .models import StoredFile
+from .search import ensure_search_index
+
+
+def generate_image_derivatives(sender, instance, created, **kwargs):
+    # Bình thường dòng StoredFile chưa có biến thể chính là hàng đợi của build_image_derivatives;
+    # IMAGE_DERIVATIVES_INLINE (khi dev) thì tạo luôn sau khi commit
+    if not getattr(settings, "IMAGE_DERIVATIVES_INLINE", False):
+        return
+    before = {} if created else getattr(instance, "_stored_files", {})
+    for field, name in _file_names(instance).items():
+        if name and name != before.get(field):
+            transaction.on_commit(partial(safe_generate, name))
+
+
+def _file_names(instance):
+    # Đọc thẳng từ __dict__ để không truy vấn thêm khi field bị defer
+    names = {}
+    for field in IMAGE_FIELDS[instance._meta.label]:
+        value = instance.__dict__.get(field)
+        names[field] = getattr(value, "name", value) or None
+    return names
+
+
+def remember_files(sender, instance, **kwargs):
+    instance._stored_files = _file_names(instance)
+
+
+def count_file_references(sender, instance, created, **kwargs):
+    before = {} if created else getattr(instance, "_stored_files", {})
+    after = _file_names(instance)
+    for field, name in after.items():
+        previous = before.get(field)
+        if name == previous:
+            continue
+        if name:
+            StoredFile.incref(name)
+        if previous:
+            StoredFile.decref(previous)
+    instance._stored_files = after
+
+
+def release_files(sender, instance, **kwargs):
+    for name in _file_names(instance).values():
+        if name:
+            StoredFile.decref(name)
+
+
+def restore_search_index(sender, using, apps=global_apps, **kwargs):
+    # SQLite làm mất trigger FTS mỗi khi migration dựng lại bảng product_product;
+    # chỉ chạy khi 0018 (search_vector) đã áp dụng, không phải lúc migrate lùi về trước đó.
+    # flush cũng gửi post_migrate nhưng không kèm apps
+    try:
+        Product = apps.get_model("product", "Product")
+    except LookupError:
+        return
+    if any(field.name == "search_vector" for field in Product._meta.get_fields()):
+        ensure_search_index(connections[using])
+
+
+for label in IMAGE_FIELDS:
+    # Trước count_file_references, vì nó ghi đè _stored_files
+    post_save.connect(generate_image_derivatives, sender=label, dispatch_uid=f"image-derivatives-{label}")
+    post_init.connect(remember_files, sender=label, dispatch_uid=f"image-files-{label}")
+    post_save.connect(count_file_references, sender=label, dispatch_uid=f"image-refcount-{label}")
+    post_delete.connect(release_files, sender=label, dispatch_uid=f"image-release-{label}")
@@ -0,0 +1,55 @@
+"""
+Content-addressed storage for uploaded images.
+
+Uploads are stored under the SHA-256 of their bytes
+(``content/ab/abcdef....png``), so the same picture uploaded twice takes
+the disk space of one. ``StoredFile`` counts the rows pointing at each
+file; the file is only deleted when the last reference goes away and no
+upload that reuses it is still being saved.
+``dedupe_media`` moves existing uploads into this layout.
+"""
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+CONTENT_DIR = "content"
+
+
+def content_digest(content, chunk_size=64 * 1024):
+    """SHA-256 hex digest of a Django ``File``, read chunk by chunk."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks(chunk_size):
+        digest.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def content_name(digest, original_name):
+    extension = posixpath.splitext(original_name)[1].lower()
+    return posixpath.join(CONTENT_DIR, digest[:2], f"{digest}{extension}")
+
+
+@deconstructible(path="product.storage.ContentAddressedStorage")
+class ContentAddressedStorage(FileSystemStorage):
+    def _save(self, name, content):
+        from .models import StoredFile
+
+        target = content_name(content_digest(content), name)
+        with transaction.atomic():
+            # Giữ dòng đếm trong lúc kiểm tra file: delete_if_unused đang chạy sẽ xóa xong trước
+            # (file được ghi lại), và sau đó không xóa nữa cho tới khi bản ghi được incref
+            StoredFile.reserve(target)
+            if not self.exists(target):
+                # Ghi ra file tạm rồi đổi tên: hai request cùng upload một ảnh vẫn an toàn
+                temporary = super()._save(f"{target}.{uuid.uuid4().hex}.tmp", content)
+                os.replace(self.path(temporary), self.path(target))
+        return target
+
+
+content_storage = ContentAddressedStorage()
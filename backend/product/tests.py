@@ -1,3 +1,707 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from account.models import Notification, Seller
+from category.models import Category
+from order.models import Order, OrderItem
+
+from .images import VARIANTS, derivative_name
+from .models import Product, Review, StoredFile
+from .views import PRODUCT_SORTS
+
+
+class BestsellingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        customer = User.objects.create_user("customer", password="x")
+        cls.products = [Product.objects.create(name=f"P{i}", price=10, stock=100) for i in range(3)]
+        for product, delivered, pending in zip(cls.products, (5, 9, 1), (50, 0, 0)):
+            for status, quantity in (("delivered", delivered), ("pending", pending)):
+                order = Order.objects.create(user=customer, status=status, address="HN")
+                OrderItem.objects.create(order=order, product=product, quantity=quantity, price=10)
+
+    def test_rebuild_sold_counts_uses_delivered_orders_only(self):
+        call_command("rebuild_sold_counts", stdout=StringIO())
+
+        sold = dict(Product.objects.values_list("name", "total_sold"))
+        self.assertEqual(sold, {"P0": 5, "P1": 9, "P2": 1})
+
+    def test_bestselling_sorts_descending(self):
+        call_command("rebuild_sold_counts", stdout=StringIO())
+
+        response = APIClient().get("/api/product/", {"sort": "bestselling"})
+
+        self.assertEqual([p["name"] for p in response.data["results"]], ["P1", "P0", "P2"])
+
+
+class ReviewRatingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reviewer", password="x")
+        cls.product = Product.objects.create(name="Áo", price=10)
+
+    def assertRating(self, average, count):
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.average_rating, self.product.total_reviews), (Decimal(average), count))
+
+    def test_rating_follows_create_update_and_delete(self):
+        first = Review.objects.create(product=self.product, user=self.user, rating=Decimal("4"))
+        second = Review.objects.create(product=self.product, user=self.user, rating=Decimal("5"))
+        self.assertRating("4.5", 2)
+
+        first.rating = Decimal("1")
+        first.save()
+        self.assertRating("3.0", 2)
+
+        second.delete()
+        self.assertRating("1.0", 1)
+        first.delete()
+        self.assertRating("0", 0)
+
+    def test_bulk_and_cascade_deletes_update_once_per_product(self):
+        other = Product.objects.create(name="Quần", price=10)
+        other_user = User.objects.create_user("other", password="x")
+        for product, rating in [(self.product, "2"), (other, "4")] * 3:
+            Review.objects.create(product=product, user=self.user, rating=Decimal(rating))
+        Review.objects.create(product=self.product, user=other_user, rating=Decimal("5"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.user.delete()
+        rating_updates = [q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "product_product"')]
+        self.assertEqual(len(rating_updates), 2)
+        self.assertRating("5.0", 1)
+
+        Review.objects.filter(product=self.product).delete()
+        self.assertRating("0", 0)
+
+    def test_deferred_rating_is_read_before_save(self):
+        review = Review.objects.create(product=self.product, user=self.user, rating=Decimal("4"))
+        review = Review.objects.defer("rating").get(pk=review.pk)
+        review.rating = Decimal("2")
+        review.save()
+        self.assertRating("2.0", 1)
+
+        Review.objects.only("id").get(pk=review.pk).delete()
+        self.assertRating("0", 0)
+
+    def test_reply_does_not_touch_product(self):
+        review = Review.objects.create(product=self.product, user=self.user, rating=Decimal("4"))
+        review = Review.objects.get(pk=review.pk)
+        review.reply = "Cảm ơn bạn"
+
+        with self.assertNumQueries(1):
+            review.save()
+
+    def test_cost_does_not_depend_on_review_count(self):
+        Review.objects.bulk_create(
+            Review(product=self.product, user=self.user, rating=Decimal("3")) for _ in range(500)
+        )
+
+        with self.assertNumQueries(2):
+            Review.objects.create(product=self.product, user=self.user, rating=Decimal("5"))
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.create(name="Áo thun nữ", description="Cotton mềm", price=10)
+        Product.objects.create(name="Quần jean", description="Phối cùng áo thun", price=10)
+        Product.objects.create(name="Giày thể thao", description="", price=10)
+
+    def search(self, **params):
+        response = APIClient().get("/api/product/", params)
+        return [p["name"] for p in response.data["results"]]
+
+    def test_keyword_matches_words_and_prefixes(self):
+        self.assertCountEqual(self.search(keyword="thun"), ["Áo thun nữ", "Quần jean"])
+        self.assertEqual(self.search(keyword="giày th"), ["Giày thể thao"])
+        self.assertEqual(self.search(keyword="xyz"), [])
+
+    def test_relevance_prefers_name_matches(self):
+        self.assertEqual(self.search(keyword="áo thun", sort="relevance"), ["Áo thun nữ", "Quần jean"])
+
+    def test_index_follows_updates_and_bulk_inserts(self):
+        Product.objects.filter(name="Giày thể thao").update(name="Dép lê")
+        Product.objects.bulk_create([Product(name="Giày chạy bộ", price=1)])
+
+        self.assertEqual(self.search(keyword="giày"), ["Giày chạy bộ"])
+
+    @skipUnless(connection.vendor == "sqlite", "trigger FTS5 chỉ có trên SQLite")
+    def test_missing_triggers_are_restored_after_migrate(self):
+        # Như khi một migration dựng lại bảng product_product
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER product_product_fts_update")
+        Product.objects.filter(name="Giày thể thao").update(name="Dép lê")
+
+        call_command("migrate", "product", verbosity=0)
+
+        self.assertEqual(self.search(keyword="dép"), ["Dép lê"])
+        self.assertEqual(self.search(keyword="giày"), [])
+        Product.objects.filter(name="Dép lê").update(name="Giày thể thao")
+        self.assertEqual(self.search(keyword="giày"), ["Giày thể thao"])
+
+
+class ListingQueryBudgetTests(TestCase):
+    """Query count of every product listing must not grow with the page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="x", is_staff=True)
+        cls.seller_user = User.objects.create_user("seller", password="x")
+        cls.seller = Seller.objects.create(user=cls.seller_user, shop_name="Shop")
+        cls.categories = [Category.objects.create(name=f"C{i}", slug=f"c{i}") for i in range(5)]
+        cls.add_products(3)
+
+    @classmethod
+    def add_products(cls, count):
+        start = Product.objects.count()
+        Product.objects.bulk_create(
+            Product(name=f"P{start + i}", price=10, seller=cls.seller, category=cls.categories[i % 5])
+            for i in range(count)
+        )
+
+    def count_queries(self, url, user=None):
+        client = APIClient()
+        if user:
+            client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertFlat(self, url, user=None):
+        small = self.count_queries(url, user)
+        self.add_products(60)
+        self.assertEqual(self.count_queries(url, user), small, url)
+
+    def test_product_list(self):
+        self.assertFlat("/api/product/?page_size=100")
+
+    def test_product_list_sorted(self):
+        self.assertFlat("/api/product/?page_size=100&sort=bestselling")
+
+    def test_public_seller_products(self):
+        self.assertFlat(f"/api/product/public/seller/?seller_id={self.seller.id}")
+
+    def test_seller_products(self):
+        self.assertFlat("/api/product/seller/", self.seller_user)
+
+    def test_admin_products(self):
+        self.assertFlat("/api/account/admin/products/", self.staff)
+
+    def test_list_skips_description(self):
+        response = APIClient().get("/api/product/")
+        self.assertNotIn("description", response.data["results"][0])
+        detail = APIClient().get(f"/api/product/{response.data['results'][0]['id']}/")
+        self.assertIn("description", detail.data)
+
+
+@override_settings(IMAGE_DERIVATIVES_INLINE=True)
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, size=(2000, 1000), mode="RGBA"):
+        buffer = BytesIO()
+        Image.new(mode, size, (200, 30, 90, 128)[:len(mode)]).save(buffer, "PNG")
+        return SimpleUploadedFile("anh.png", buffer.getvalue(), content_type="image/png")
+
+    def test_upload_generates_variants_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Áo", price=10, image=self.upload())
+
+        for variant, longest in VARIANTS.items():
+            for fmt in ("webp", "jpeg"):
+                path = os.path.join(self.media_root, derivative_name(product.image.name, variant, fmt))
+                with Image.open(path) as image:
+                    self.assertEqual(max(image.size), longest)
+
+    @override_settings(IMAGE_DERIVATIVES_INLINE=False)
+    def test_listing_exposes_variant_urls_once_generated(self):
+        product = Product.objects.create(name="Áo", price=10, image=self.upload(size=(300, 200), mode="RGB"))
+        listed = APIClient().get("/api/product/").data["results"][0]
+        self.assertIsNone(listed["image_variants"])
+
+        call_command("build_image_derivatives", stdout=StringIO())
+
+        # Danh sách đọc kích thước đã ghi trong DB, không stat file nào
+        with patch.object(FileSystemStorage, "exists", side_effect=AssertionError("stat khi đọc danh sách")):
+            variants = APIClient().get("/api/product/").data["results"][0]["image_variants"]
+        card = variants["webp"]["card"]
+        self.assertTrue(card.endswith(derivative_name(product.image.name, "card", "webp")))
+        # Ảnh rộng 300px: card và detail đều rộng 300px nên srcset chỉ ghi một lần, với chiều rộng thật
+        thumbnail = variants["webp"]["thumbnail"]
+        self.assertEqual(variants["srcset"], f"{thumbnail} 160w, {card} 300w")
+        # Ảnh nhỏ hơn kích thước biến thể thì giữ nguyên, không phóng to
+        with Image.open(os.path.join(self.media_root, derivative_name(product.image.name, "detail", "jpeg"))) as image:
+            self.assertEqual(image.size, (300, 200))
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_DERIVATIVES_INLINE=True)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, color, name="anh.png"):
+        buffer = BytesIO()
+        Image.new("RGB", (8, 8), color).save(buffer, "PNG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_same_upload_is_stored_once_and_deleted_with_last_reference(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Product.objects.create(name="A", price=1, image=self.upload("red", "a.png"))
+            second = Product.objects.create(name="B", price=1, image=self.upload("red", "b.PNG"))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith("content/"))
+        self.assertEqual(StoredFile.objects.get(name=first.image.name).ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(self.exists(second.image.name))
+
+        old_name = second.image.name
+        second = Product.objects.get(pk=second.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.image = self.upload("blue")
+            second.save()
+        self.assertFalse(self.exists(old_name))
+        self.assertFalse(StoredFile.objects.filter(name=old_name).exists())
+        self.assertEqual(StoredFile.objects.get(name=second.image.name).ref_count, 1)
+
+    def test_reupload_racing_with_delete_keeps_the_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Product.objects.create(name="A", price=1, image=self.upload("red"))
+        name = first.image.name
+        with self.captureOnCommitCallbacks() as pending_deletes:
+            first.delete()
+
+        # Lần xóa sau commit chạy xen giữa lúc upload đã dùng lại file và lúc bản ghi được incref
+        incref = StoredFile.incref.__func__
+
+        def delete_then_incref(cls, stored_name):
+            for callback in pending_deletes:
+                callback()
+            incref(cls, stored_name)
+
+        with patch.object(StoredFile, "incref", classmethod(delete_then_incref)):
+            second = Product.objects.create(name="B", price=1, image=self.upload("red"))
+
+        self.assertEqual(second.image.name, name)
+        self.assertTrue(self.exists(name))
+        self.assertEqual(StoredFile.objects.values_list("ref_count", "pending").get(name=name), (1, 0))
+
+    def test_dedupe_media_rewrites_legacy_names(self):
+        os.makedirs(os.path.join(self.media_root, "products"))
+        content = self.upload("green").read()
+        for name in ("products/a.png", "products/a_X1y2Z3a.png", "products/orphan.png"):
+            with open(os.path.join(self.media_root, name), "wb") as handle:
+                handle.write(content)
+        Product.objects.bulk_create([
+            Product(name="A", price=1, image="products/a.png"),
+            Product(name="B", price=1, image="products/a_X1y2Z3a.png"),
+        ])
+
+        out = StringIO()
+        call_command("dedupe_media", "--delete-orphans", stdout=out)
+
+        names = set(Product.objects.values_list("image", flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(self.exists(name))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "products")), [])
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 2)
+        self.assertIn("2 files -> 1 unique", out.getvalue())
+        self.assertIn("1 orphans", out.getvalue())
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.body = bytes(range(256)) * 40
+        self.digest = "ab" * 32
+        self.other_digest = "cd" * 32
+        self.derivatives = [
+            f"derivatives/content/ab/{self.digest}/card.webp",
+            f"derivatives/content/ab/{self.digest}/card.jpeg",
+            f"derivatives/content/cd/{self.other_digest}/card.webp",
+        ]
+        for name in ("products/anh.png", f"content/ab/{self.digest}.png", *self.derivatives):
+            os.makedirs(os.path.join(self.media_root, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.media_root, name), "wb") as handle:
+                handle.write(self.body)
+
+    def get(self, path, **headers):
+        return self.client.get(f"/media/{path}", headers=headers)
+
+    def test_full_response_and_conditional_requests(self):
+        response = self.get("products/anh.png")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.body)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+
+        etag = response["ETag"]
+        self.assertEqual(self.get("products/anh.png", if_none_match=etag).status_code, 304)
+        self.assertEqual(self.get("products/anh.png", if_none_match='"khac"').status_code, 200)
+        since = response["Last-Modified"]
+        self.assertEqual(self.get("products/anh.png", if_modified_since=since).status_code, 304)
+
+    def test_content_addressed_files_are_immutable(self):
+        response = self.get(f"content/ab/{self.digest}.png")
+
+        self.assertEqual(response["ETag"], f'"{self.digest}"')
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_derivatives_have_distinct_etags(self):
+        etags = [self.get(name)["ETag"] for name in self.derivatives]
+
+        self.assertTrue(etags[0].startswith(f'"{self.digest}-card.webp-'))
+        self.assertEqual(len(set(etags)), 3)
+        for name in self.derivatives[1:]:
+            self.assertEqual(self.get(name, if_none_match=etags[0]).status_code, 200)
+        self.assertEqual(self.get(self.derivatives[0], if_none_match=etags[0]).status_code, 304)
+
+    def test_regenerated_derivative_is_revalidated(self):
+        name = self.derivatives[0]
+        response = self.get(name)
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+        # Như build_image_derivatives --force: cùng URL, nội dung mới
+        path = os.path.join(self.media_root, name)
+        with open(path, "wb") as handle:
+            handle.write(self.body[::-1] + b"!")
+        os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+
+        self.assertEqual(self.get(name, if_none_match=response["ETag"]).status_code, 200)
+
+    def test_byte_ranges(self):
+        response = self.get("products/anh.png", range="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.body[10:20])
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.body)}")
+
+        suffix = self.get("products/anh.png", range="bytes=-5")
+        self.assertEqual(b"".join(suffix.streaming_content), self.body[-5:])
+
+        stale = self.get("products/anh.png", range="bytes=0-4", if_range='"cu"')
+        self.assertEqual(stale.status_code, 200)
+
+        unsatisfiable = self.get("products/anh.png", range=f"bytes={len(self.body)}-")
+        self.assertEqual(unsatisfiable.status_code, 416)
+
+    @override_settings(MEDIA_ACCEL="nginx")
+    def test_accel_redirect_hands_off_to_proxy(self):
+        response = self.get("products/anh.png")
+
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/products/anh.png")
+        self.assertEqual(response.content, b"")
+        self.assertEqual(self.get("products/anh.png", if_none_match=response["ETag"]).status_code, 304)
+
+    def test_rejects_paths_outside_media_root(self):
+        self.assertEqual(self.get("../settings.py").status_code, 404)
+        self.assertEqual(self.get("products").status_code, 404)
+
+
+class ProductImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller_user = User.objects.create_user("seller", password="x")
+        cls.seller = Seller.objects.create(user=cls.seller_user, shop_name="Shop")
+        cls.shoes = Category.objects.create(name="Giày", slug="giay")
+        cls.bags = Category.objects.create(name="Túi", slug="tui")
+
+    def upload(self, name, content, **extra):
+        client = APIClient()
+        client.force_authenticate(self.seller_user)
+        file = SimpleUploadedFile(name, content.encode("utf-8"))
+        return client.post("/api/product/seller/import/", {"file": file, **extra}, format="multipart")
+
+    def test_csv_upserts_on_sku(self):
+        existing = Product.objects.create(
+            name="Cũ", sku="A1", price=1, stock=1, seller=self.seller, status="approved", total_sold=7
+        )
+        csv_body = (
+            "sku,name,category,price,stock,description\n"
+            "A1,Giày chạy,giay,500000,3,Mô tả\n"
+            "B2,Túi da,Túi,300000,0,\n"
+            f"C3,Túi vải,{self.bags.id},90000,5,\n"
+        )
+        # seller, danh mục, tìm SKU, upsert (trong savepoint), thông báo
+        with self.assertNumQueries(7):
+            response = self.upload("catalog.csv", csv_body)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["updated"], 1)
+        existing.refresh_from_db()
+        self.assertEqual((existing.name, existing.price, existing.category, existing.description),
+                         ("Giày chạy", 500000, self.shoes, "Mô tả"))
+        # Sản phẩm đã có giữ trạng thái duyệt và số liệu bán hàng
+        self.assertEqual((existing.status, existing.total_sold), ("approved", 7))
+        created = Product.objects.get(seller=self.seller, sku="B2")
+        self.assertEqual((created.category, created.status), (self.bags, "pending"))
+        self.assertEqual(Notification.objects.filter(target_role="admin", user=None).count(), 1)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        jsonl_body = "\n".join([
+            json.dumps({"sku": "A1", "name": "Giày", "category": "giay", "price": 10, "stock": 1}),
+            json.dumps({"sku": "A2", "name": "Giày", "category": "không có", "price": 10, "stock": 1}),
+            json.dumps({"sku": "A3", "name": "Giày", "category": "giay", "price": -1, "stock": 1}),
+            "không phải json",
+        ])
+
+        response = self.upload("catalog.jsonl", jsonl_body)
+
+        self.assertEqual((response.data["created"], response.data["failed"]), (1, 3))
+        self.assertEqual([error["line"] for error in response.data["errors"]], [2, 3, 4])
+        self.assertIn("category", response.data["errors"][0]["errors"])
+        self.assertEqual(list(Product.objects.values_list("sku", flat=True)), ["A1"])
+
+    def test_rejects_file_without_required_columns(self):
+        response = self.upload("catalog.csv", "name,price\nGiày,10\n")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_command_streams_in_batches(self):
+        path = os.path.join(tempfile.mkdtemp(), "catalog.csv")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("sku,name,category,price,stock\n")
+            file.writelines(f"S{i},Sản phẩm {i},giay,{i},1\n" for i in range(25))
+        out = StringIO()
+
+        call_command("import_products", "seller", path, batch_size=10, stdout=out)
+        call_command("import_products", "seller", path, batch_size=10, stdout=out)
+
+        self.assertIn("25 rows: 25 created, 0 updated, 0 failed", out.getvalue())
+        self.assertIn("25 rows: 0 created, 25 updated, 0 failed", out.getvalue())
+        self.assertEqual(Product.objects.filter(seller=self.seller).count(), 25)
+
+    def test_sku_must_be_unique_per_seller(self):
+        Product.objects.create(name="Cũ", sku="A1", price=1, seller=self.seller)
+        client = APIClient()
+        client.force_authenticate(self.seller_user)
+        data = {"name": "Mới", "sku": "A1", "price": 1, "stock": 1, "category": self.shoes.id}
+
+        self.assertEqual(client.post("/api/product/seller/", data).status_code, 400)
+        self.assertEqual(client.post("/api/product/seller/", {**data, "sku": ""}).status_code, 201)
+        self.assertEqual(client.post("/api/product/seller/", {**data, "sku": ""}).status_code, 201)
+
+
+    def test_admin_edit_checks_sku_against_the_products_seller(self):
+        Product.objects.create(name="Cũ", sku="A1", price=1, seller=self.seller)
+        product = Product.objects.create(name="Mới", sku="B1", price=1, seller=self.seller)
+        staff = User.objects.create_user("staff", password="x", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+
+        response = client.patch(f"/api/account/admin/products/{product.id}/", {"sku": "A1"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("sku", response.data)
+        self.assertEqual(client.patch(f"/api/account/admin/products/{product.id}/", {"sku": "C1"}).status_code, 200)
+
+class ProductExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller_user = User.objects.create_user("seller", password="x")
+        cls.seller = Seller.objects.create(user=cls.seller_user, shop_name="Shop")
+        cls.staff = User.objects.create_user("staff", password="x", is_staff=True)
+        category = Category.objects.create(name="Giày", slug="giay")
+        Product.objects.create(name="Rẻ", sku="R1", price=10, stock=1, category=category, seller=cls.seller)
+        Product.objects.create(name="Đắt", sku="D1", price=900, stock=1, category=category, seller=cls.seller)
+
+    def get(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_seller_export_round_trips_through_import(self):
+        body = self.get(self.seller_user, "/api/product/seller/export/?max_price=100")
+
+        rows = list(csv.DictReader(StringIO(body.decode("utf-8-sig"))))
+        self.assertEqual([(row["sku"], row["category"]) for row in rows], [("R1", "Giày")])
+        client = APIClient()
+        client.force_authenticate(self.seller_user)
+        response = client.post(
+            "/api/product/seller/import/", {"file": SimpleUploadedFile("p.csv", body)}, format="multipart"
+        )
+        self.assertEqual((response.data["updated"], response.data["failed"]), (1, 0))
+
+    def test_admin_export_jsonl(self):
+        body = self.get(self.staff, "/api/account/admin/products/export/?format=jsonl")
+
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([(row["sku"], row["shop_name"]) for row in rows], [("R1", "Shop"), ("D1", "Shop")])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Giá trùng nhau để kiểm tra khóa phụ id
+        Product.objects.bulk_create(
+            Product(name=f"P{i}", price=[30, 10, 20][i % 3], total_sold=i % 4) for i in range(25)
+        )
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = APIClient().get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            ids += [product["id"] for product in response.data["results"]]
+            url = response.data["next"]
+            pages += 1
+        return ids, pages
+
+    def test_every_sort_visits_each_product_once_in_order(self):
+        for sort, ordering in PRODUCT_SORTS.items():
+            ids, pages = self.walk(f"/api/product/?sort={sort}&page_size=4&cursor=")
+            expected = list(Product.objects.order_by(*ordering).values_list("id", flat=True))
+            self.assertEqual(ids, expected, sort)
+            self.assertEqual(pages, 7)
+
+    def test_previous_link_goes_back_one_page(self):
+        first = APIClient().get("/api/product/?sort=price_desc&page_size=5&cursor=").data
+        second = APIClient().get(first["next"]).data
+        self.assertIsNone(first["previous"])
+
+        back = APIClient().get(second["previous"]).data
+
+        self.assertEqual(back["results"], first["results"])
+        self.assertEqual(APIClient().get(back["next"]).data["results"], second["results"])
+
+    def test_page_numbers_without_cursor(self):
+        response = APIClient().get("/api/product/?page=2&page_size=10")
+
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(APIClient().get("/api/product/?cursor=xyz").status_code, 404)
+
+    def test_cursor_values_must_match_the_sort_columns(self):
+        def get(sort, position):
+            token = base64.urlsafe_b64encode(json.dumps({"p": position}).encode()).decode()
+            return APIClient().get("/api/product/", {"sort": sort, "cursor": token}).status_code
+
+        for sort, position in [
+            ("price_asc", ["rẻ", 1]),
+            ("price_asc", [10, "x"]),
+            ("newest", ["hôm qua", 1]),
+            ("rating", [{"a": 1}, 1]),
+            ("bestselling", [None, 1]),
+        ]:
+            self.assertEqual(get(sort, position), 404, (sort, position))
+        self.assertEqual(get("price_asc", ["10.00", "3"]), 200)
+
+
+class QueryIndexTests(TestCase):
+    def test_meta_indexes_exist_in_database(self):
+        with connection.cursor() as cursor:
+            for model in (Product, Order):
+                constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+                for index in model._meta.indexes:
+                    self.assertIn(index.name, constraints)
+
+    @skipUnless(connection.vendor == "postgresql", "plan format của PostgreSQL")
+    def test_product_list_uses_partial_index(self):
+        Product.objects.create(name="Indexed", price=100)
+        with connection.cursor() as cursor:
+            # Bảng nhỏ nên planner luôn chọn Seq Scan; tắt đi để chỉ kiểm tra index dùng được
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = Product.objects.filter(is_active=True).order_by("-created_at", "-id")[:10].explain()
+
+        self.assertIn("product_active_created", plan)
+
+    @tag("slow")
+    def test_explain_queries_command(self):
+        out = StringIO()
+        call_command("explain_queries", products=3000, orders=3000, stdout=out)
+
+        plans = {line[:32].strip(): line[32:] for line in out.getvalue().splitlines()[1:]}
+        self.assertIn("product_active_created", plans["product list newest"])
+        self.assertIn("product_active_price", plans["product list price_asc"])
+        self.assertIn("product_seller_sold", plans["seller top products"])
+        self.assertIn("order_seller_status_day", plans["seller orders by status"])
+        # Index đã xóa tạm để đo "before" phải được khôi phục
+        with connection.cursor() as cursor:
+            self.assertIn("product_active_created", connection.introspection.get_constraints(cursor, "product_product"))
+
+
+class CurrentPriceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        day = timedelta(days=1)
+        cls.plain = Product.objects.create(name="Plain", price=150)
+        cls.percent = Product.objects.create(
+            name="Percent", price=300, discount_percent=55, discount_start=now - day, discount_end=now + day,
+        )
+        cls.fixed = Product.objects.create(
+            name="Fixed", price=400, discount_price=Decimal("99.50"), discount_start=now - day, discount_end=now + day,
+        )
+        cls.upcoming = Product.objects.create(
+            name="Upcoming", price=200, discount_percent=90, discount_start=now + day, discount_end=now + 2 * day,
+        )
+
+    def test_saved_price_matches_final_price(self):
+        for product in Product.objects.all():
+            self.assertEqual(product.current_price, Decimal(product.get_final_price()).quantize(Decimal("0.01")))
+        self.assertEqual(Product.objects.get(pk=self.percent.pk).current_price, Decimal("135.00"))
+
+    def test_filter_and_sort_use_discounted_price(self):
+        response = APIClient().get("/api/product/?sort=price_asc&min_price=90&max_price=160")
+
+        self.assertEqual([p["id"] for p in response.data["results"]], [self.fixed.id, self.percent.id, self.plain.id])
+        self.assertEqual([p["final_price"] for p in response.data["results"]], [99.5, 135, 150])
+
+    def test_refresh_follows_discount_windows(self):
+        later = timezone.now() + timedelta(days=1, hours=12)
+
+        self.assertEqual(Product.objects.refresh_current_prices(at=later), 3)
+        self.assertEqual(Product.objects.refresh_current_prices(at=later), 0)
+
+        prices = dict(Product.objects.values_list("name", "current_price"))
+        self.assertEqual(prices, {
+            "Plain": Decimal("150"), "Percent": Decimal("300"), "Fixed": Decimal("400"), "Upcoming": Decimal("20"),
+        })
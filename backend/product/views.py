@@ -5,6 +5,7 @@ from .serializers import ProductSerializer, ReviewSerializer
 from .permissions import IsSellerOrReadOnly
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
+from account.identity import get_identity
 from account.models import Seller, Notification
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions  import PermissionDenied
@@ -19,28 +20,71 @@ from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from django.db.models import Q, Sum
 from rest_framework.pagination import PageNumberPagination
 from .models import Product, Seller
-from .serializers import ProductSerializer
+from .serializers import ProductSerializer, ProductListSerializer
 from .permissions import IsSellerOrReadOnly
 from account.models import Seller, Notification
 from django.contrib.auth.models import User
-from django.contrib.postgres.search import SearchVector, SearchRank
+from .search import search_products
+from .importer import import_format, import_products
+from .exports import EXPORT_RENDERERS, PRODUCT_EXPORT_COLUMNS, export_response
+from .pagination import KeysetPagination
+from .images import with_derivatives
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework import status
 # Pagination class
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class ProductViewSet(viewsets.ModelViewSet):
+
+class ProductPagination(KeysetPagination):
+    """Cursor pagination with ``?cursor=``, page numbers otherwise."""
+    fallback_class = StandardResultsSetPagination
+
+
+# sort -> thứ tự; luôn kết thúc bằng id để phân trang cursor ổn định
+PRODUCT_SORTS = {
+    'newest': ('-created_at', '-id'),
+    'price_asc': ('current_price', 'id'),
+    'price_desc': ('-current_price', '-id'),
+    'bestselling': ('-total_sold', '-id'),
+    'rating': ('-average_rating', '-id'),
+}
+
+class ProductQuerysetMixin:
+    """
+    Base queryset shared by every product listing: category and seller are
+    loaded in the same query, and columns the list serializer never renders
+    are left out on the list action.
+    """
+    list_deferred_fields = ('description', 'search_vector')
+
+    def get_product_queryset(self):
+        queryset = with_derivatives(Product.objects.select_related('category', 'seller'), 'image')
+        if self.action == 'list':
+            return queryset.defer(*self.list_deferred_fields)
+        return queryset.defer('search_vector')
+
+    def get_serializer_class(self):
+        if self.action == 'list' and 'description' in self.list_deferred_fields:
+            return ProductListSerializer
+        return super().get_serializer_class()
+
+
+class ProductViewSet(ProductQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsSellerOrReadOnly]
 
     search_fields = ['name']
     
     filter_backends = [filters.SearchFilter]  
-    pagination_class = StandardResultsSetPagination
+    pagination_class = ProductPagination
 
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True)
+        queryset = self.get_product_queryset().filter(is_active=True)
         keyword = self.request.query_params.get('keyword')
         categories = self.request.query_params.get('categories')
         min_price = self.request.query_params.get('min_price')
@@ -48,20 +92,20 @@ class ProductViewSet(viewsets.ModelViewSet):
         rating = self.request.query_params.get('rating')
         sort = self.request.query_params.get('sort')
 
-        # Search
+        # Search (full-text index, xem product/search.py)
         if keyword:
-            queryset = queryset.filter(Q(name__icontains=keyword))
+            queryset = search_products(queryset, keyword, rank=(sort == 'relevance'))
 
         # Categories filter
         if categories:
             ids = [int(cid) for cid in categories.split(',') if cid.isdigit()]
             queryset = queryset.filter(category__id__in=ids)
 
-        # Price filter
+        # Price filter (giá sau giảm)
         if min_price:
-            queryset = queryset.filter(price__gte=min_price)
+            queryset = queryset.filter(current_price__gte=min_price)
         if max_price:
-            queryset = queryset.filter(price__lte=max_price)
+            queryset = queryset.filter(current_price__lte=max_price)
 
         # Rating filter
         if rating:
@@ -69,31 +113,15 @@ class ProductViewSet(viewsets.ModelViewSet):
 
         # Sorting
         if sort == 'relevance' and keyword:
-            queryset = queryset.annotate(
-                search=SearchVector('name', 'description'),
-            ).annotate(
-                rank=SearchRank(SearchVector('name', 'description'), keyword)
-            ).order_by('-rank')
-        elif sort == 'bestselling':
-            queryset = queryset.annotate(
-                total_sold=Sum(
-                    'order_items__quantity',
-                    filter=Q(order_items__order__status='delivered')
-                )
-            ).order_by('total_sold')
-        elif sort == 'newest':
-            queryset = queryset.order_by('-created_at')
-        elif sort == 'price_asc':
-            queryset = queryset.order_by('price')
-        elif sort == 'price_desc':
-            queryset = queryset.order_by('-price')
+            pass  # search_products đã sắp xếp theo độ liên quan
+        else:
+            queryset = queryset.order_by(*PRODUCT_SORTS.get(sort, PRODUCT_SORTS['newest']))
 
         return queryset
 
     def perform_create(self, serializer):
-        seller = Seller.objects.get(user=self.request.user)
-        serializer.save(seller=seller)
-class PublicSellerProductViewSet(viewsets.ReadOnlyModelViewSet):
+        serializer.save(seller=get_identity(self.request).seller)
+class PublicSellerProductViewSet(ProductQuerysetMixin, viewsets.ReadOnlyModelViewSet):
    
     serializer_class = ProductSerializer
     
@@ -103,7 +131,7 @@ class PublicSellerProductViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         seller_id = self.request.query_params.get("seller_id")
-        qs = Product.objects.all()
+        qs = self.get_product_queryset()
 
         if seller_id:
             qs = qs.filter(seller_id=seller_id, is_active=True)  # chỉ hiển thị sản phẩm đang hoạt động
@@ -119,80 +147,102 @@ class PublicSellerProductViewSet(viewsets.ReadOnlyModelViewSet):
 
         return qs
 
-class SellerProductViewSet(viewsets.ModelViewSet):
+
+def filter_products(qs, params):
+    """Filters of the seller/admin product pages (search, category, status, price, stock, ...)."""
+    # --- Các bộ lọc thủ công ---
+    search = params.get("search")  # thêm search
+    category_id = params.get("category")
+    status = params.get("status")
+    min_price = params.get("min_price")
+    max_price = params.get("max_price")
+    min_stock = params.get("min_stock")
+    max_stock = params.get("max_stock")
+    is_active = params.get("is_active")
+    updated_after = params.get("updated_after")
+    updated_before = params.get("updated_before")
+    min_rating = params.get("min_rating")
+    max_rating = params.get("max_rating")
+
+    if search:
+        qs = qs.filter(name__icontains=search)  # filter search theo tên
+
+    if category_id:
+        qs = qs.filter(category_id=category_id)
+    if status:
+        qs = qs.filter(status=status)
+    if min_price:
+        qs = qs.filter(price__gte=min_price)
+    if max_price:
+        qs = qs.filter(price__lte=max_price)
+    if min_stock:
+        qs = qs.filter(stock__gte=min_stock)
+    if max_stock:
+        qs = qs.filter(stock__lte=max_stock)
+    if is_active is not None:
+        if is_active.lower() in ["true", "1"]:
+            qs = qs.filter(is_active=True)
+        elif is_active.lower() in ["false", "0"]:
+            qs = qs.filter(is_active=False)
+    if updated_after:
+        qs = qs.filter(updated_at__gte=updated_after)
+    if updated_before:
+        qs = qs.filter(updated_at__lte=updated_before)
+    if min_rating:
+        qs = qs.filter(average_rating__gte=min_rating)
+    if max_rating:
+        qs = qs.filter(average_rating__lte=max_rating)
+
+    return qs
+
+
+class SellerProductViewSet(ProductQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
+    list_deferred_fields = ('search_vector',)  # trang quản lý của seller sửa cả mô tả
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ["price", "updated_at", "average_rating", "stock", "name"]  
     ordering = ["-updated_at"]  # mặc định mới nhất lên đầu
 
     def get_queryset(self):
-        try:
-            seller = Seller.objects.get(user=self.request.user)
-        except Seller.DoesNotExist:
+        seller_id = get_identity(self.request).seller_id
+        if seller_id is None:
             return Product.objects.none()
 
-        qs = Product.objects.filter(seller=seller)
-
-        # --- Các bộ lọc thủ công ---
-        search = self.request.query_params.get("search")  # thêm search
-        category_id = self.request.query_params.get("category")
-        status = self.request.query_params.get("status")
-        min_price = self.request.query_params.get("min_price")
-        max_price = self.request.query_params.get("max_price")
-        min_stock = self.request.query_params.get("min_stock")
-        max_stock = self.request.query_params.get("max_stock")
-        is_active = self.request.query_params.get("is_active")
-        updated_after = self.request.query_params.get("updated_after")
-        updated_before = self.request.query_params.get("updated_before")
-        min_rating = self.request.query_params.get("min_rating")
-        max_rating = self.request.query_params.get("max_rating")
+        return filter_products(self.get_product_queryset().filter(seller_id=seller_id), self.request.query_params)
 
-        if search:
-            qs = qs.filter(name__icontains=search)  # filter search theo tên
-
-        if category_id:
-            qs = qs.filter(category_id=category_id)
-        if status:
-            qs = qs.filter(status=status)
-        if min_price:
-            qs = qs.filter(price__gte=min_price)
-        if max_price:
-            qs = qs.filter(price__lte=max_price)
-        if min_stock:
-            qs = qs.filter(stock__gte=min_stock)
-        if max_stock:
-            qs = qs.filter(stock__lte=max_stock)
-        if is_active is not None:
-            if is_active.lower() in ["true", "1"]:
-                qs = qs.filter(is_active=True)
-            elif is_active.lower() in ["false", "0"]:
-                qs = qs.filter(is_active=False)
-        if updated_after:
-            qs = qs.filter(updated_at__gte=updated_after)
-        if updated_before:
-            qs = qs.filter(updated_at__lte=updated_before)
-        if min_rating:
-            qs = qs.filter(average_rating__gte=min_rating)
-        if max_rating:
-            qs = qs.filter(average_rating__lte=max_rating)
-
-        return qs
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Upsert products from a CSV/JSONL file (``file``) keyed on ``sku``.
+        ``format`` defaults to the file extension.
+        """
+        seller = get_identity(request).seller
+        if seller is None:
+            raise PermissionDenied("Bạn chưa đăng ký làm người bán.")
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({"file": "Vui lòng chọn file để nhập."})
+        fmt = request.data.get('format') or import_format(upload.name)
+        return Response(import_products(seller, upload, fmt))
+
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """Stream the filtered products as CSV (default) or JSONL (``?format=jsonl``)."""
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(request, queryset, PRODUCT_EXPORT_COLUMNS, "products")
 
     def perform_update(self, serializer):
-        product = self.get_object()
-        try:
-            seller = Seller.objects.get(user=self.request.user)
-        except Seller.DoesNotExist:
+        seller_id = get_identity(self.request).seller_id
+        if seller_id is None:
             raise PermissionDenied("Bạn không phải là người bán.")
-        if product.seller != seller:
+        if serializer.instance.seller_id != seller_id:
             raise PermissionDenied("Bạn không có quyền sửa sản phẩm này.")
         serializer.save()
 
     def perform_create(self, serializer):
-        try:
-            seller = Seller.objects.get(user=self.request.user)
-        except Seller.DoesNotExist:
+        seller = get_identity(self.request).seller
+        if seller is None:
             raise PermissionDenied("Bạn chưa đăng ký làm người bán.")
 
        
@@ -212,6 +262,7 @@ class SellerProductViewSet(viewsets.ModelViewSet):
 
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
+    pagination_class = KeysetPagination
     
     def perform_create(self, serializer):
         review = serializer.save(user=self.request.user)
@@ -222,18 +273,18 @@ class ReviewViewSet(viewsets.ModelViewSet):
     )
     def get_queryset(self):
         product_id = self.request.query_params.get("product")
+        queryset = with_derivatives(Review.objects.order_by("-created_at", "-id"), "image")
         if product_id:
-            return Review.objects.filter(product_id=product_id)
-        return Review.objects.all()
+            return queryset.filter(product_id=product_id)
+        return queryset
     @action(detail=True, methods=["patch"], url_path="reply", permission_classes=[IsAuthenticated])
     def reply(self, request, pk=None):
         review = self.get_object()
-        try:
-            seller = Seller.objects.get(user=request.user)
-        except Seller.DoesNotExist:
+        seller = get_identity(request).seller
+        if seller is None:
             raise PermissionDenied("Bạn không phải là seller.")
 
-        if review.product.seller != seller:
+        if review.product.seller_id != seller.pk:
             raise PermissionDenied("Bạn không có quyền trả lời review này.")
 
         reply_text = request.data.get("reply", "")
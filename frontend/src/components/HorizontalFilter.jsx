@@ -21,6 +21,7 @@ export default function HorizontalFilter({ currentSort }) {
   { label: t("filters.newest"), value: "newest" },
   { label: t("filters.priceAsc"), value: "price_asc" },
   { label: t("filters.priceDesc"), value: "price_desc" },
+  { label: t("filters.topRated"), value: "rating" },
 ];
 
 
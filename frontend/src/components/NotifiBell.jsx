@@ -1,7 +1,8 @@
 // src/components/NotificationBell.jsx
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useLocation, useNavigate } from "react-router-dom"; 
 import api from "../services/api";
+import { getAccessToken } from "../services/token";
 import { Bell, CheckCircle, AlertCircle, Info } from "lucide-react";
 import { motion, AnimatePresence } from "framer-motion";
 
@@ -12,22 +13,30 @@ export default function NotificationBell() {
   const location = useLocation();
   const navigate = useNavigate();
 
-  const fetchNotifications = async () => {
+  // mỗi trang chỉ hiện thông báo của role tương ứng
+  const targetRole = location.pathname.startsWith("/admin/")
+    ? "admin"
+    : location.pathname.startsWith("/seller")
+    ? "seller"
+    : "customer";
+
+  const fetchUnreadCount = async () => {
     try {
-      const res = await api.get("account/notifications/");
-      let data = res.data;
-
-      // lọc theo role dựa trên URL
-      if (location.pathname.startsWith("/admin/")) {
-        data = data.filter((n) => n.target_role === "admin");
-      } else if (location.pathname.startsWith("/seller")) {
-        data = data.filter((n) => n.target_role === "seller");
-      } else {
-        data = data.filter((n) => n.target_role === "customer");
-      }
+      const res = await api.get("account/notifications/unread-count/", {
+        params: { target_role: targetRole },
+      });
+      setUnreadCount(res.data.unread_count);
+    } catch (err) {
+      console.error("Lỗi khi tải số thông báo chưa đọc", err);
+    }
+  };
 
-      setNotifications(data);
-      setUnreadCount(data.filter((n) => !n.is_read).length);
+  const fetchNotifications = async () => {
+    try {
+      const res = await api.get("account/notifications/", {
+        params: { target_role: targetRole },
+      });
+      setNotifications(res.data);
     } catch (err) {
       console.error("Lỗi khi tải thông báo", err);
     }
@@ -38,7 +47,7 @@ export default function NotificationBell() {
 
     if (!n.is_read) {
       try {
-        await api.patch(`account/notifications/${n.id}/`, { is_read: true });
+        await api.post(`account/notifications/${n.id}/read/`);
         setNotifications((prev) =>
           prev.map((item) =>
             item.id === n.id ? { ...item, is_read: true } : item
@@ -53,13 +62,63 @@ export default function NotificationBell() {
     setOpen(false);
   };
 
+  const handleMarkAllRead = async () => {
+    try {
+      await api.post("account/notifications/read-all/", null, {
+        params: { target_role: targetRole },
+      });
+      setNotifications((prev) => prev.map((item) => ({ ...item, is_read: true })));
+      setUnreadCount(0);
+    } catch (err) {
+      console.error("Không thể đánh dấu tất cả đã đọc", err);
+    }
+  };
+
+  // server đẩy thông báo mới qua SSE, không cần hỏi lại định kỳ
+  const lastEventId = useRef(null);
 
   useEffect(() => {
-    fetchNotifications();
-    const interval = setInterval(fetchNotifications, 10000);
-    return () => clearInterval(interval);
+    let source = null;
+    let retryTimer = null;
+
+    const connect = () => {
+      const token = getAccessToken();
+      if (!token) return;
+      const params = new URLSearchParams({ token });
+      if (lastEventId.current) params.set("last_id", lastEventId.current);
+      source = new EventSource(`${api.defaults.baseURL}account/notifications/stream/?${params}`);
+
+      source.addEventListener("notification", (e) => {
+        lastEventId.current = e.lastEventId;
+        const n = JSON.parse(e.data);
+        if (n.target_role !== targetRole) return;
+        setNotifications((prev) => [n, ...prev.filter((item) => item.id !== n.id)]);
+        setUnreadCount((prev) => prev + 1);
+      });
+
+      // token hết hạn thì server trả 401 và EventSource dừng hẳn, mở lại với token mới
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          retryTimer = setTimeout(() => {
+            fetchUnreadCount();
+            connect();
+          }, 10000);
+        }
+      };
+    };
+
+    fetchUnreadCount();
+    connect();
+    return () => {
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
   }, [location]);
 
+  useEffect(() => {
+    if (open) fetchNotifications();
+  }, [open, location]);
+
   const getIcon = (type) => {
     switch (type) {
       case "success":
@@ -96,7 +155,14 @@ export default function NotificationBell() {
           >
             <div className="flex justify-between items-center p-2 border-b">
               <span className="font-bold">Thông báo</span>
-             
+              {unreadCount > 0 && (
+                <button
+                  className="text-xs text-blue-600 hover:underline"
+                  onClick={handleMarkAllRead}
+                >
+                  Đánh dấu tất cả đã đọc
+                </button>
+              )}
             </div>
 
             <div className="max-h-96 overflow-y-auto">
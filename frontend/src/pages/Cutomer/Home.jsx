@@ -64,7 +64,9 @@ function ProductCard({ product, onClick, index, t }) {
       <motion.div className="bg-purple-200 rounded-[22px] p-5 flex flex-col h-full" animate={controls}>
         <div className="relative overflow-hidden rounded-xl mb-4">
           <motion.img
-            src={product.image}
+            src={product.image_variants?.jpeg.card || product.image}
+            srcSet={product.image_variants?.srcset}
+            sizes="(min-width: 1024px) 25vw, (min-width: 640px) 50vw, 100vw"
             alt={product.name}
             className="w-full h-48 bg-purple-400 rounded-xl"
             whileHover={{ scale: 1.05 }}
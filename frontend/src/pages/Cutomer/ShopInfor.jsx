@@ -58,7 +58,9 @@ export default function ShopPage() {
       <div className="bg-purple-200 rounded-2xl p-4 flex flex-col h-full">
         <motion.div className="relative overflow-hidden rounded-xl mb-4" whileHover={{ scale: 1.01 }}>
           <img
-            src={product.image || "https://via.placeholder.com/400x300?text=No+Image"}
+            src={product.image_variants?.jpeg.card || product.image || "https://via.placeholder.com/400x300?text=No+Image"}
+            srcSet={product.image_variants?.srcset}
+            sizes="(min-width: 1024px) 25vw, (min-width: 640px) 50vw, 100vw"
             alt={product.name}
             className="w-full h-48 object-cover rounded-xl"
             loading="lazy"